@@ -0,0 +1,178 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import Http404, JsonResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import NotFound
+from rest_framework.permissions import DjangoModelPermissions
+from rest_framework.utils.encoders import JSONEncoder
+
+from api import conditional, fast_serializers, serializers
+from api.pagination import CampaignPagination, KeysetPagination
+from api.response_cache import respond_from_cache, response_cache
+from core import authz
+from core.models import ads as ads_models
+from core.models import assets as asset_models
+
+
+def read_view(sync_view, async_view):
+    """При API_ASYNC_VIEWS чтение обслуживает async-представление, запись остаётся за DRF."""
+    if not settings.API_ASYNC_VIEWS:
+        return sync_view
+
+    @csrf_exempt
+    async def view(request, *args, **kwargs):
+        if request.method in ("GET", "HEAD"):
+            return await async_view(request, *args, **kwargs)
+        return await sync_to_async(sync_view)(request, *args, **kwargs)
+
+    return view
+
+
+class AsyncAPIView(View):
+    model = None
+    serializer_class = None
+    http_method_names = ["get", "head"]
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.user = await request.auser()
+        if not self.user.is_authenticated:
+            return JsonResponse({"detail": "Authentication credentials were not provided."}, status=403)
+        perms = DjangoModelPermissions().get_required_permissions(request.method, self.model)
+        if not await authz.ahas_perms(self.user, perms):
+            return JsonResponse({"detail": "You do not have permission to perform this action."}, status=403)
+        try:
+            return await super().dispatch(request, *args, **kwargs)
+        except NotFound as e:
+            return JsonResponse({"detail": str(e.detail)}, status=404)
+        except Http404:
+            return JsonResponse({"detail": "No %s matches the given query." % self.model._meta.object_name}, status=404)
+
+    @staticmethod
+    def json_response(data):
+        return JsonResponse(data, encoder=JSONEncoder)
+
+    def get_serializer_context(self):
+        return {"request": self.request}
+
+    def serialize(self, data, **kwargs):
+        return self.serializer_class(data, context=self.get_serializer_context(), **kwargs).data
+
+    async def prepare(self, objects):
+        return objects
+
+
+class AsyncListView(AsyncAPIView):
+    pagination_class = KeysetPagination
+    fast_serializer_class = None
+    cache_name = None
+
+    async def get(self, request, *args, **kwargs):
+        key, entry = await response_cache.alookup(self.cache_name, request, self.user.pk)
+        if entry is not None:
+            return respond_from_cache(request, entry, self.json_response)
+        queryset = await self.get_queryset()
+        etag = conditional.strong_etag(request, self.user, await conditional.afreshness(queryset))
+        response = conditional.not_modified(request, etag)
+        if response is not None:
+            return conditional.set_validators(response, etag)
+        paginator = self.pagination_class()
+        position = paginator.start_page(request)
+        count = await queryset.acount() if paginator.include_count(request) else None
+        if self.fast_serializer_class is not None:
+            serializer = self.fast_serializer_class(context={"request": request})
+            page = paginator.page_queryset(queryset.values(*serializer.lookups), position, paginator.current_page_size)
+            results = await serializer.aserialize(paginator.finish_page([row async for row in page], count))
+        else:
+            page = paginator.page_queryset(queryset, position, paginator.current_page_size)
+            objects = await self.prepare(paginator.finish_page([obj async for obj in page], count))
+            results = self.serialize(objects, many=True)
+        data = paginator.get_paginated_data(results)
+        response_cache.store(key, data, etag)
+        response = self.json_response(data)
+        response["X-Cache"] = "MISS"
+        return conditional.set_validators(response, etag)
+
+
+class AsyncDetailView(AsyncAPIView):
+    async def get(self, request, *args, **kwargs):
+        queryset = await self.get_queryset()
+        etag = conditional.strong_etag(request, self.user, await conditional.afreshness(queryset.filter(pk=kwargs["pk"])))
+        response = conditional.not_modified(request, etag)
+        if response is not None:
+            return conditional.set_validators(response, etag)
+        try:
+            obj = await queryset.aget(pk=kwargs["pk"])
+        except self.model.DoesNotExist:
+            raise Http404
+        (obj,) = await self.prepare([obj])
+        return conditional.set_validators(JsonResponse(self.serialize(obj), encoder=JSONEncoder), etag)
+
+
+class CampaignQuerysetMixin:
+    model = ads_models.Campaign
+    serializer_class = serializers.CampaignSerializer
+
+    async def get_queryset(self):
+        return ads_models.Campaign.objects.filter(user=self.user)
+
+    async def prepare(self, objects):
+        return await ads_models.Campaign.objects.aattach_banner_stats(objects)
+
+
+class AdvertisementQuerysetMixin:
+    model = ads_models.Advertisement
+    serializer_class = serializers.AdvertisementSerializer
+
+    async def get_queryset(self):
+        if not await authz.aowns_campaign(self.user, self.kwargs["campaign_id"]):
+            raise Http404
+        return ads_models.Advertisement.objects.filter(campaign_id=self.kwargs["campaign_id"])
+
+    async def prepare(self, objects):
+        return await ads_models.Advertisement.objects.aattach_banner_stats(objects)
+
+
+class BannerQuerysetMixin:
+    model = ads_models.Banner
+    serializer_class = serializers.BannerSerializer
+
+    async def get_queryset(self):
+        if not await authz.aowns_advertisement(self.user, self.kwargs["ad_id"]):
+            raise Http404
+        return ads_models.Banner.objects.filter(advertisement_id=self.kwargs["ad_id"])
+
+    async def prepare(self, objects):
+        self.renditions = await asset_models.BannerRendition.objects.afor_sources(obj.file.name for obj in objects)
+        return objects
+
+    def get_serializer_context(self):
+        return {**super().get_serializer_context(), "renditions": self.renditions}
+
+
+class CampaignListView(CampaignQuerysetMixin, AsyncListView):
+    fast_serializer_class = fast_serializers.CampaignValuesSerializer
+    pagination_class = CampaignPagination
+    cache_name = "campaigns"
+
+
+class CampaignDetailView(CampaignQuerysetMixin, AsyncDetailView):
+    pass
+
+
+class AdvertisementListView(AdvertisementQuerysetMixin, AsyncListView):
+    fast_serializer_class = fast_serializers.AdvertisementValuesSerializer
+    cache_name = "ads"
+
+
+class AdvertisementDetailView(AdvertisementQuerysetMixin, AsyncDetailView):
+    pass
+
+
+class BannerListView(BannerQuerysetMixin, AsyncListView):
+    fast_serializer_class = fast_serializers.BannerValuesSerializer
+    cache_name = "banners"
+
+
+class BannerDetailView(BannerQuerysetMixin, AsyncDetailView):
+    pass
@@ -0,0 +1,66 @@
+import hashlib
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+
+
+def _freshness_aggregates(model):
+    aggregates = {"count": Count("pk"), "updated_at": Max("updated_at")}
+    try:
+        model._meta.get_field("stats")
+    except FieldDoesNotExist:
+        pass
+    else:
+        # banner_count и file_formats в ответе берутся из агрегатов, они меняются без правки самого объекта
+        aggregates["stats_updated_at"] = Max("stats__updated_at")
+    return aggregates
+
+
+def freshness(queryset):
+    return queryset.order_by().aggregate(**_freshness_aggregates(queryset.model))
+
+
+async def afreshness(queryset):
+    return await queryset.order_by().aaggregate(**_freshness_aggregates(queryset.model))
+
+
+def strong_etag(request, user, state):
+    """
+    Строгий ETag ответа по состоянию выборки: количество строк и время последних изменений с микросекундами.
+    В ETag входят путь с параметрами запроса и пользователь, поэтому разные страницы и владельцы не совпадают.
+
+    Last-Modified не отдаётся: max(updated_at) не сдвигается при удалении строки, а в секундах HTTP-даты
+    не различает два изменения за одну секунду, и If-Modified-Since получал бы ложный 304.
+    """
+    timestamps = [value.isoformat() for key, value in state.items() if key != "count" and value is not None]
+    key = "|".join([request.get_full_path(), str(user.pk), str(state["count"]), *timestamps])
+    return f'"{hashlib.sha1(key.encode()).hexdigest()}"'
+
+
+def not_modified(request, etag):
+    return get_conditional_response(request, etag=etag)
+
+
+def set_validators(response, etag):
+    if response.status_code in (200, 304):
+        response["ETag"] = etag
+    return response
+
+
+class ConditionalGetMixin:
+    """Отвечает 304 на условный GET по агрегату выборки, не сериализуя объекты."""
+
+    def get_freshness_queryset(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        if lookup_url_kwarg in self.kwargs:
+            queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        return queryset
+
+    def get(self, request, *args, **kwargs):
+        etag = self.etag = strong_etag(request, request.user, freshness(self.get_freshness_queryset()))
+        response = not_modified(request, etag)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        return set_validators(response, etag)
@@ -0,0 +1,93 @@
+import mimetypes
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, parse_etags
+from django.views import View
+
+from core import delivery
+from core.storage import banner_storage
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+
+class BannerAssetView(View):
+    """
+    Отдаёт файлы баннеров. Имена по sha256 содержимого неизменяемы и кешируются на год,
+    HTML отдаётся заранее сжатым вариантом, если клиент его принимает, Range отдаёт часть файла.
+    """
+
+    http_method_names = ["get", "head"]
+
+    def get(self, request, name):
+        storage = banner_storage()
+        # Сжатые варианты отдаются только через Accept-Encoding, напрямую их не запросить
+        if not name.startswith("banners/") or ".." in name.split("/") or name.endswith(delivery.VARIANT_SUFFIXES):
+            raise Http404
+        try:
+            size = storage.size(name)
+            modified = storage.get_modified_time(name)
+        except OSError:
+            raise Http404
+
+        digest = delivery.content_digest(name)
+        range_header = request.headers.get("Range")
+        # Диапазон относится к несжатому файлу: докачка сжатого варианта с другим ETag бессмысленна
+        encoding, path = (None, name) if range_header else self.choose_encoding(request, storage, name)
+        if path != name:
+            size = storage.size(path)
+        tag = digest or f"{int(modified.timestamp())}-{size}"
+        etag = f'"{tag}-{encoding}"' if encoding else f'"{tag}"'
+        last_modified = int(modified.timestamp())
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+            response = self.file_response(request, storage, path, content_type, size, etag, range_header)
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        response["Cache-Control"] = (
+            f"public, max-age={IMMUTABLE_MAX_AGE}, immutable" if digest else f"public, max-age={settings.BANNER_ASSET_MAX_AGE}"
+        )
+        response["Accept-Ranges"] = "bytes"
+        response["X-Content-Type-Options"] = "nosniff"
+        if delivery.is_compressible(name):
+            patch_vary_headers(response, ["Accept-Encoding"])
+            # HTML-креатив с того же домена, что и кабинет: sandbox отделяет его origin от cookies кабинета
+            response["Content-Security-Policy"] = "sandbox allow-scripts allow-popups"
+        if encoding:
+            response["Content-Encoding"] = encoding
+        return response
+
+    def choose_encoding(self, request, storage, name):
+        if not delivery.is_compressible(name):
+            return None, name
+        accepted = {item.split(";")[0].strip() for item in request.headers.get("Accept-Encoding", "").split(",")}
+        for encoding, suffix in delivery.ENCODINGS:
+            if encoding in accepted and storage.exists(name + suffix):
+                return encoding, name + suffix
+        return None, name
+
+    def file_response(self, request, storage, path, content_type, size, etag, range_header):
+        if range_header and not self.if_range_matches(request, etag):
+            range_header = None
+        try:
+            window = delivery.parse_range(range_header, size)
+        except delivery.RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+
+        file = storage.open(path, "rb")
+        if window is None:
+            return FileResponse(file, content_type=content_type)
+        start, end = window
+        response = FileResponse(delivery.RangeFile(file, start, end), content_type=content_type, status=206)
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        return response
+
+    def if_range_matches(self, request, etag):
+        if_range = request.headers.get("If-Range")
+        # Диапазон по дате не проверяется: сильный ETag есть у всех ответов
+        return if_range is None or etag in parse_etags(if_range)
@@ -0,0 +1,139 @@
+from decimal import Decimal
+
+from django.core.files.storage import default_storage
+from django.db import models
+
+from api import serializers
+from core import renditions
+from core.models import assets as asset_models
+from core.models.stats import mask_to_formats
+
+
+def _decimal(field):
+    exponent = Decimal(1).scaleb(-field.decimal_places)
+
+    def to_representation(value):
+        return None if value is None else format(value.quantize(exponent), "f")
+
+    return to_representation
+
+
+def _date(value):
+    return None if value is None else value.isoformat()
+
+
+def _file(storage, request):
+    # Относительные url дополняются схемой и хостом один раз на страницу, а не build_absolute_uri на каждый баннер
+    base = request.build_absolute_uri("/")[:-1] if request is not None else ""
+
+    def to_representation(value):
+        if not value:
+            return None
+        url = storage.url(value)
+        return base + url if base and url.startswith("/") else url
+
+    return to_representation
+
+
+class ValuesSerializer:
+    """
+    Read-only сериализатор списков по строкам .values(): повторяет поля и формат serializer_class
+    (Decimal строкой, даты в ISO 8601, файлы абсолютным url), но без DRF-полей на каждый объект.
+    Поля, которых нет в модели, описываются в computed как (lookup, функция).
+    """
+
+    serializer_class = None
+    computed = {}
+    cursor_fields = ("created_at", "id")
+
+    def __init__(self, context=None):
+        self.context = context or {}
+        model = self.serializer_class.Meta.model
+        self.columns = []
+        for name in self.serializer_class.Meta.fields:
+            if name in self.computed:
+                self.columns.append((name, *self.computed[name]))
+            else:
+                self.columns.append((name, *self.model_column(model._meta.get_field(name))))
+
+    def model_column(self, field):
+        if isinstance(field, models.ForeignKey):
+            return field.attname, None
+        if isinstance(field, models.DecimalField):
+            return field.name, _decimal(field)
+        if isinstance(field, models.DateField) and not isinstance(field, models.DateTimeField):
+            return field.name, _date
+        if isinstance(field, models.FileField):
+            return field.name, _file(field.storage or default_storage, self.context.get("request"))
+        return field.name, None
+
+    @property
+    def lookups(self):
+        return list(dict.fromkeys([*(lookup for _, lookup, _ in self.columns), *self.cursor_fields]))
+
+    def to_representation(self, row):
+        return {name: row[lookup] if func is None else func(row[lookup]) for name, lookup, func in self.columns}
+
+    def serialize(self, rows):
+        return [self.to_representation(row) for row in rows]
+
+    async def aserialize(self, rows):
+        return self.serialize(rows)
+
+
+def _banner_count(value):
+    return value or 0
+
+
+def _file_formats(value):
+    return mask_to_formats(value or 0)
+
+
+STATS_COLUMNS = {
+    "banner_count": ("stats__banner_count", _banner_count),
+    "file_formats": ("stats__format_mask", _file_formats),
+}
+
+
+class CampaignValuesSerializer(ValuesSerializer):
+    serializer_class = serializers.CampaignSerializer
+    computed = STATS_COLUMNS
+
+
+class AdvertisementValuesSerializer(ValuesSerializer):
+    serializer_class = serializers.AdvertisementSerializer
+    computed = STATS_COLUMNS
+
+
+class BannerValuesSerializer(ValuesSerializer):
+    serializer_class = serializers.BannerSerializer
+    # Копии берутся одним запросом на страницу в serialize, здесь только имя исходного файла
+    computed = {"renditions": ("file", None)}
+
+    def attach_renditions(self, data, rows, found):
+        request = self.context.get("request")
+        for item, row in zip(data, rows):
+            item["renditions"] = renditions.urls(found.get(row["file"], {}), request)
+        return data
+
+    def serialize(self, rows):
+        found = asset_models.BannerRendition.objects.for_sources(row["file"] for row in rows)
+        return self.attach_renditions(super().serialize(rows), rows, found)
+
+    async def aserialize(self, rows):
+        found = await asset_models.BannerRendition.objects.afor_sources(row["file"] for row in rows)
+        return self.attach_renditions(super().serialize(rows), rows, found)
+
+
+class ValuesListMixin:
+    """Список через fast_serializer_class, если он задан у представления; запись и детальные ответы не меняются."""
+
+    fast_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        if self.fast_serializer_class is None:
+            return super().list(request, *args, **kwargs)
+        serializer = self.fast_serializer_class(context=self.get_serializer_context())
+        queryset = self.filter_queryset(self.get_queryset()).values(*serializer.lookups)
+        page = self.paginator.paginate_queryset(queryset, request, view=self)
+        return self.get_paginated_response(serializer.serialize(page))
@@ -0,0 +1,244 @@
+import csv
+import io
+import json
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from rest_framework import serializers as drf_serializers
+
+from api import serializers
+from core import outbox, renditions
+from core.export import FORMATS
+from core.models import ads as ads_models
+from core.models import assets as asset_models
+from core.models import imports as import_models
+from core.models import stats as stats_models
+from core.signals import bulk_changes
+
+BATCH_SIZE = 1000
+
+CAMPAIGN_COLUMNS = {
+    "campaign_name": "name",
+    "start_date": "start_date",
+    "end_date": "end_date",
+    "budget": "budget",
+    "strategy": "strategy",
+    "max_impressions_per_day": "max_impressions_per_day",
+    "targeting": "targeting",
+}
+ADVERTISEMENT_COLUMNS = {
+    "advertisement_name": "name",
+    "place": "place",
+    "url": "url",
+    "description": "description",
+}
+BANNER_COLUMNS = {
+    "uid": "uid",
+    "width": "width",
+    "height": "height",
+    "file": "file",
+    "is_active": "is_active",
+}
+
+
+def read_rows(file, input_format):
+    """Построчно разбирает текстовый поток в словари. Пустые значения CSV считаются отсутствующими."""
+    if input_format == "csv":
+        for row in csv.DictReader(file):
+            row = {column: value for column, value in row.items() if value not in ("", None)}
+            if isinstance(row.get("targeting"), str):
+                try:
+                    row["targeting"] = json.loads(row["targeting"])
+                except ValueError:
+                    pass
+            yield row
+        return
+    for line in file:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            row = {"__error__": f"Некорректный JSON: {e}"}
+        if not isinstance(row, dict):
+            row = {"__error__": "Строка должна быть объектом"}
+        yield {column: value for column, value in row.items() if value is not None}
+
+
+def text_stream(file):
+    return io.TextIOWrapper(file, encoding="utf-8", newline="")
+
+
+def detect_format(name, default="csv"):
+    extension = str(name).rsplit(".", 1)[-1].lower()
+    return extension if extension in FORMATS else default
+
+
+def _pick(row, columns):
+    return {field: row[column] for column, field in columns.items() if column in row}
+
+
+class CampaignImporter:
+    """
+    Импорт дерева кампаний в формате выгрузки export_campaigns. Строки одной кампании (и одного
+    объявления) должны идти подряд, как в выгрузке: исходные campaign_id/advertisement_id связывают
+    строки между собой. Каждая пачка пишется одной транзакцией вместе с контрольной точкой,
+    поэтому прерванный импорт продолжается с последней записанной строки.
+    """
+
+    def __init__(self, user, batch_size=BATCH_SIZE, checkpoint=None, on_error=None):
+        self.user = user
+        self.batch_size = batch_size
+        self.checkpoint = checkpoint
+        self.on_error = on_error or (lambda row_number, errors: None)
+        self.counts = {"campaigns": 0, "advertisements": 0, "banners": 0, "failed": 0, "skipped": 0}
+        self.campaign_serializer = serializers.CampaignSerializer()
+        self.ad_serializer = serializers.AdvertisementSerializer()
+        self.banner_serializer = serializers.BannerBulkSerializer()
+        state = checkpoint.state if checkpoint else {}
+        # (исходный ключ, id созданного объекта) последней кампании и объявления, переживает границу пачки
+        self.current_campaign = self._restore(state.get("campaign"), ads_models.Campaign)
+        self.current_ad = self._restore(state.get("advertisement"), ads_models.Advertisement)
+
+    def run(self, rows):
+        start = self.checkpoint.position if self.checkpoint else 0
+        batch = []
+        for row_number, row in enumerate(rows, start=1):
+            if row_number <= start:
+                self.counts["skipped"] += 1
+                continue
+            batch.append((row_number, row))
+            if len(batch) >= self.batch_size:
+                self._write(batch)
+                batch = []
+        if batch:
+            self._write(batch)
+        return self.counts
+
+    def _validate(self, serializer, data):
+        try:
+            return serializer.run_validation(data), None
+        except drf_serializers.ValidationError as e:
+            return None, e.detail
+
+    def _campaign(self, row):
+        data, errors = self._validate(self.campaign_serializer, _pick(row, CAMPAIGN_COLUMNS))
+        if errors:
+            return None, errors
+        campaign = ads_models.Campaign(**data, user=self.user)
+        try:
+            campaign.clean()
+        except DjangoValidationError as e:
+            return None, {"non_field_errors": e.messages}
+        return campaign, None
+
+    def _write(self, batch):
+        campaigns, ads, banners = [], [], []
+        uids = {row["uid"] for _, row in batch if isinstance(row.get("uid"), str)}
+        taken = set(ads_models.Banner.objects.filter(uid__in=uids).values_list("uid", flat=True))
+
+        for row_number, row in batch:
+            if "__error__" in row:
+                self._fail(row_number, {"non_field_errors": [row["__error__"]]})
+                continue
+            campaign_key = row.get("campaign_id", f"row-{row_number}")
+            campaign = self.current_campaign[1] if self.current_campaign[0] == campaign_key else None
+            new_campaign = None
+            if campaign is None:
+                new_campaign, errors = self._campaign(row)
+                if errors:
+                    self._fail(row_number, {"campaign": errors})
+                    continue
+
+            ad_columns = _pick(row, ADVERTISEMENT_COLUMNS)
+            ad_key = row.get("advertisement_id", f"row-{row_number}")
+            ad = self.current_ad[1] if new_campaign is None and self.current_ad[0] == ad_key else None
+            new_ad = None
+            if ad is None and ad_columns:
+                data, errors = self._validate(self.ad_serializer, ad_columns)
+                if errors:
+                    self._fail(row_number, {"advertisement": errors})
+                    continue
+                new_ad = ads_models.Advertisement(**data)
+
+            new_banner = None
+            banner_columns = _pick(row, BANNER_COLUMNS)
+            if banner_columns:
+                if ad is None and new_ad is None:
+                    self._fail(row_number, {"advertisement": ["Баннер без объявления"]})
+                    continue
+                data, errors = self._validate(self.banner_serializer, banner_columns)
+                if not errors and data["uid"] in taken:
+                    errors = {"uid": ["Баннер с таким uid уже существует."]}
+                if errors:
+                    self._fail(row_number, {"banner": errors})
+                    continue
+                taken.add(data["uid"])
+                new_banner = ads_models.Banner(**data)
+
+            if new_campaign is not None:
+                campaigns.append(new_campaign)
+                campaign = new_campaign
+                self.current_campaign = (campaign_key, campaign)
+            if new_ad is not None:
+                new_ad.campaign = campaign
+                ads.append(new_ad)
+                ad = new_ad
+                self.current_ad = (ad_key, ad)
+            if new_banner is not None:
+                new_banner.advertisement = ad
+                banners.append(new_banner)
+
+        with transaction.atomic(), bulk_changes() as changes:
+            ads_models.Campaign.objects.bulk_create(campaigns, batch_size=self.batch_size)
+            stats_models.CampaignStats.objects.bulk_create(
+                [stats_models.CampaignStats(campaign=campaign) for campaign in campaigns], batch_size=self.batch_size
+            )
+            ads_models.Advertisement.objects.bulk_create(ads, batch_size=self.batch_size)
+            stats_models.AdvertisementStats.objects.bulk_create(
+                [stats_models.AdvertisementStats(advertisement=ad) for ad in ads], batch_size=self.batch_size
+            )
+            ads_models.Banner.objects.bulk_create(banners, batch_size=self.batch_size)
+            asset_models.BannerBlob.objects.acquire(banner.file.name for banner in banners)
+            renditions.schedule(banner.file.name for banner in banners)
+
+            changes["campaigns"].update(campaign.pk for campaign in campaigns)
+            changes["campaigns"].update(ad.campaign_id for ad in ads)
+            changes["advertisements"].update(banner.advertisement_id for banner in banners)
+            changes["outbox"].extend(outbox.entry(obj, outbox.Action.CREATED) for obj in [*campaigns, *ads, *banners])
+            if self.checkpoint:
+                self.checkpoint.position = batch[-1][0]
+                self.checkpoint.state = {
+                    "campaign": self._checkpoint_key(self.current_campaign),
+                    "advertisement": self._checkpoint_key(self.current_ad),
+                }
+                self.checkpoint.save()
+
+        self.counts["campaigns"] += len(campaigns)
+        self.counts["advertisements"] += len(ads)
+        self.counts["banners"] += len(banners)
+
+    @staticmethod
+    def _restore(saved, model):
+        if not saved:
+            return None, None
+        key, pk = saved
+        return key, model(pk=pk)
+
+    @staticmethod
+    def _checkpoint_key(current):
+        key, obj = current
+        return [key, obj.pk] if obj is not None else None
+
+    def _fail(self, row_number, errors):
+        self.counts["failed"] += 1
+        self.on_error(row_number, errors)
+
+
+def get_checkpoint(name, restart=False):
+    checkpoint, _ = import_models.ImportCheckpoint.objects.get_or_create(name=name)
+    if restart:
+        checkpoint.position = 0
+        checkpoint.state = {}
+        checkpoint.save()
+    return checkpoint
@@ -0,0 +1,51 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api import fast_serializers
+from core.models import ads as ads_models
+
+SERIALIZERS = {
+    "campaign": fast_serializers.CampaignValuesSerializer,
+    "advertisement": fast_serializers.AdvertisementValuesSerializer,
+    "banner": fast_serializers.BannerValuesSerializer,
+}
+
+
+class Command(BaseCommand):
+    help = "Сравнивает стоимость сериализации одного объекта: ModelSerializer против сериализатора по .values()"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--model", choices=list(SERIALIZERS), default="campaign")
+        parser.add_argument("--limit", type=int, default=100, help="Размер страницы")
+        parser.add_argument("--repeat", type=int, default=50)
+
+    def handle(self, *args, **options):
+        fast_class = SERIALIZERS[options["model"]]
+        model = fast_class.serializer_class.Meta.model
+        # Без запроса оба сериализатора отдают относительные url файлов, хост в замер не входит
+        context = {}
+
+        objects = list(model.objects.order_by("-created_at", "-id")[: options["limit"]])
+        if isinstance(model.objects, ads_models.BannerStatsQuerySet):
+            model.objects.attach_banner_stats(objects)
+        fast = fast_class(context=context)
+        rows = list(model.objects.order_by("-created_at", "-id").values(*fast.lookups)[: options["limit"]])
+        if not rows:
+            self.stdout.write("Нет объектов для сериализации")
+            return
+
+        started = time.perf_counter()
+        for _ in range(options["repeat"]):
+            fast_class.serializer_class(objects, many=True, context=context).data
+        model_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for _ in range(options["repeat"]):
+            fast_class(context=context).serialize(rows)
+        fast_time = time.perf_counter() - started
+
+        items = len(rows) * options["repeat"]
+        self.stdout.write(f"{fast_class.serializer_class.__name__}: {model_time / items * 1e6:.1f} мкс на объект")
+        self.stdout.write(f"{fast_class.__name__}: {fast_time / items * 1e6:.1f} мкс на объект")
+        self.stdout.write(f"Ускорение: x{model_time / fast_time:.1f}")
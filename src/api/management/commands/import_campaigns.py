@@ -0,0 +1,39 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from api import imports
+from core.export import FORMATS
+
+
+class Command(BaseCommand):
+    help = "Потоково импортирует кампании, объявления и баннеры из CSV или NDJSON пачками с контрольными точками"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Файл в формате выгрузки export_campaigns")
+        parser.add_argument("username", help="Владелец создаваемых кампаний")
+        parser.add_argument("--format", choices=list(FORMATS), dest="input_format", help="По умолчанию по расширению")
+        parser.add_argument("--batch-size", type=int, default=imports.BATCH_SIZE, help="Строк в одной транзакции")
+        parser.add_argument("--checkpoint", help="Имя контрольной точки, по умолчанию путь к файлу и пользователь")
+        parser.add_argument("--restart", action="store_true", help="Начать с начала файла, игнорируя контрольную точку")
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(username=options["username"])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"Пользователь {options['username']} не найден")
+
+        checkpoint = imports.get_checkpoint(
+            options["checkpoint"] or f"{options['path']}:{user.username}", restart=options["restart"]
+        )
+        importer = imports.CampaignImporter(
+            user, batch_size=options["batch_size"], checkpoint=checkpoint, on_error=self.report_error
+        )
+        with open(options["path"], encoding="utf-8", newline="") as file:
+            counts = importer.run(imports.read_rows(file, options["input_format"] or imports.detect_format(options["path"])))
+        self.stdout.write(
+            f"Кампаний: {counts['campaigns']}, объявлений: {counts['advertisements']}, баннеров: {counts['banners']}, "
+            f"ошибок: {counts['failed']}, пропущено по контрольной точке: {counts['skipped']}"
+        )
+
+    def report_error(self, row_number, errors):
+        self.stderr.write(f"Строка {row_number}: {errors}")
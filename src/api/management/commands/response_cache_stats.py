@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from api.response_cache import response_cache
+
+
+class Command(BaseCommand):
+    help = "Показывает попадания и промахи кеша страниц списков"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reset", action="store_true", help="Обнулить счётчики после вывода")
+
+    def handle(self, *args, **options):
+        for name, metrics in response_cache.metrics().items():
+            self.stdout.write(
+                f"{name}: попаданий {metrics['hits']}, промахов {metrics['misses']}, доля попаданий {metrics['hit_ratio']:.1%}"
+            )
+        if options["reset"]:
+            response_cache.reset_metrics()
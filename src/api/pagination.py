@@ -1,7 +1,113 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import binascii
 
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
-class CampaignPagination(PageNumberPagination):
+
+class KeysetPagination(BasePagination):
+    """
+    Пагинация по ключу (created_at, id) от новых к старым: страница выбирается условием
+    по индексу вместо OFFSET, поэтому глубина листания не влияет на стоимость запроса.
+    Общее количество можно отключить параметром ?count=false.
+    """
+
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = None
+    max_page_size = None
+    cursor_query_param = "cursor"
+    count_query_param = "count"
+    invalid_cursor_message = "Invalid cursor"
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                size = int(request.GET[self.page_size_query_param])
+                if size > 0:
+                    return min(size, self.max_page_size) if self.max_page_size else size
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    def include_count(self, request):
+        return request.GET.get(self.count_query_param, "true").lower() not in ("0", "false")
+
+    def decode_cursor(self, request):
+        encoded = request.GET.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            created_at, pk = base64.urlsafe_b64decode(encoded.encode()).decode().rsplit("|", 1)
+            position = parse_datetime(created_at), int(pk)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if position[0] is None:
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def encode_cursor(self, obj):
+        # Страница может состоять из объектов или из строк .values()
+        created_at, pk = (obj["created_at"], obj["id"]) if isinstance(obj, dict) else (obj.created_at, obj.pk)
+        return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{pk}".encode()).decode()
+
+    def page_queryset(self, queryset, position, page_size):
+        queryset = queryset.order_by("-created_at", "-id")
+        if position is not None:
+            created_at, pk = position
+            queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+        return queryset[: page_size + 1]
+
+    def start_page(self, request):
+        self.request = request
+        self.current_page_size = self.get_page_size(request)
+        return self.decode_cursor(request)
+
+    def finish_page(self, objects, count=None):
+        self.count = count
+        self.next_cursor = None
+        if len(objects) > self.current_page_size:
+            self.next_cursor = self.encode_cursor(objects[self.current_page_size - 1])
+        return objects[: self.current_page_size]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        position = self.start_page(request)
+        count = queryset.count() if self.include_count(request) else None
+        return self.finish_page(list(self.page_queryset(queryset, position, self.current_page_size)), count)
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor)
+
+    def get_first_link(self):
+        return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+
+    def get_paginated_data(self, data):
+        payload = {"count": self.count} if self.count is not None else {}
+        return {**payload, "next": self.get_next_link(), "first": self.get_first_link(), "results": data}
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "count": {"type": "integer"},
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "first": {"type": "string", "format": "uri"},
+                "results": schema,
+            },
+        }
+
+
+class CampaignPagination(KeysetPagination):
     page_size = 10
     page_size_query_param = "page_size"
     max_page_size = 100
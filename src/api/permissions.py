@@ -0,0 +1,25 @@
+from rest_framework.permissions import DjangoModelPermissions
+
+from core import authz
+from core.models import ads as ads_models
+
+
+class CachedDjangoModelPermissions(DjangoModelPermissions):
+    """DjangoModelPermissions, проверяющий права по закешированному набору пользователя."""
+
+    def has_permission(self, request, view):
+        if not request.user or (not request.user.is_authenticated and self.authenticated_users_only):
+            return False
+        if getattr(view, "_ignore_model_permissions", False):
+            return True
+
+        queryset = self._queryset(view)
+        perms = self.get_required_permissions(request.method, queryset.model)
+        return authz.has_perms(request.user, perms)
+
+
+class BannerUploadPermissions(CachedDjangoModelPermissions):
+    """Каждый шаг загрузки по частям ведёт к созданию баннера, поэтому везде нужно право на его добавление."""
+
+    def get_required_permissions(self, method, model_cls):
+        return super().get_required_permissions("POST", ads_models.Banner)
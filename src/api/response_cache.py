@@ -0,0 +1,93 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from rest_framework.response import Response
+
+from api import conditional
+from core import generations
+
+LISTINGS = ("campaigns", "ads", "banners")
+
+
+class ResponseCache:
+    """
+    Кеш сериализованных страниц списков. Ключ включает пользователя, путь с курсором и поколение
+    дерева пользователя, поэтому запись в дерево делает старые страницы недостижимыми за O(1),
+    а вытесняет их сам бэкенд кеша по LRU и TTL.
+    """
+
+    # Меняется вместе с форматом записи, чтобы записи прежнего формата не читались
+    version = 2
+
+    def __init__(self, alias=None):
+        self.alias = alias
+
+    @property
+    def cache(self):
+        return caches[self.alias or settings.RESPONSE_CACHE_ALIAS]
+
+    def key(self, name, user_id, generation, request):
+        path = hashlib.sha1(request.get_full_path().encode()).hexdigest()
+        return f"listing:{self.version}:{name}:{user_id}:{generation}:{path}"
+
+    def record(self, name, hit):
+        key = f"response-cache:{name}:{'hits' if hit else 'misses'}"
+        # Счётчики лежат в общем кеше, чтобы их не вытеснили страницы и видели все воркеры
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+    def metrics(self):
+        counters = cache.get_many([f"response-cache:{name}:{kind}" for name in LISTINGS for kind in ("hits", "misses")])
+        metrics = {}
+        for name in LISTINGS:
+            hits = counters.get(f"response-cache:{name}:hits", 0)
+            misses = counters.get(f"response-cache:{name}:misses", 0)
+            metrics[name] = {"hits": hits, "misses": misses, "hit_ratio": hits / (hits + misses) if hits + misses else 0.0}
+        return metrics
+
+    def reset_metrics(self):
+        cache.delete_many([f"response-cache:{name}:{kind}" for name in LISTINGS for kind in ("hits", "misses")])
+
+    def lookup(self, name, request, user_id):
+        key = self.key(name, user_id, generations.current(user_id), request)
+        entry = self.cache.get(key)
+        self.record(name, entry is not None)
+        return key, entry
+
+    async def alookup(self, name, request, user_id):
+        key = self.key(name, user_id, await generations.acurrent(user_id), request)
+        entry = await self.cache.aget(key)
+        self.record(name, entry is not None)
+        return key, entry
+
+    def store(self, key, data, etag):
+        self.cache.set(key, (data, etag))
+
+
+response_cache = ResponseCache()
+
+
+def respond_from_cache(request, entry, response_class=Response):
+    data, etag = entry
+    response = conditional.not_modified(request, etag) or response_class(data)
+    response["X-Cache"] = "HIT"
+    return conditional.set_validators(response, etag)
+
+
+class CachedListMixin:
+    """Отдаёт страницу списка из response_cache без обращения к базе. Ставится перед ConditionalGetMixin."""
+
+    cache_name = None
+
+    def get(self, request, *args, **kwargs):
+        key, entry = response_cache.lookup(self.cache_name, request, request.user.pk)
+        if entry is not None:
+            return respond_from_cache(request, entry)
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            response_cache.store(key, response.data, self.etag)
+        response["X-Cache"] = "MISS"
+        return response
@@ -1,9 +1,37 @@
+import posixpath
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files import File
+from django.core.validators import FileExtensionValidator
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from rest_framework import serializers
 
+from core import events, renditions
+from core.imagesize import resolve_dimensions
 from core.models import ads as ads_models
+from core.models import assets as asset_models
+from core.models import events as events_models
+from core.rollups import LEVELS
+from core.storage import banner_storage
+from core.targeting import validate_targeting
+
+
+class BannerStatsSerializerMixin(serializers.Serializer):
+    banner_count = serializers.SerializerMethodField()
+    file_formats = serializers.SerializerMethodField()
+
+    def get_banner_count(self, obj):
+        return getattr(obj, "banner_count", 0)
+
+    def get_file_formats(self, obj):
+        return getattr(obj, "file_formats", [])
 
 
-class CampaignSerializer(serializers.ModelSerializer):
+class CampaignSerializer(BannerStatsSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = ads_models.Campaign
         fields = [
@@ -16,9 +44,17 @@ class CampaignSerializer(serializers.ModelSerializer):
             "strategy",
             "max_impressions_per_day",
             "targeting",
+            "banner_count",
+            "file_formats",
         ]
         read_only_fields = ["id", "user"]
 
+    def validate_targeting(self, value):
+        try:
+            return validate_targeting(value)
+        except DjangoValidationError as e:
+            raise serializers.ValidationError(e.messages)
+
     def validate(self, data):
         start = data["start_date"]
         end = data["end_date"]
@@ -40,7 +76,7 @@ class CampaignSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class AdvertisementSerializer(serializers.ModelSerializer):
+class AdvertisementSerializer(BannerStatsSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = ads_models.Advertisement
         fields = [
@@ -50,11 +86,15 @@ class AdvertisementSerializer(serializers.ModelSerializer):
             "place",
             "url",
             "description",
+            "banner_count",
+            "file_formats",
         ]
         read_only_fields = ["id", "campaign"]
 
 
 class BannerSerializer(serializers.ModelSerializer):
+    renditions = serializers.SerializerMethodField()
+
     class Meta:
         model = ads_models.Banner
         fields = [
@@ -65,5 +105,126 @@ class BannerSerializer(serializers.ModelSerializer):
             "height",
             "file",
             "is_active",
+            "renditions",
         ]
         read_only_fields = ["id", "advertisement"]
+        extra_kwargs = {"width": {"required": False}, "height": {"required": False}}
+
+    def get_renditions(self, obj):
+        # Списки передают копии всей страницы в context["renditions"], иначе один запрос на баннер
+        found = self.context.get("renditions")
+        if found is None:
+            found = asset_models.BannerRendition.objects.for_sources([obj.file.name])
+        return renditions.urls(found.get(obj.file.name, {}), self.context.get("request"))
+
+    def open_file(self, data):
+        if "file" in data:
+            return nullcontext(data["file"])
+        return self.instance.file.open("rb") if self.instance is not None else nullcontext(None)
+
+    def validate(self, data):
+        if not {"file", "width", "height"} & data.keys() or ("file" not in data and self.instance is None):
+            return data
+        width, height = data.get("width"), data.get("height")
+        if "file" not in data and self.instance is not None:
+            width = self.instance.width if width is None else width
+            height = self.instance.height if height is None else height
+        try:
+            opened = self.open_file(data)
+        except OSError:
+            # Пропавший из хранилища файл не мешает править размеры вручную
+            opened = nullcontext(None)
+        try:
+            with opened as file:
+                data["width"], data["height"] = resolve_dimensions(file, width, height)
+        except DjangoValidationError as e:
+            raise serializers.ValidationError(e.message_dict)
+        # Размеры из заголовка файла не прошли валидаторы полей сериализатора
+        errors = {}
+        for field in ("width", "height"):
+            try:
+                ads_models.Banner._meta.get_field(field).run_validators(data[field])
+            except DjangoValidationError as e:
+                errors[field] = e.messages
+        if errors:
+            raise serializers.ValidationError(errors)
+        return data
+
+
+class BannerBulkSerializer(BannerSerializer):
+    # Уникальность uid проверяется одним запросом на всю пачку, а не запросом на каждый элемент
+    uid = serializers.CharField(max_length=255)
+    file = serializers.CharField(max_length=100)
+
+    def validate_file(self, value):
+        FileExtensionValidator(allowed_extensions=ads_models.ALLOWED_EXTENSIONS)(File(None, name=value))
+        if not value.startswith("banners/") or not banner_storage().exists(value):
+            raise serializers.ValidationError("Файл не найден в хранилище")
+        return value
+
+    def open_file(self, data):
+        if "file" in data:
+            return banner_storage().open(data["file"])
+        return super().open_file(data)
+
+
+class BannerUploadSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = asset_models.BannerUpload
+        fields = ["id", "advertisement", "filename", "size", "offset", "banner", "created_at"]
+        read_only_fields = ["id", "advertisement", "offset", "banner", "created_at"]
+
+    def validate_filename(self, value):
+        value = posixpath.basename(value.replace("\\", "/"))
+        FileExtensionValidator(allowed_extensions=ads_models.ALLOWED_EXTENSIONS)(File(None, name=value))
+        return value
+
+    def validate_size(self, value):
+        if not 0 < value <= settings.BANNER_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(f"Размер файла должен быть от 1 до {settings.BANNER_UPLOAD_MAX_SIZE} байт")
+        return value
+
+
+class DecisionQuerySerializer(serializers.Serializer):
+    place = serializers.ChoiceField(choices=ads_models.Advertisement.Placement.choices)
+    width = serializers.IntegerField(min_value=1)
+    height = serializers.IntegerField(min_value=1)
+
+
+class DeliveryEventSerializer(serializers.Serializer):
+    """Событие по токену из ответа /api/decide; баннер, идентификатор и время события задаёт сервер."""
+
+    token = serializers.CharField()
+    kind = serializers.ChoiceField(choices=events_models.DeliveryEvent.Kind.choices)
+
+    def validate_token(self, value):
+        try:
+            return events.open_token(value)
+        except signing.BadSignature:
+            raise serializers.ValidationError("Недействительный или просроченный токен события")
+
+    def validate(self, data):
+        return {
+            "event_id": events.event_id(data["token"]["decision"], data["kind"]),
+            "uid": data["token"]["uid"],
+            "kind": data["kind"],
+            "occurred_at": timezone.now(),
+        }
+
+
+class DateOrDateTimeField(serializers.DateTimeField):
+    def to_internal_value(self, value):
+        if isinstance(value, str) and parse_date(value):
+            value = f"{value}T00:00"
+        return super().to_internal_value(value)
+
+
+class DeliveryStatsQuerySerializer(serializers.Serializer):
+    start = DateOrDateTimeField()
+    end = DateOrDateTimeField()
+    level = serializers.ChoiceField(choices=list(LEVELS), default="campaign")
+
+    def validate(self, data):
+        if data["end"] <= data["start"]:
+            raise serializers.ValidationError("Конец периода должен быть позже начала")
+        return data
@@ -0,0 +1,82 @@
+import asyncio
+import importlib
+
+import pytest
+from django.urls import clear_url_caches, resolve, reverse
+
+import api.urls
+import test_x5.urls
+
+
+def reload_urls(settings, enabled):
+    settings.API_ASYNC_VIEWS = enabled
+    importlib.reload(api.urls)
+    importlib.reload(test_x5.urls)
+    clear_url_caches()
+
+
+@pytest.fixture
+def async_api(settings):
+    reload_urls(settings, True)
+    yield
+    reload_urls(settings, False)
+
+
+@pytest.fixture
+def session_client(simple_api_client, user, user_view_group):
+    simple_api_client.force_login(user)
+    return simple_api_client
+
+
+def fetch(client, url, **params):
+    response = client.get(url, params)
+    return response.status_code, response.json(), response.get("ETag")
+
+
+@pytest.mark.parametrize(
+    "url_name, args",
+    [
+        ("api:campaigns", lambda b: []),
+        ("api:campaign_detail", lambda b: [b.advertisement.campaign_id]),
+        ("api:ads", lambda b: [b.advertisement.campaign_id]),
+        ("api:ad_detail", lambda b: [b.advertisement.campaign_id, b.advertisement_id]),
+        ("api:banners", lambda b: [b.advertisement_id]),
+        ("api:banner_detail", lambda b: [b.advertisement_id, b.id]),
+    ],
+)
+@pytest.mark.django_db(transaction=True)
+def test_async_views_match_sync_views(session_client, banners, settings, url_name, args):
+    url = reverse(url_name, args=args(banners[0]))
+    sync_result = fetch(session_client, url)
+
+    reload_urls(settings, True)
+    try:
+        assert asyncio.iscoroutinefunction(resolve(url).func)
+        async_result = fetch(session_client, url)
+    finally:
+        reload_urls(settings, False)
+
+    assert sync_result[0] == 200
+    assert async_result == sync_result
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_views_pagination_and_errors(async_api, session_client, simple_api_client, campaign, campaign_super_user):
+    status, data, _ = fetch(session_client, reverse("api:campaigns"), cursor="broken")
+    assert status == 404
+
+    status, data, _ = fetch(session_client, reverse("api:ads", args=[campaign_super_user.id]))
+    assert status == 404
+
+    session_client.logout()
+    status, data, _ = fetch(simple_api_client, reverse("api:campaigns"))
+    assert status == 403
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_views_delegate_writes(async_api, simple_api_client, super_user):
+    simple_api_client.force_login(super_user)
+    data = {"name": "Async", "start_date": "2026-01-01", "end_date": "2026-01-02", "budget": 10, "strategy": "evenly"}
+    response = simple_api_client.post(reverse("api:campaigns"), data, format="json")
+
+    assert response.status_code == 201
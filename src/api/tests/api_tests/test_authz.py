@@ -0,0 +1,78 @@
+import pytest
+from django.contrib.auth.models import Permission
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import authz
+from core.models import ads as ad_models
+
+
+@pytest.mark.django_db
+def test_banner_detail_single_query(auth_client, user_view_group, advertisement, banners, django_assert_num_queries):
+    url = reverse("api:banner_detail", args=[advertisement.id, banners[0].id])
+    assert auth_client.get(url).status_code == 200
+
+    # Агрегат для ETag, сам баннер и его копии, без join'ов проверки владения и запросов прав
+    with django_assert_num_queries(3):
+        response = auth_client.get(url)
+
+    assert response.status_code == 200
+    assert response.data["uid"] == banners[0].uid
+
+
+@pytest.mark.django_db
+def test_foreign_advertisement_not_found(auth_client, user_view_group, super_user, campaign_super_user):
+    ad = ad_models.Advertisement.objects.create(
+        name="ad", campaign=campaign_super_user, place="site", url="https://example.com", description="-"
+    )
+    response = auth_client.get(reverse("api:banners", args=[ad.id]))
+
+    assert response.status_code == 404
+
+
+@pytest.mark.django_db
+def test_new_advertisement_visible_without_invalidation(auth_client, user_view_group, campaign, advertisement):
+    assert authz.owns_advertisement(advertisement.campaign.user, advertisement.id)
+    ad = ad_models.Advertisement.objects.create(
+        name="ad", campaign=campaign, place="site", url="https://example.com", description="-"
+    )
+
+    assert auth_client.get(reverse("api:banners", args=[ad.id])).status_code == 200
+
+
+@pytest.mark.django_db
+def test_campaign_transfer_revokes_ownership(
+    auth_client, user_view_group, user, super_user, advertisement, banners, django_capture_on_commit_callbacks
+):
+    url = reverse("api:banners", args=[advertisement.id])
+    assert auth_client.get(url).status_code == 200
+
+    campaign = ad_models.Campaign.objects.get(pk=advertisement.campaign_id)
+    with django_capture_on_commit_callbacks(execute=True), CaptureQueriesContext(connection) as queries:
+        campaign.user = super_user
+        campaign.save()
+        # Прежний владелец берётся из загруженной строки, а кеш сбрасывается только после коммита
+        assert not [query for query in queries if query["sql"].startswith('SELECT "core_campaign"."user_id"')]
+        assert campaign.loaded_value("user_id") == super_user.id
+        assert authz.owns_campaign(user, campaign.id)
+
+    assert auth_client.get(url).status_code == 404
+
+
+@pytest.mark.django_db
+def test_permission_change_invalidates_cache(auth_client, user, user_view_group):
+    user.user_permissions.add(Permission.objects.get(codename="delete_campaign"))
+    campaigns = [
+        ad_models.Campaign.objects.create(
+            name=f"Campaign {i}", start_date="2024-01-01", end_date="2024-01-02", budget=1, strategy="evenly", user=user
+        )
+        for i in range(2)
+    ]
+    assert auth_client.delete(reverse("api:campaign_detail", args=[campaigns[0].id])).status_code == 204
+
+    user.user_permissions.remove(Permission.objects.get(codename="delete_campaign"))
+    # Каждый запрос загружает пользователя заново, как и в реальной сессии
+    auth_client.force_authenticate(user=type(user).objects.get(pk=user.pk))
+
+    assert auth_client.delete(reverse("api:campaign_detail", args=[campaigns[1].id])).status_code == 403
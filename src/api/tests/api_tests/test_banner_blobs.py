@@ -0,0 +1,92 @@
+import io
+import struct
+
+import pytest
+from django.contrib.auth.models import Permission
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.urls import reverse
+
+from core.models import ads as ad_models
+from core.models import assets as asset_models
+from core.storage import banner_storage
+
+
+@pytest.fixture
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    return tmp_path
+
+
+@pytest.fixture
+def user_banner_permissions(user):
+    user.user_permissions.add(*Permission.objects.filter(content_type__model="banner"))
+
+
+def upload(client, ad, uid, content=b"GIF89a" + struct.pack("<HH", 300, 250)):
+    data = {"uid": uid, "width": 300, "height": 250, "file": SimpleUploadedFile("creative.GIF", content)}
+    response = client.post(reverse("api:banners", args=[ad.id]), data, format="multipart")
+    assert response.status_code == 201
+    return ad_models.Banner.objects.get(uid=uid)
+
+
+@pytest.mark.django_db
+def test_same_creative_stored_once(auth_client, user_banner_permissions, advertisement, media_root):
+    other_ad = ad_models.Advertisement.objects.create(
+        name="other", campaign=advertisement.campaign, place="site", url="https://example.com", description="-"
+    )
+    first = upload(auth_client, advertisement, "first")
+    second = upload(auth_client, other_ad, "second")
+
+    assert first.file.name == second.file.name
+    assert first.file.name.startswith("banners/blobs/") and first.file.name.endswith(".gif")
+    assert len([path for path in media_root.rglob("*") if path.is_file()]) == 1
+    assert asset_models.BannerBlob.objects.get(name=first.file.name).ref_count == 2
+
+
+@pytest.mark.django_db
+def test_existing_blob_is_not_rewritten(media_root):
+    storage = banner_storage()
+    name = storage.save("a.png", ContentFile(b"png"))
+    path = media_root / name
+    path.write_bytes(b"png")
+    mtime = path.stat().st_mtime_ns
+
+    assert storage.save("b.PNG", ContentFile(b"png")) == name
+    assert path.stat().st_mtime_ns == mtime
+
+
+@pytest.mark.django_db
+def test_gc_removes_unreferenced_blobs(auth_client, user_banner_permissions, advertisement, media_root):
+    kept = upload(auth_client, advertisement, "kept", b"kept")
+    dropped = upload(auth_client, advertisement, "dropped", b"dropped")
+    orphan = banner_storage().save("orphan.png", ContentFile(b"orphan"))
+
+    dropped.delete()
+    out = io.StringIO()
+    call_command("gc_banner_blobs", "--grace-hours", "0", "--scan-storage", stdout=out)
+
+    assert banner_storage().exists(kept.file.name)
+    assert not banner_storage().exists(dropped.file.name)
+    assert not banner_storage().exists(orphan)
+    assert not asset_models.BannerBlob.objects.filter(name=dropped.file.name).exists()
+
+
+@pytest.mark.django_db
+def test_gc_keeps_blobs_referenced_past_counter(advertisement, banners, media_root):
+    asset_models.BannerBlob.objects.update(ref_count=0)
+    call_command("gc_banner_blobs", "--grace-hours", "0", stdout=io.StringIO())
+
+    assert asset_models.BannerBlob.objects.filter(ref_count=1).count() == 3
+
+
+@pytest.mark.django_db
+def test_file_change_moves_reference(advertisement, banners):
+    banner = banners[0]
+    previous = banner.file.name
+    banner.file = banners[1].file.name
+    banner.save()
+
+    assert asset_models.BannerBlob.objects.get(name=previous).ref_count == 0
+    assert asset_models.BannerBlob.objects.get(name=banners[1].file.name).ref_count == 2
@@ -0,0 +1,96 @@
+import gzip
+import io
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.urls import reverse
+
+from core import delivery
+from core.models import ads as ad_models
+from core.storage import banner_storage
+
+CONTENT = bytes(range(256)) * 4
+HTML = b"<html><body>" + b"<div>creative</div>" * 200 + b"</body></html>"
+
+
+@pytest.fixture
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    return tmp_path
+
+
+def fetch(client, name, **headers):
+    response = client.get(reverse("api:banner_asset", args=[name]), headers=headers)
+    body = b"".join(response.streaming_content) if response.streaming else response.content
+    return response, body
+
+
+@pytest.mark.django_db
+def test_content_addressed_file_is_immutable(client, media_root):
+    name = banner_storage().save("a.png", ContentFile(CONTENT))
+    assert banner_storage().url(name) == reverse("api:banner_asset", args=[name])
+
+    response, body = fetch(client, name)
+
+    assert response.status_code == 200 and body == CONTENT
+    assert response["Cache-Control"] == "public, max-age=31536000, immutable"
+    assert response["ETag"] == f'"{delivery.content_digest(name)}"'
+    assert fetch(client, name, if_none_match=response["ETag"])[0].status_code == 304
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [("bytes=10-19", (10, 19)), ("bytes=1000-", (1000, 1023)), ("bytes=-24", (1000, 1023)), ("bytes=1000-5000", (1000, 1023))],
+)
+@pytest.mark.django_db
+def test_range_request(client, media_root, header, expected):
+    name = banner_storage().save("a.png", ContentFile(CONTENT))
+
+    response, body = fetch(client, name, range=header)
+
+    start, end = expected
+    assert response.status_code == 206
+    assert body == CONTENT[start : end + 1]
+    assert response["Content-Range"] == f"bytes {start}-{end}/{len(CONTENT)}"
+    assert response["Content-Length"] == str(end - start + 1)
+
+
+@pytest.mark.django_db
+def test_unsatisfiable_and_stale_ranges(client, media_root):
+    name = banner_storage().save("a.png", ContentFile(CONTENT))
+
+    response, _ = fetch(client, name, range="bytes=5000-")
+    assert response.status_code == 416 and response["Content-Range"] == f"bytes */{len(CONTENT)}"
+
+    response, body = fetch(client, name, range="bytes=0-9", if_range='"other"')
+    assert response.status_code == 200 and body == CONTENT
+
+
+@pytest.mark.django_db
+def test_precompressed_html(client, media_root):
+    name = banner_storage().save("creative.html", ContentFile(HTML))
+    assert name + ".gz" in delivery.precompress({"source": name})
+
+    response, body = fetch(client, name, accept_encoding="gzip, deflate")
+    assert response["Content-Encoding"] == "gzip"
+    assert gzip.decompress(body) == HTML
+    assert "Accept-Encoding" in response["Vary"]
+    assert response["Content-Type"].startswith("text/html")
+
+    plain, body = fetch(client, name)
+    assert "Content-Encoding" not in plain and body == HTML
+    assert plain["ETag"] != response["ETag"]
+
+    assert fetch(client, name + ".gz")[0].status_code == 404
+
+
+@pytest.mark.django_db
+def test_gc_keeps_variants_of_live_files(advertisement, media_root):
+    name = banner_storage().save("creative.html", ContentFile(HTML))
+    ad_models.Banner.objects.create(advertisement=advertisement, uid="html", width=300, height=250, file=name)
+    delivery.precompress({"source": name})
+
+    call_command("gc_banner_blobs", "--grace-hours", "0", "--scan-storage", stdout=io.StringIO())
+
+    assert banner_storage().exists(name + ".gz")
@@ -0,0 +1,158 @@
+import io
+import struct
+
+import pytest
+from django.contrib.auth.models import Permission
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.urls import reverse
+
+from core.imagesize import image_size
+from core.models import ads as ad_models
+from core.storage import banner_storage
+from web.forms import BannerForm
+
+
+def gif(width, height):
+    return b"GIF89a" + struct.pack("<HH", width, height) + b"\x00" * 16
+
+
+def png(width, height):
+    return b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + struct.pack(">II", width, height) + b"\x08\x06\x00\x00\x00"
+
+
+def jpeg(width, height, app_size=16):
+    app = b"\xff\xe0" + struct.pack(">H", app_size + 2) + b"\x00" * app_size
+    sof = b"\xff\xc0" + struct.pack(">HBHHB", 11, 8, height, width, 1) + b"\x01\x11\x00"
+    return b"\xff\xd8" + app + sof + b"\xff\xd9"
+
+
+class CountingFile(io.BytesIO):
+    bytes_read = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+@pytest.fixture
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    return tmp_path
+
+
+@pytest.fixture
+def user_banner_permissions(user):
+    user.user_permissions.add(*Permission.objects.filter(content_type__model="banner"))
+
+
+@pytest.mark.parametrize("content", [gif(300, 250), png(300, 250), jpeg(300, 250)])
+def test_image_size(content):
+    file = io.BytesIO(content)
+
+    assert image_size(file) == (300, 250)
+    assert file.tell() == 0
+
+
+def test_image_size_skips_jpeg_segments_without_reading():
+    file = CountingFile(jpeg(728, 90, app_size=60000))
+
+    assert image_size(file) == (728, 90)
+    assert file.bytes_read < 64
+
+
+@pytest.mark.parametrize("content", [b"<html></html>", b"GIF8", b"\xff\xd8\xff\xe0", b""])
+def test_image_size_unknown(content):
+    assert image_size(io.BytesIO(content)) is None
+
+
+@pytest.mark.django_db
+def test_upload_fills_dimensions(auth_client, user_banner_permissions, advertisement, media_root):
+    data = {"uid": "auto", "file": SimpleUploadedFile("creative.png", png(160, 600))}
+    response = auth_client.post(reverse("api:banners", args=[advertisement.id]), data, format="multipart")
+
+    assert response.status_code == 201
+    assert (response.data["width"], response.data["height"]) == (160, 600)
+
+
+@pytest.mark.django_db
+def test_upload_rejects_mismatch(auth_client, user_banner_permissions, advertisement, media_root):
+    data = {"uid": "wrong", "width": 300, "height": 600, "file": SimpleUploadedFile("creative.jpg", jpeg(160, 600))}
+    response = auth_client.post(reverse("api:banners", args=[advertisement.id]), data, format="multipart")
+
+    assert response.status_code == 400
+    assert list(response.data) == ["width"]
+
+
+@pytest.mark.django_db
+def test_html_banner_requires_dimensions(auth_client, user_banner_permissions, advertisement, media_root):
+    data = {"uid": "html", "file": SimpleUploadedFile("creative.html", b"<html></html>")}
+    response = auth_client.post(reverse("api:banners", args=[advertisement.id]), data, format="multipart")
+
+    assert response.status_code == 400
+    assert set(response.data) == {"width", "height"}
+
+
+@pytest.mark.parametrize("width", [0, 50000])
+@pytest.mark.django_db
+def test_upload_rejects_out_of_range_header(auth_client, user_banner_permissions, advertisement, media_root, width):
+    data = {"uid": "huge", "file": SimpleUploadedFile("creative.png", png(width, 600))}
+    response = auth_client.post(reverse("api:banners", args=[advertisement.id]), data, format="multipart")
+
+    assert response.status_code == 400
+    assert list(response.data) == ["width"]
+
+    name = banner_storage().save("creative.png", ContentFile(png(width, 600)))
+    response = auth_client.post(
+        reverse("api:banners_bulk", args=[advertisement.id]), [{"uid": "huge", "file": name}], format="json"
+    )
+    assert response.status_code == 400
+    assert list(response.data["errors"][0]["errors"]) == ["width"]
+
+
+@pytest.mark.django_db
+def test_bulk_checks_stored_file(auth_client, user_banner_permissions, advertisement, media_root):
+    name = banner_storage().save("creative.gif", ContentFile(gif(300, 250)))
+    items = [{"uid": "ok", "file": name}, {"uid": "bad", "file": name, "width": 728, "height": 90}]
+    response = auth_client.post(reverse("api:banners_bulk", args=[advertisement.id]), items, format="json")
+
+    assert [(item["width"], item["height"]) for item in response.data["created"]] == [(300, 250)]
+    assert response.data["errors"][0]["index"] == 1
+
+
+@pytest.mark.django_db
+def test_form_fills_dimensions(media_root):
+    form = BannerForm(data={"uid": "form", "is_active": True}, files={"file": SimpleUploadedFile("a.gif", gif(468, 60))})
+
+    assert form.is_valid(), form.errors
+    assert (form.cleaned_data["width"], form.cleaned_data["height"]) == (468, 60)
+
+    form = BannerForm(data={"uid": "form", "width": 1, "height": 60}, files={"file": SimpleUploadedFile("a.gif", gif(468, 60))})
+    assert not form.is_valid()
+    assert list(form.errors) == ["width"]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_backfill_fixes_stored_dimensions(advertisement, media_root):
+    storage = banner_storage()
+    wrong = ad_models.Banner.objects.create(
+        advertisement=advertisement, uid="wrong", width=1, height=1, file=storage.save("w.png", ContentFile(png(300, 250)))
+    )
+    right = ad_models.Banner.objects.create(
+        advertisement=advertisement, uid="right", width=728, height=90, file=storage.save("r.jpg", ContentFile(jpeg(728, 90)))
+    )
+    huge = ad_models.Banner.objects.create(
+        advertisement=advertisement, uid="huge", width=1, height=1, file=storage.save("h.png", ContentFile(png(50000, 90)))
+    )
+    out = io.StringIO()
+    call_command("backfill_banner_dimensions", "--workers", "2", stdout=out)
+
+    wrong.refresh_from_db()
+    right.refresh_from_db()
+    assert (wrong.width, wrong.height) == (300, 250)
+    assert (right.width, right.height) == (728, 90)
+    huge.refresh_from_db()
+    assert (huge.width, huge.height) == (1, 1)
+    assert "Исправлено баннеров: 1, не прочитано файлов: 0, недопустимые размеры: 1" in out.getvalue()
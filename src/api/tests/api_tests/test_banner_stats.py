@@ -0,0 +1,61 @@
+import datetime
+
+import pytest
+from django.urls import reverse
+
+from core.models import ads as ad_models
+
+
+@pytest.mark.django_db
+def test_campaign_list_banner_stats(auth_client, user_view_group, banners):
+    url = reverse("api:campaigns")
+    response = auth_client.get(url, content_type="application/json")
+
+    assert response.status_code == 200
+    assert response.data["results"][0]["banner_count"] == 3
+    assert response.data["results"][0]["file_formats"] == ["gif", "png"]
+
+
+@pytest.mark.django_db
+def test_advertisement_list_banner_stats(auth_client, user_view_group, campaign, banners):
+    url = reverse("api:ads", args=[campaign.id])
+    response = auth_client.get(url, content_type="application/json")
+
+    assert response.status_code == 200
+    assert response.data["results"][0]["banner_count"] == 3
+    assert response.data["results"][0]["file_formats"] == ["gif", "png"]
+
+
+@pytest.mark.django_db
+def test_campaign_list_banner_stats_query_count(auth_client, user_view_group, user, django_assert_max_num_queries):
+    for i in range(20):
+        campaign = ad_models.Campaign.objects.create(
+            name=f"Campaign {i}",
+            start_date=datetime.date.today(),
+            end_date=datetime.date.today(),
+            budget=1000,
+            strategy=ad_models.Campaign.SpendingStrategy.EVENLY,
+            user=user,
+        )
+        ad = ad_models.Advertisement.objects.create(
+            name="ad", campaign=campaign, place="site", url="https://example.com", description="-"
+        )
+        ad_models.Banner.objects.create(advertisement=ad, uid=f"b-{i}", width=1, height=1, file="banners/b.jpg")
+
+    url = reverse("api:campaigns")
+    with django_assert_max_num_queries(6):
+        response = auth_client.get(url, content_type="application/json")
+
+    assert response.status_code == 200
+    assert all(item["banner_count"] == 1 for item in response.data["results"])
+
+
+@pytest.mark.django_db
+def test_banner_stats_without_banners(campaign):
+    ad_models.Advertisement.objects.create(
+        name="ad", campaign=campaign, place="site", url="https://example.com", description="-"
+    )
+    (ad,) = ad_models.Advertisement.objects.attach_banner_stats(ad_models.Advertisement.objects.all())
+
+    assert ad.banner_count == 0
+    assert ad.file_formats == []
@@ -0,0 +1,147 @@
+import datetime
+import io
+import struct
+
+import pytest
+from django.contrib.auth.models import Permission
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from core import uploads
+from core.models import ads as ad_models
+from core.models import assets as asset_models
+from core.storage import banner_storage
+
+CONTENT = b"GIF89a" + struct.pack("<HH", 300, 250) + bytes(range(256)) * 40
+
+
+@pytest.fixture
+def upload_dirs(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path / "media"
+    settings.BANNER_UPLOAD_DIR = tmp_path / "uploads"
+    return tmp_path
+
+
+@pytest.fixture
+def user_banner_permissions(user):
+    user.user_permissions.add(*Permission.objects.filter(content_type__model="banner"))
+
+
+def start(client, advertisement, size=len(CONTENT), filename="creative.gif"):
+    response = client.post(
+        reverse("api:banner_uploads", args=[advertisement.id]), {"filename": filename, "size": size}, format="json"
+    )
+    assert response.status_code == 201
+    return response.data["id"]
+
+
+def send(client, advertisement, upload_id, offset, chunk, **extra):
+    url = reverse("api:banner_upload", args=[advertisement.id, upload_id])
+    return client.patch(url, chunk, content_type="application/offset+octet-stream", HTTP_UPLOAD_OFFSET=str(offset), **extra)
+
+
+def complete(client, advertisement, upload_id, data):
+    return client.post(reverse("api:banner_upload_complete", args=[advertisement.id, upload_id]), data, format="json")
+
+
+@pytest.mark.django_db
+def test_chunked_upload_creates_banner(
+    auth_client, user_banner_permissions, advertisement, upload_dirs, django_capture_on_commit_callbacks
+):
+    upload_id = start(auth_client, advertisement)
+
+    assert send(auth_client, advertisement, upload_id, 0, CONTENT[:4000]).data["offset"] == 4000
+    # Повтор уже принятой части не дописывает её второй раз, клиент получает текущее смещение
+    conflict = send(auth_client, advertisement, upload_id, 0, CONTENT[:4000])
+    assert conflict.status_code == 409 and conflict["Upload-Offset"] == "4000"
+    assert complete(auth_client, advertisement, upload_id, {"uid": "big"}).status_code == 409
+
+    status = auth_client.get(reverse("api:banner_upload", args=[advertisement.id, upload_id]))
+    assert status.data["offset"] == 4000
+    assert send(auth_client, advertisement, upload_id, 4000, CONTENT[4000:]).data["offset"] == len(CONTENT)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = complete(auth_client, advertisement, upload_id, {"uid": "big"})
+    assert response.status_code == 201
+    assert (response.data["width"], response.data["height"]) == (300, 250)
+    banner = ad_models.Banner.objects.get(uid="big")
+    with banner_storage().open(banner.file.name) as file:
+        assert file.read() == CONTENT
+    assert banner.file.name.startswith("banners/blobs/")
+    assert not list((upload_dirs / "uploads").iterdir())
+
+    again = complete(auth_client, advertisement, upload_id, {"uid": "big"})
+    assert again.status_code == 200 and again.data["id"] == banner.id
+
+
+@pytest.mark.django_db
+def test_invalid_banner_keeps_upload(auth_client, user_banner_permissions, advertisement, upload_dirs):
+    upload_id = start(auth_client, advertisement)
+    send(auth_client, advertisement, upload_id, 0, CONTENT)
+
+    response = complete(auth_client, advertisement, upload_id, {"uid": "bad", "width": 1})
+    assert response.status_code == 400
+
+    assert complete(auth_client, advertisement, upload_id, {"uid": "good"}).status_code == 201
+
+
+@pytest.mark.django_db
+def test_broken_chunk_is_dropped(auth_client, user_banner_permissions, advertisement, upload_dirs):
+    upload_id = start(auth_client, advertisement)
+    send(auth_client, advertisement, upload_id, 0, CONTENT[:1000])
+
+    # Соединение оборвалось посреди части: принятые байты отбрасываются, повторяется только эта часть
+    upload = asset_models.BannerUpload.objects.get(pk=upload_id)
+    with pytest.raises(uploads.IncompleteChunk):
+        uploads.append_chunk(upload, 1000, io.BytesIO(CONTENT[1000:1100]), 500)
+    assert asset_models.BannerUpload.objects.get(pk=upload_id).offset == 1000
+    assert [path.name for path in (upload_dirs / "uploads").iterdir()] == [f"{upload_id}.part"]
+
+    too_long = send(auth_client, advertisement, upload_id, 1000, b"x" * len(CONTENT))
+    assert too_long.status_code == 400
+
+
+@pytest.mark.django_db
+def test_unrecorded_tail_is_overwritten(auth_client, user_banner_permissions, advertisement, upload_dirs):
+    upload_id = start(auth_client, advertisement)
+    send(auth_client, advertisement, upload_id, 0, CONTENT[:1000])
+    # Процесс записал часть на диск, но упал до обновления offset
+    with open(uploads.part_path(asset_models.BannerUpload(pk=upload_id)), "ab") as part:
+        part.write(b"garbage" * 100)
+
+    send(auth_client, advertisement, upload_id, 1000, CONTENT[1000:])
+    assert complete(auth_client, advertisement, upload_id, {"uid": "tail"}).status_code == 201
+    with ad_models.Banner.objects.get(uid="tail").file.open("rb") as file:
+        assert file.read() == CONTENT
+
+
+@pytest.mark.django_db
+def test_upload_requires_add_permission(auth_client, advertisement, upload_dirs):
+    response = auth_client.post(
+        reverse("api:banner_uploads", args=[advertisement.id]), {"filename": "a.gif", "size": 10}, format="json"
+    )
+    assert response.status_code == 403
+
+
+@pytest.mark.django_db
+def test_upload_validates_file_name_and_size(auth_client, user_banner_permissions, advertisement, upload_dirs, settings):
+    settings.BANNER_UPLOAD_MAX_SIZE = 100
+    url = reverse("api:banner_uploads", args=[advertisement.id])
+
+    response = auth_client.post(url, {"filename": "../../run.exe", "size": 200}, format="json")
+
+    assert response.status_code == 400
+    assert set(response.data) == {"filename", "size"}
+
+
+@pytest.mark.django_db
+def test_gc_removes_abandoned_uploads(auth_client, user_banner_permissions, advertisement, upload_dirs):
+    upload_id = start(auth_client, advertisement)
+    send(auth_client, advertisement, upload_id, 0, CONTENT[:100])
+    asset_models.BannerUpload.objects.update(updated_at=timezone.now() - datetime.timedelta(days=2))
+
+    call_command("gc_banner_uploads", stdout=io.StringIO())
+
+    assert not asset_models.BannerUpload.objects.exists()
+    assert not list((upload_dirs / "uploads").iterdir())
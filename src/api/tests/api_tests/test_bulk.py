@@ -0,0 +1,166 @@
+import pytest
+from django.contrib.auth.models import Permission
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from rest_framework import generics
+
+from api.views import BulkMixin
+from core.models import ads as ad_models
+from core.models import stats as stats_models
+
+
+@pytest.fixture
+def user_edit_permissions(user):
+    user.user_permissions.add(
+        *Permission.objects.filter(content_type__app_label="core", content_type__model__in=["advertisement", "banner"])
+    )
+
+
+@pytest.fixture
+def banner_files(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    return [default_storage.save(f"banners/bulk/banner-{i}.png", ContentFile(b"png")) for i in range(3)]
+
+
+def ad_payload(i):
+    return {"name": f"ad-{i}", "place": "site", "url": "https://example.com", "description": "-"}
+
+
+@pytest.mark.django_db
+def test_bulk_create_advertisements(auth_client, user_edit_permissions, campaign, django_assert_max_num_queries):
+    url = reverse("api:ads_bulk", args=[campaign.id])
+    with django_assert_max_num_queries(15):
+        response = auth_client.post(url, [ad_payload(i) for i in range(50)], format="json")
+
+    assert response.status_code == 201
+    assert len(response.data["created"]) == 50
+    assert response.data["errors"] == []
+    assert stats_models.AdvertisementStats.objects.filter(advertisement__campaign=campaign).count() == 50
+    assert stats_models.CampaignStats.objects.get(campaign=campaign).ad_count == 50
+
+
+@pytest.mark.django_db
+def test_bulk_create_reports_item_errors(auth_client, user_edit_permissions, campaign):
+    url = reverse("api:ads_bulk", args=[campaign.id])
+    response = auth_client.post(url, [ad_payload(0), {**ad_payload(1), "url": "not a url"}], format="json")
+
+    assert response.status_code == 207
+    assert len(response.data["created"]) == 1
+    assert response.data["errors"][0]["index"] == 1
+    assert "url" in response.data["errors"][0]["errors"]
+
+
+@pytest.mark.django_db
+def test_bulk_create_all_invalid(auth_client, user_edit_permissions, campaign):
+    url = reverse("api:ads_bulk", args=[campaign.id])
+    response = auth_client.post(url, [{"name": "ad"}], format="json")
+
+    assert response.status_code == 400
+    assert not ad_models.Advertisement.objects.exists()
+
+
+@pytest.mark.django_db
+def test_bulk_requires_list(auth_client, user_edit_permissions, campaign):
+    url = reverse("api:ads_bulk", args=[campaign.id])
+    response = auth_client.post(url, ad_payload(0), format="json")
+
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_bulk_create_banners(auth_client, user_edit_permissions, advertisement, banners, banner_files):
+    url = reverse("api:banners_bulk", args=[advertisement.id])
+    payload = [{"uid": f"bulk-{i}", "width": 300, "height": 250, "file": file} for i, file in enumerate(banner_files)]
+    payload.append({"uid": "banner-0", "width": 300, "height": 250, "file": banner_files[0]})
+    payload.append({"uid": "bulk-0", "width": 300, "height": 250, "file": banner_files[0]})
+    payload.append({"uid": "missing", "width": 300, "height": 250, "file": "banners/missing.png"})
+    response = auth_client.post(url, payload, format="json")
+
+    assert response.status_code == 207
+    assert len(response.data["created"]) == 3
+    assert [error["index"] for error in response.data["errors"]] == [3, 4, 5]
+    assert "file" in response.data["errors"][2]["errors"]
+    assert stats_models.AdvertisementStats.objects.get(advertisement=advertisement).banner_count == 6
+
+
+@pytest.mark.django_db
+def test_bulk_update_banners(auth_client, user_edit_permissions, advertisement, banners):
+    url = reverse("api:banners_bulk", args=[advertisement.id])
+    payload = [{"id": banner.id, "is_active": False} for banner in banners[:2]]
+    payload.append({"id": 0, "is_active": False})
+    response = auth_client.patch(url, payload, format="json")
+
+    assert response.status_code == 207
+    assert len(response.data["updated"]) == 2
+    assert response.data["errors"][0]["index"] == 2
+    assert ad_models.Banner.objects.filter(is_active=True).count() == 1
+    assert stats_models.AdvertisementStats.objects.get(advertisement=advertisement).active_banner_count == 1
+
+
+@pytest.mark.django_db
+def test_bulk_update_keeps_own_uid(auth_client, user_edit_permissions, advertisement, banners):
+    url = reverse("api:banners_bulk", args=[advertisement.id])
+    response = auth_client.patch(url, [{"id": banners[0].id, "uid": banners[0].uid, "width": 100}], format="json")
+
+    assert response.status_code == 200
+    assert ad_models.Banner.objects.get(id=banners[0].id).width == 100
+
+
+@pytest.mark.django_db
+def test_bulk_delete_banners(auth_client, user_edit_permissions, advertisement, banners):
+    url = reverse("api:banners_bulk", args=[advertisement.id])
+    response = auth_client.delete(url, [banners[0].id, banners[1].id, 0], format="json")
+
+    assert response.status_code == 207
+    assert response.data["deleted"] == [banners[0].id, banners[1].id]
+    assert response.data["errors"] == [{"index": 2, "errors": {"id": ["Объект не найден"]}}]
+    assert stats_models.AdvertisementStats.objects.get(advertisement=advertisement).banner_count == 1
+
+
+@pytest.mark.django_db
+def test_bulk_rejects_non_integer_ids(auth_client, user_edit_permissions, advertisement, banners):
+    url = reverse("api:banners_bulk", args=[advertisement.id])
+    payload = [{"id": "abc"}, {"id": [banners[0].id]}, {"id": True, "width": 100}, "x", {"id": banners[1].id, "width": 100}]
+    response = auth_client.patch(url, payload, format="json")
+
+    assert response.status_code == 207
+    assert [banner["id"] for banner in response.data["updated"]] == [banners[1].id]
+    assert [error["index"] for error in response.data["errors"]] == [0, 1, 2, 3]
+    assert response.data["errors"][0]["errors"] == {"id": ["Ожидается целое число"]}
+
+    response = auth_client.delete(url, [True, str(banners[0].id), banners[0].id], format="json")
+
+    assert response.status_code == 207
+    assert response.data["deleted"] == [banners[0].id]
+    assert [error["index"] for error in response.data["errors"]] == [0, 1]
+    assert ad_models.Banner.objects.filter(id=banners[1].id).exists()
+
+
+@pytest.mark.django_db
+def test_bulk_update_rejects_duplicate_ids(auth_client, user_edit_permissions, advertisement, banners):
+    url = reverse("api:banners_bulk", args=[advertisement.id])
+    payload = [{"id": banners[0].id, "width": 100}, {"id": banners[1].id, "width": 100}, {"id": banners[0].id, "width": 200}]
+    response = auth_client.patch(url, payload, format="json")
+
+    assert response.status_code == 207
+    assert [banner["id"] for banner in response.data["updated"]] == [banners[0].id, banners[1].id]
+    assert response.data["errors"] == [{"index": 2, "errors": {"id": ["Объект уже изменяется в этом запросе"]}}]
+    assert ad_models.Banner.objects.get(id=banners[0].id).width == 100
+
+
+def test_bulk_view_must_define_parent_hooks():
+    class IncompleteBulkView(BulkMixin, generics.GenericAPIView):
+        def get_parent(self):
+            return None
+
+    with pytest.raises(TypeError):
+        IncompleteBulkView()
+
+
+@pytest.mark.django_db
+def test_bulk_foreign_parent(auth_client, user_edit_permissions, campaign_super_user):
+    url = reverse("api:ads_bulk", args=[campaign_super_user.id])
+    response = auth_client.post(url, [ad_payload(0)], format="json")
+
+    assert response.status_code == 404
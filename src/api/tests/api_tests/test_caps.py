@@ -0,0 +1,90 @@
+import datetime
+import threading
+
+import pytest
+from django.core.cache import cache
+from django.urls import reverse
+
+from core.models import ads as ad_models
+from core.serving import caps
+from core.serving.index import decision_index
+from core.serving.pacing import pacer
+
+TODAY = datetime.date(2026, 3, 1)
+
+
+@pytest.fixture(autouse=True)
+def reset_serving(settings):
+    # Изменения теста не коммитятся, поэтому индекс узнаёт о них из журнала изменений
+    settings.DECISION_INDEX_POLL_SECONDS = 0
+    cache.clear()
+    decision_index.reset()
+    caps.impression_capper.reset()
+    yield
+    decision_index.reset()
+    caps.impression_capper.reset()
+
+
+@pytest.mark.parametrize("backend_class", [caps.LocalCounterBackend, caps.CacheCounterBackend, caps.DatabaseCounterBackend])
+@pytest.mark.django_db
+def test_counter_backend_stops_at_cap(backend_class, campaign):
+    backend = backend_class()
+
+    served = [backend.try_increment(campaign.id, TODAY, 3) for _ in range(5)]
+
+    assert served == [True, True, True, False, False]
+    assert backend.try_increment(campaign.id, TODAY + datetime.timedelta(days=1), 3)
+
+
+def test_counter_backend_is_abstract():
+    class IncompleteBackend(caps.CounterBackend):
+        pass
+
+    with pytest.raises(TypeError):
+        IncompleteBackend()
+
+
+def test_raised_cap_reaches_other_workers():
+    backend = caps.LocalCounterBackend()
+    # Два воркера с общим счётчиком; новый лимит каждый узнаёт из своего индекса, без сигналов
+    first, second = caps.ImpressionCapper(backend), caps.ImpressionCapper(backend)
+    assert first.try_serve(1, TODAY, 1)
+    assert not first.try_serve(1, TODAY, 1)
+    assert not second.try_serve(1, TODAY, 1)
+
+    assert second.try_serve(1, TODAY, 2)
+    assert not first.try_serve(1, TODAY, 2)
+
+
+def test_local_counter_backend_concurrent():
+    backend = caps.LocalCounterBackend()
+    served = []
+
+    def serve():
+        for _ in range(100):
+            served.append(backend.try_increment(1, TODAY, 150))
+
+    threads = [threading.Thread(target=serve) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert served.count(True) == 150
+
+
+@pytest.mark.django_db
+def test_decide_respects_daily_cap(simple_api_client, campaign, banners):
+    campaign.strategy = ad_models.Campaign.SpendingStrategy.MAX_IMPRESSIONS
+    campaign.max_impressions_per_day = 2
+    campaign.save()
+
+    url = reverse("api:decide")
+    params = {"place": "site", "width": 300, "height": 250}
+    statuses = [simple_api_client.get(url, params).status_code for _ in range(4)]
+
+    assert statuses == [200, 200, 204, 204]
+
+    campaign.max_impressions_per_day = 3
+    campaign.save()
+    assert simple_api_client.get(url, params).status_code == 200
@@ -0,0 +1,104 @@
+import datetime
+
+import pytest
+from django.contrib.auth.models import Permission
+from django.urls import reverse
+from django.utils import timezone
+
+from core import outbox
+from core.models import ads as ad_models
+from core.models import changes as change_models
+
+Action = change_models.ChangeEvent.Action
+
+
+@pytest.fixture
+def user_edit_permissions(user):
+    user.user_permissions.add(*Permission.objects.filter(content_type__app_label="core"))
+
+
+def changes_after(position):
+    return [(event.entity, event.action, event.object_id, event.campaign_id) for event in outbox.read(position)]
+
+
+@pytest.mark.django_db
+def test_api_changes_are_recorded_in_order(auth_client, user_edit_permissions, advertisement, banners):
+    campaign_id = advertisement.campaign_id
+    position = outbox.head()
+
+    url = reverse("api:ad_detail", args=[campaign_id, advertisement.id])
+    assert auth_client.patch(url, {"name": "renamed"}, format="json").status_code == 200
+    assert auth_client.delete(reverse("api:campaign_detail", args=[campaign_id])).status_code == 204
+
+    recorded = changes_after(position)
+    assert recorded[0] == ("advertisement", Action.UPDATED, advertisement.id, campaign_id)
+    # Каскадное удаление записывает все удалённые объекты с кампанией, к которой они относились
+    assert sorted(recorded[1:]) == sorted(
+        [("banner", Action.DELETED, banner.id, campaign_id) for banner in banners]
+        + [
+            ("advertisement", Action.DELETED, advertisement.id, campaign_id),
+            ("campaign", Action.DELETED, campaign_id, campaign_id),
+        ]
+    )
+
+
+@pytest.mark.django_db
+def test_bulk_changes_are_recorded(auth_client, user_edit_permissions, advertisement, banners):
+    position = outbox.head()
+    url = reverse("api:banners_bulk", args=[advertisement.id])
+
+    response = auth_client.patch(url, [{"id": banner.id, "is_active": False} for banner in banners[:2]], format="json")
+
+    assert response.status_code == 200
+    assert changes_after(position) == [
+        ("banner", Action.ARCHIVED, banner.id, advertisement.campaign_id) for banner in banners[:2]
+    ]
+
+
+@pytest.mark.django_db
+def test_web_archive_is_recorded(client, user, user_edit_permissions, banners):
+    client.force_login(user)
+    position = outbox.head()
+
+    response = client.post(reverse("web:banner-archive", args=[banners[0].id]))
+
+    assert response.status_code == 302
+    assert changes_after(position) == [("banner", Action.ARCHIVED, banners[0].id, banners[0].advertisement.campaign_id)]
+
+
+@pytest.mark.django_db
+def test_read_waits_for_fresh_gap(campaign, settings):
+    position = outbox.head()
+    first, second, third = (
+        change_models.ChangeEvent.objects.create(
+            entity="campaign", action=Action.UPDATED, object_id=campaign.id, campaign=campaign
+        )
+        for _ in range(3)
+    )
+    # Запись посередине ещё не закоммичена (или откачена): следующие за ней пока не отдаются
+    second.delete()
+
+    assert [event.id for event in outbox.read(position)] == [first.id]
+
+    change_models.ChangeEvent.objects.filter(pk=third.pk).update(
+        created_at=timezone.now() - datetime.timedelta(seconds=settings.OUTBOX_SETTLE_SECONDS + 1)
+    )
+    assert [event.id for event in outbox.read(position)] == [first.id, third.id]
+
+
+@pytest.mark.django_db
+def test_consumer_position_advances_only_on_success(campaign):
+    start = outbox.head()
+    ad_models.Campaign.objects.filter(pk=campaign.pk).first().save()
+
+    with pytest.raises(RuntimeError):
+        with outbox.consume("index", start=start) as events:
+            assert len(events) == 1
+            raise RuntimeError
+
+    # Откат первой пачки откатил и регистрацию потребителя, поэтому start передаётся снова
+    with outbox.consume("index", start=start) as events:
+        assert [event.object_id for event in events] == [campaign.id]
+    with outbox.consume("index") as events:
+        assert events == []
+    assert change_models.ChangeConsumer.objects.get(name="index").position == outbox.head()
@@ -0,0 +1,68 @@
+import time
+
+import pytest
+from django.urls import reverse
+from django.utils.http import http_date
+
+from core.models import ads as ad_models
+
+
+@pytest.mark.django_db
+def test_campaign_list_not_modified(auth_client, user_view_group, banners, django_assert_max_num_queries):
+    url = reverse("api:campaigns")
+    response = auth_client.get(url)
+    etag = response["ETag"]
+
+    assert response.status_code == 200
+    assert not response.has_header("Last-Modified")
+
+    with django_assert_max_num_queries(1):
+        response = auth_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    assert response.status_code == 304
+    assert response["ETag"] == etag
+
+
+@pytest.mark.django_db
+def test_banner_change_updates_campaign_etag(auth_client, user_view_group, banners):
+    url = reverse("api:campaigns")
+    etag = auth_client.get(url)["ETag"]
+
+    banners[0].is_active = False
+    banners[0].save()
+    response = auth_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    assert response.status_code == 200
+    assert response["ETag"] != etag
+
+
+@pytest.mark.django_db
+def test_etag_depends_on_page_and_delete(auth_client, user_view_group, advertisement, banners):
+    url = reverse("api:banners", args=[advertisement.id])
+    etag = auth_client.get(url)["ETag"]
+
+    assert auth_client.get(url, {"page_size": 1})["ETag"] != etag
+
+    ad_models.Banner.objects.filter(id=banners[0].id).delete()
+
+    assert auth_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+
+@pytest.mark.django_db
+def test_banner_detail_not_modified(auth_client, user_view_group, advertisement, banners):
+    url = reverse("api:banner_detail", args=[advertisement.id, banners[0].id])
+    response = auth_client.get(url)
+
+    assert auth_client.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code == 304
+
+
+@pytest.mark.django_db
+def test_changes_within_a_second_are_not_hidden(auth_client, user_view_group, advertisement, banners):
+    url = reverse("api:banners", args=[advertisement.id])
+    response = auth_client.get(url)
+    since = http_date(time.time() + 1)
+
+    # Ни удаление, ни правка в ту же секунду не сдвигают max(updated_at) в секундах
+    ad_models.Banner.objects.filter(id=banners[0].id).delete()
+    assert auth_client.get(url, HTTP_IF_MODIFIED_SINCE=since).status_code == 200
+    assert auth_client.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code == 200
@@ -0,0 +1,119 @@
+import datetime
+
+import pytest
+from django.urls import reverse
+
+from core import events, outbox
+from core.models import ads as ad_models
+from core.serving.index import decision_index
+from core.serving.pacing import pacer
+
+
+@pytest.fixture(autouse=True)
+def reset_decision_index(settings):
+    # Изменения теста не коммитятся, поэтому индекс узнаёт о них из журнала изменений
+    settings.DECISION_INDEX_POLL_SECONDS = 0
+    decision_index.reset()
+    pacer.reset()
+    yield
+    decision_index.reset()
+
+
+@pytest.mark.django_db
+def test_decide_returns_matching_banner(simple_api_client, banners):
+    url = reverse("api:decide")
+    response = simple_api_client.get(url, {"place": "site", "width": 300, "height": 250})
+
+    assert response.status_code == 200
+    assert response.data["uid"] in {banner.uid for banner in banners}
+    assert events.open_token(response.data["event_token"])["uid"] == response.data["uid"]
+
+
+@pytest.mark.django_db
+def test_decide_without_db_queries(simple_api_client, banners, django_assert_num_queries, settings):
+    settings.DECISION_INDEX_POLL_SECONDS = 60
+    url = reverse("api:decide")
+    simple_api_client.get(url, {"place": "site", "width": 300, "height": 250})
+
+    with django_assert_num_queries(0):
+        response = simple_api_client.get(url, {"place": "site", "width": 300, "height": 250})
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"place": "mobile_app", "width": 300, "height": 250},
+        {"place": "site", "width": 728, "height": 90},
+    ],
+)
+@pytest.mark.django_db
+def test_decide_no_match(simple_api_client, banners, params):
+    url = reverse("api:decide")
+    response = simple_api_client.get(url, params)
+
+    assert response.status_code == 204
+
+
+@pytest.mark.django_db
+def test_decide_invalid_query(simple_api_client):
+    url = reverse("api:decide")
+    response = simple_api_client.get(url, {"place": "tv", "width": "wide"})
+
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_decide_follows_targeting_and_changes(simple_api_client, campaign, banners):
+    url = reverse("api:decide")
+    params = {"place": "site", "width": 300, "height": 250}
+    assert simple_api_client.get(url, params).status_code == 200
+
+    campaign.targeting = {"geo": ["msk", "spb"]}
+    campaign.save()
+    assert simple_api_client.get(url, params).status_code == 204
+    assert simple_api_client.get(url, {**params, "geo": "spb"}).status_code == 200
+
+    for banner in banners:
+        banner.is_active = False
+        banner.save(update_fields=["is_active"])
+    assert simple_api_client.get(url, {**params, "geo": "spb"}).status_code == 204
+
+
+@pytest.mark.django_db
+def test_decide_skips_campaign_out_of_dates(simple_api_client, campaign, banners):
+    campaign.start_date = datetime.date.today() + datetime.timedelta(days=1)
+    campaign.end_date = datetime.date.today() + datetime.timedelta(days=2)
+    campaign.save()
+
+    url = reverse("api:decide")
+    response = simple_api_client.get(url, {"place": "site", "width": 300, "height": 250})
+
+    assert response.status_code == 204
+
+
+@pytest.mark.django_db
+def test_decide_sees_changes_of_other_processes(simple_api_client, campaign, banners, settings):
+    settings.DECISION_INDEX_POLL_SECONDS = 60
+    url = reverse("api:decide")
+    params = {"place": "site", "width": 300, "height": 250}
+    assert simple_api_client.get(url, params).status_code == 200
+
+    # Другой процесс: изменение и его запись в журнал без сигналов этого процесса
+    ad_models.Banner.objects.filter(advertisement__campaign=campaign).update(is_active=False)
+    outbox.write([outbox.entry(banner, outbox.Action.ARCHIVED) for banner in banners])
+    assert simple_api_client.get(url, params).status_code == 200
+
+    decision_index._polled_at -= settings.DECISION_INDEX_POLL_SECONDS
+    assert simple_api_client.get(url, params).status_code == 204
+
+
+@pytest.mark.django_db
+def test_invalidate_waits_for_commit(campaign, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks() as callbacks:
+        campaign.save()
+    assert campaign.id not in decision_index._dirty
+
+    for callback in callbacks:
+        callback()
+    assert campaign.id in decision_index._dirty
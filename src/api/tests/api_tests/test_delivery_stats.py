@@ -0,0 +1,103 @@
+import datetime
+from decimal import Decimal
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import events as event_models
+
+DAY_1 = datetime.datetime(2026, 3, 1, tzinfo=datetime.timezone.utc)
+
+
+def create_events(banner, kind, times, cost=0):
+    for occurred_at in times:
+        event_models.DeliveryEvent.objects.create(
+            kind=kind,
+            banner=banner,
+            advertisement_id=banner.advertisement_id,
+            campaign_id=banner.advertisement.campaign_id,
+            cost=cost,
+            occurred_at=occurred_at,
+        )
+
+
+@pytest.fixture
+def events(banners):
+    hours = [DAY_1 + datetime.timedelta(hours=h) for h in (1, 10, 23, 30, 50)]
+    create_events(banners[0], "impression", hours, cost="0.5")
+    create_events(banners[1], "impression", hours[:2])
+    create_events(banners[0], "click", hours[1:2])
+    call_command("compact_events", "--once")
+
+
+@pytest.mark.django_db
+def test_compaction_builds_hourly_and_daily_rollups(events):
+    assert event_models.HourlyDeliveryRollup.objects.count() == 7
+    daily = {(row.bucket.day, row.banner_id): row for row in event_models.DailyDeliveryRollup.objects.all()}
+    assert len(daily) == 4
+    assert [row.impressions for key, row in sorted(daily.items())][:2] == [3, 2]
+
+
+@pytest.mark.django_db
+def test_campaign_stats_range(auth_client, user_view_group, campaign, banners, events):
+    url = reverse("api:campaign_stats", args=[campaign.id])
+    response = auth_client.get(url, {"start": "2026-03-01T05:00:00Z", "end": "2026-03-02T07:00:00Z"})
+
+    assert response.status_code == 200
+    assert response.data["totals"] == {"impressions": 4, "clicks": 1, "spend": Decimal("1.5")}
+
+    response = auth_client.get(url, {"start": "2026-03-01", "end": "2026-03-04", "level": "banner"})
+    assert [item["impressions"] for item in response.data["items"]] == [5, 2]
+
+
+@pytest.mark.django_db
+def test_late_events_are_reaggregated(auth_client, user_view_group, campaign, banners, events):
+    create_events(banners[0], "click", [DAY_1 + datetime.timedelta(hours=1)])
+    call_command("compact_events", "--once")
+    call_command("compact_events", "--once")
+
+    url = reverse("api:campaign_stats", args=[campaign.id])
+    response = auth_client.get(url, {"start": "2026-03-01", "end": "2026-03-02"})
+    assert response.data["totals"]["clicks"] == 2
+    assert response.data["totals"]["impressions"] == 5
+
+
+@pytest.mark.django_db
+def test_campaign_stats_of_foreign_campaign(auth_client, user_view_group, campaign_super_user):
+    url = reverse("api:campaign_stats", args=[campaign_super_user.id])
+    response = auth_client.get(url, {"start": "2026-03-01", "end": "2026-03-02"})
+
+    assert response.status_code == 404
+
+
+@pytest.mark.django_db
+def test_compaction_waits_for_fresh_gap(banners, settings):
+    # Пачка посередине ещё не закоммичена другим drain_events, следующая за ней уже видна
+    create_events(banners[0], "impression", [DAY_1] * 3)
+    first, pending, last = event_models.DeliveryEvent.objects.order_by("id")
+    pending.delete()
+
+    call_command("compact_events", "--once")
+    assert event_models.RollupWatermark.objects.get(name="delivery").last_event_id == first.id
+
+    pending.id, pending.occurred_at = first.id + 1, DAY_1 + datetime.timedelta(hours=5)
+    pending.save(force_insert=True)
+    call_command("compact_events", "--once")
+    assert event_models.RollupWatermark.objects.get(name="delivery").last_event_id == last.id
+    assert event_models.HourlyDeliveryRollup.objects.filter(bucket=pending.occurred_at).get().impressions == 1
+
+
+@pytest.mark.django_db
+def test_compaction_passes_settled_gap(banners, settings):
+    create_events(banners[0], "impression", [DAY_1] * 3)
+    first, rolled_back, last = event_models.DeliveryEvent.objects.order_by("id")
+    rolled_back.delete()
+    event_models.DeliveryEvent.objects.filter(pk=last.pk).update(
+        received_at=timezone.now() - datetime.timedelta(seconds=settings.OUTBOX_SETTLE_SECONDS + 1)
+    )
+
+    call_command("compact_events", "--once")
+
+    assert event_models.RollupWatermark.objects.get(name="delivery").last_event_id == last.id
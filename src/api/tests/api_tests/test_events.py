@@ -0,0 +1,126 @@
+import os
+import threading
+from decimal import Decimal
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+
+from core import events
+from core.models import events as event_models
+
+
+@pytest.fixture(autouse=True)
+def spool_path(settings, tmp_path):
+    settings.EVENTS_SPOOL_PATH = tmp_path / "events.ndjson"
+    return settings.EVENTS_SPOOL_PATH
+
+
+def token(banner):
+    return events.issue_token({"uid": banner.uid})
+
+
+@pytest.mark.django_db
+def test_ingest_single_event(simple_api_client, spool_path, banners):
+    url = reverse("api:events")
+    response = simple_api_client.post(url, {"token": token(banners[0]), "kind": "impression"}, format="json")
+
+    assert response.status_code == 202
+    assert response.data["accepted"] == 1
+    assert spool_path.read_text().count("\n") == 1
+    assert not event_models.DeliveryEvent.objects.exists()
+
+
+@pytest.mark.django_db
+def test_ingest_batch_and_drain(simple_api_client, spool_path, banners, settings, django_assert_max_num_queries):
+    url = reverse("api:events")
+    tokens = [token(banner) for banner in banners]
+    payload = [{"token": value, "kind": "impression"} for value in tokens]
+    payload += [{"token": tokens[0], "kind": "click"}, {"token": events.issue_token({"uid": "unknown"}), "kind": "click"}]
+    response = simple_api_client.post(url, payload, format="json")
+    assert response.status_code == 202
+    assert response.data["accepted"] == 5
+
+    with django_assert_max_num_queries(3):
+        call_command("drain_events", "--once")
+
+    assert event_models.DeliveryEvent.objects.count() == 4
+    click = event_models.DeliveryEvent.objects.filter(kind="click").get()
+    assert click.campaign_id == banners[0].advertisement.campaign_id
+    assert click.cost == 0
+    impression_costs = set(event_models.DeliveryEvent.objects.filter(kind="impression").values_list("cost", flat=True))
+    assert impression_costs == {Decimal(settings.PACING_IMPRESSION_COST)}
+    assert not list(spool_path.parent.glob("*.drain"))
+
+
+@pytest.mark.django_db
+def test_client_cannot_set_cost(simple_api_client, spool_path, banners):
+    url = reverse("api:events")
+    event = {"token": token(banners[0]), "kind": "impression", "cost": "1000", "event_id": "x", "occurred_at": "2000-01-01"}
+    simple_api_client.post(url, event, format="json")
+
+    call_command("drain_events", "--once")
+
+    stored = event_models.DeliveryEvent.objects.get()
+    assert stored.cost < 1
+    assert stored.occurred_at.year > 2000
+
+
+@pytest.mark.django_db
+def test_replayed_token_is_counted_once(simple_api_client, spool_path, banners):
+    url = reverse("api:events")
+    event = {"token": token(banners[0]), "kind": "impression"}
+    simple_api_client.post(url, [event, event], format="json")
+    simple_api_client.post(url, event, format="json")
+
+    call_command("drain_events", "--once", "--batch-size", "1")
+
+    assert event_models.DeliveryEvent.objects.count() == 1
+
+
+@pytest.mark.parametrize("value", ["forged", events.issue_token({"uid": "x"})[:-2] + "xx"])
+def test_invalid_token_is_rejected(simple_api_client, spool_path, value):
+    url = reverse("api:events")
+    response = simple_api_client.post(url, {"token": value, "kind": "impression"}, format="json")
+
+    assert response.status_code == 400
+    assert not spool_path.exists()
+
+
+def test_expired_token_is_rejected(simple_api_client, spool_path, settings):
+    settings.EVENT_TOKEN_MAX_AGE = -1
+    url = reverse("api:events")
+    response = simple_api_client.post(url, {"token": events.issue_token({"uid": "x"}), "kind": "click"}, format="json")
+
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_ingest_invalid_event(simple_api_client, spool_path):
+    url = reverse("api:events")
+    response = simple_api_client.post(url, [{"token": events.issue_token({"uid": "x"}), "kind": "view"}], format="json")
+
+    assert response.status_code == 400
+    assert not spool_path.exists()
+
+
+def test_drain_waits_for_writers_of_rotated_file(spool_path):
+    spool = events.EventSpool()
+    spool.append([{"kind": "impression"}])
+    # Писатель открыл файл до переименования и ещё не дописал
+    fd = spool._open_current()
+    (drain_path,) = spool.rotate()
+
+    read = []
+    reader = threading.Thread(target=lambda: read.extend(spool.read(drain_path)))
+    reader.start()
+    reader.join(timeout=0.2)
+    assert reader.is_alive()
+
+    os.write(fd, b'{"kind": "click"}\n')
+    os.close(fd)
+    reader.join(timeout=5)
+
+    assert [record["kind"] for record in read] == ["impression", "click"]
+    spool.append([{"kind": "impression"}])
+    assert spool_path.read_text().count("\n") == 1
@@ -0,0 +1,83 @@
+import datetime
+import io
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+
+from api import views
+from core.models import ads as ad_models
+
+
+@pytest.fixture
+def catalog(user, advertisement, banners):
+    ad_models.Campaign.objects.create(
+        name="Max impressions",
+        start_date=datetime.date(2024, 1, 1),
+        end_date=datetime.date(2024, 2, 1),
+        budget="12.5",
+        strategy=ad_models.Campaign.SpendingStrategy.MAX_IMPRESSIONS,
+        max_impressions_per_day=100,
+        targeting={"geo": {"include": ["region-1"]}},
+        user=user,
+    )
+    ad_models.Advertisement.objects.create(
+        name="No banners", campaign=advertisement.campaign, place="site", url="https://example.com/ad", description="-"
+    )
+    ad_models.Banner.objects.create(
+        advertisement=advertisement, uid="spaces", width=1, height=1, file="banners/with space/ban ner.gif", is_active=False
+    )
+    return advertisement
+
+
+def fetch_both(client, monkeypatch, view_class, url):
+    fast = client.get(url)
+    monkeypatch.setattr(view_class, "fast_serializer_class", None)
+    monkeypatch.setattr(view_class, "cache_name", f"{view_class.cache_name}-model")
+    slow = client.get(url)
+    assert fast.status_code == slow.status_code == 200
+    return fast.json(), slow.json()
+
+
+@pytest.mark.django_db
+def test_campaign_list_parity(auth_client, user_view_group, catalog, monkeypatch):
+    fast, slow = fetch_both(auth_client, monkeypatch, views.CampaignListCreateView, reverse("api:campaigns"))
+
+    assert len(fast["results"]) == 2
+    assert fast == slow
+
+
+@pytest.mark.django_db
+def test_advertisement_list_parity(auth_client, user_view_group, catalog, monkeypatch):
+    url = reverse("api:ads", args=[catalog.campaign_id])
+    fast, slow = fetch_both(auth_client, monkeypatch, views.AdvertisementListCreateView, url)
+
+    assert len(fast["results"]) == 2
+    assert fast == slow
+
+
+@pytest.mark.django_db
+def test_banner_list_parity(auth_client, user_view_group, catalog, monkeypatch):
+    url = reverse("api:banners", args=[catalog.id])
+    fast, slow = fetch_both(auth_client, monkeypatch, views.BannerListCreateView, url)
+
+    assert len(fast["results"]) == 4
+    assert fast["results"][0]["file"].startswith("http://testserver/")
+    assert fast == slow
+
+
+@pytest.mark.django_db
+def test_fast_list_cursor(auth_client, user_view_group, catalog):
+    first = auth_client.get(reverse("api:campaigns"), {"page_size": 1}).json()
+    second = auth_client.get(first["next"]).json()
+
+    assert [item["name"] for item in first["results"] + second["results"]] == ["Max impressions", "Test campaign user"]
+    assert second["next"] is None
+
+
+@pytest.mark.django_db
+def test_benchmark_serializers(catalog):
+    out = io.StringIO()
+    call_command("benchmark_serializers", "--model", "banner", "--repeat", "2", stdout=out)
+
+    assert "BannerValuesSerializer" in out.getvalue()
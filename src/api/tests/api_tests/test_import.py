@@ -0,0 +1,120 @@
+import io
+import json
+
+import pytest
+from django.contrib.auth.models import Permission
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.urls import reverse
+
+from api import imports
+from core import export
+from core.models import ads as ad_models
+from core.models import imports as import_models
+from core.models import stats as stats_models
+
+
+def campaign_row(campaign_id, **extra):
+    return {
+        "campaign_id": campaign_id,
+        "campaign_name": f"Campaign {campaign_id}",
+        "start_date": "2024-01-01",
+        "end_date": "2024-01-31",
+        "budget": "100.00",
+        "strategy": "evenly",
+        **extra,
+    }
+
+
+def ad_row(campaign_id, advertisement_id, **extra):
+    ad = {
+        "advertisement_id": advertisement_id,
+        "advertisement_name": f"Ad {advertisement_id}",
+        "place": "site",
+        "url": "https://example.com",
+        "description": "-",
+    }
+    return campaign_row(campaign_id, **{**ad, **extra})
+
+
+@pytest.fixture
+def user_add_permission(user):
+    user.user_permissions.add(Permission.objects.get(codename="add_campaign"))
+
+
+@pytest.mark.django_db
+def test_import_reports_bad_rows(user):
+    rows = [
+        campaign_row(1),
+        campaign_row(2, end_date="2023-01-01"),
+        campaign_row(3, strategy="max_impressions"),
+        ad_row(4, 1),
+        ad_row(4, 1),
+        ad_row(4, 2, url="not a url"),
+        {"__error__": "Некорректный JSON"},
+    ]
+    errors = []
+    counts = imports.CampaignImporter(user, batch_size=2, on_error=lambda *error: errors.append(error)).run(rows)
+
+    assert counts["campaigns"] == 2
+    assert counts["advertisements"] == 1
+    assert counts["failed"] == 4
+    assert [row for row, _ in errors] == [2, 3, 6, 7]
+    assert stats_models.CampaignStats.objects.get(campaign__name="Campaign 4").ad_count == 1
+    assert stats_models.CampaignStats.objects.get(campaign__name="Campaign 1").ad_count == 0
+
+
+@pytest.mark.django_db
+def test_import_resumes_from_checkpoint(user):
+    rows = [ad_row(1, 1), ad_row(1, 2), ad_row(2, 3)]
+    checkpoint = imports.get_checkpoint("test")
+    imports.CampaignImporter(user, batch_size=1, checkpoint=checkpoint).run(rows[:2])
+
+    assert checkpoint.position == 2
+    counts = imports.CampaignImporter(user, batch_size=1, checkpoint=checkpoint).run(rows)
+
+    assert counts["skipped"] == 2
+    assert ad_models.Campaign.objects.count() == 2
+    assert ad_models.Advertisement.objects.filter(campaign__name="Campaign 1").count() == 2
+    assert import_models.ImportCheckpoint.objects.get(name="test").position == 3
+
+
+@pytest.fixture
+def catalog_user_banners(settings, tmp_path, advertisement):
+    settings.MEDIA_ROOT = tmp_path
+    for i in range(2):
+        (tmp_path / "banners").mkdir(exist_ok=True)
+        (tmp_path / "banners" / f"{i}.png").write_bytes(b"png")
+        ad_models.Banner.objects.create(advertisement=advertisement, uid=f"b-{i}", width=1, height=1, file=f"banners/{i}.png")
+
+
+@pytest.mark.django_db
+def test_export_import_round_trip(user, super_user, catalog_user_banners):
+    lines = "".join(export.export_lines(user, "csv"))
+    ad_models.Banner.objects.all().delete()
+    counts = imports.CampaignImporter(super_user).run(imports.read_rows(io.StringIO(lines), "csv"))
+
+    assert counts == {"campaigns": 1, "advertisements": 1, "banners": 2, "failed": 0, "skipped": 0}
+    assert stats_models.AdvertisementStats.objects.get(advertisement__campaign__user=super_user).banner_count == 2
+
+
+@pytest.mark.django_db
+def test_import_endpoint(auth_client, user_add_permission):
+    content = "\n".join(json.dumps(row) for row in [campaign_row(1), campaign_row(2, budget="-1"), "[]"])
+    upload = SimpleUploadedFile("campaigns.ndjson", content.encode())
+    response = auth_client.post(reverse("api:campaign_import"), {"file": upload}, format="multipart")
+
+    assert response.status_code == 201
+    assert response.data["campaigns"] == 1
+    assert [error["row"] for error in response.data["errors"]] == [2, 3]
+
+
+@pytest.mark.django_db
+def test_import_command(user, tmp_path):
+    path = tmp_path / "campaigns.ndjson"
+    path.write_text("\n".join(json.dumps(ad_row(1, i)) for i in range(5)))
+    call_command("import_campaigns", str(path), user.username, "--batch-size", "2")
+    call_command("import_campaigns", str(path), user.username)
+
+    assert ad_models.Campaign.objects.count() == 1
+    assert ad_models.Advertisement.objects.count() == 5
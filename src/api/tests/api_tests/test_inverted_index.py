@@ -0,0 +1,83 @@
+import random
+
+import pytest
+from django.urls import reverse
+
+from core.management.commands.benchmark_targeting import random_request, random_targeting
+from core.serving.index import decision_index
+from core.serving.inverted_index import TargetingIndex
+from core.serving.pacing import pacer
+from core.targeting import compile_targeting
+
+
+def brute_force(matchers, attributes, hour, place):
+    return {campaign_id for campaign_id, matcher in matchers.items() if matcher.matches(attributes, hour, place)}
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_inverted_index_agrees_with_brute_force(seed):
+    rng = random.Random(seed)
+    matchers = {campaign_id: compile_targeting(random_targeting(rng)) for campaign_id in range(500)}
+    index = TargetingIndex()
+    for campaign_id, matcher in matchers.items():
+        index.add(campaign_id, matcher)
+
+    for _ in range(200):
+        attributes, hour, place = random_request(rng)
+        if rng.random() < 0.2:
+            attributes.pop(rng.choice(list(attributes)))
+        assert index.candidates(attributes, hour, place) == brute_force(matchers, attributes, hour, place)
+
+
+def test_inverted_index_follows_updates_and_removals():
+    rng = random.Random(7)
+    matchers = {campaign_id: compile_targeting(random_targeting(rng)) for campaign_id in range(300)}
+    index = TargetingIndex()
+    for campaign_id, matcher in matchers.items():
+        index.add(campaign_id, matcher)
+
+    for campaign_id in range(0, 300, 3):
+        matchers[campaign_id] = compile_targeting(random_targeting(rng))
+        index.add(campaign_id, matchers[campaign_id])
+    for campaign_id in range(1, 300, 3):
+        del matchers[campaign_id]
+        index.remove(campaign_id)
+
+    assert len(index) == len(matchers)
+    for _ in range(200):
+        attributes, hour, place = random_request(rng)
+        assert index.candidates(attributes, hour, place) == brute_force(matchers, attributes, hour, place)
+
+
+def test_inverted_index_copy_is_independent():
+    rng = random.Random(11)
+    matchers = {campaign_id: compile_targeting(random_targeting(rng)) for campaign_id in range(100)}
+    index = TargetingIndex()
+    for campaign_id, matcher in matchers.items():
+        index.add(campaign_id, matcher)
+
+    clone = index.copy()
+    for campaign_id in range(0, 100, 2):
+        clone.remove(campaign_id)
+    clone.add(100, compile_targeting(random_targeting(rng)))
+
+    assert (len(index), len(clone)) == (100, 51)
+    for _ in range(100):
+        attributes, hour, place = random_request(rng)
+        assert index.candidates(attributes, hour, place) == brute_force(matchers, attributes, hour, place)
+
+
+@pytest.mark.django_db
+def test_campaign_delete_leaves_index(simple_api_client, campaign, banners, settings):
+    settings.DECISION_INDEX_POLL_SECONDS = 0
+    decision_index.reset()
+    pacer.reset()
+    url = reverse("api:decide")
+    params = {"place": "site", "width": 300, "height": 250}
+    assert simple_api_client.get(url, params).status_code == 200
+
+    campaign.delete()
+
+    assert simple_api_client.get(url, params).status_code == 204
+    assert len(decision_index._targeting) == 0
+    decision_index.reset()
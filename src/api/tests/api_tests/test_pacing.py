@@ -0,0 +1,75 @@
+import datetime
+
+import pytest
+
+from core.models import events as event_models
+from core.serving.pacing import CacheSpendCounter, load_plans, LocalSpendCounter, Pacer, PacingPlan, simulate_day, UNIFORM_CURVE
+
+NOON = datetime.datetime(2026, 3, 1, 12, tzinfo=datetime.timezone.utc)
+
+
+def make_pacer(spent_today, rng=lambda: 0.5, counter=None):
+    plan = PacingPlan(daily_budget=24.0, impression_cost=1.0, spent_today=spent_today)
+    return Pacer(loader=lambda today: ({1: plan}, UNIFORM_CURVE), rng=rng, counter=counter or LocalSpendCounter())
+
+
+def test_pacer_serves_when_behind():
+    pacer = make_pacer(spent_today=5.0)
+
+    assert pacer.allow(1, NOON)
+    assert not pacer.allow(2, NOON)
+
+
+def test_pacer_throttles_when_ahead():
+    # Счётчик видел те же показы, что уже попали в агрегаты
+    counter = LocalSpendCounter()
+    counter.add(1, NOON.date(), 12.02)
+    pacer = make_pacer(spent_today=12.02, rng=lambda: 0.5, counter=counter)
+    assert pacer.allow(1, NOON)
+
+    pacer.record(1)
+    assert not pacer.allow(1, NOON)
+
+
+def test_pacer_spend_is_shared_between_workers():
+    counter = CacheSpendCounter()
+    counter.add(1, NOON.date(), 12.02)
+    first, second = make_pacer(spent_today=0.0, counter=counter), make_pacer(spent_today=0.0, counter=counter)
+    assert second.allow(1, NOON)
+
+    first.allow(1, NOON)
+    first.record(1)
+    assert counter.get(1, NOON.date()) == 13.02
+    assert not second.allow(1, NOON)
+
+
+def test_pacer_stops_at_daily_budget():
+    pacer = make_pacer(spent_today=23.5, rng=lambda: 0.0)
+
+    assert not pacer.allow(1, NOON.replace(hour=23, minute=59))
+
+
+def test_simulated_day_is_smooth():
+    report = simulate_day(campaigns=5, requests=30_000, seed=1)
+
+    assert report["delivered_share"] > 0.95
+    assert report["hourly_deviation_mean"] < 0.15
+
+
+@pytest.mark.django_db
+def test_load_plans_spreads_remaining_budget(campaign, banners):
+    campaign.end_date = campaign.start_date + datetime.timedelta(days=4)
+    campaign.save()
+    event_models.DailyDeliveryRollup.objects.create(
+        bucket=campaign.start_date - datetime.timedelta(days=1),
+        banner=banners[0],
+        advertisement_id=banners[0].advertisement_id,
+        campaign=campaign,
+        impressions=1000,
+        spend=500,
+    )
+
+    plan = load_plans(campaign.start_date)[campaign.id]
+
+    assert plan.daily_budget == 100.0
+    assert plan.impression_cost == 0.5
@@ -0,0 +1,64 @@
+import datetime
+
+import pytest
+from django.urls import reverse
+
+from core.models import ads as ad_models
+
+
+@pytest.fixture
+def many_campaigns(user):
+    return [
+        ad_models.Campaign.objects.create(
+            name=f"Campaign {i}",
+            start_date=datetime.date.today(),
+            end_date=datetime.date.today(),
+            budget=1000,
+            strategy=ad_models.Campaign.SpendingStrategy.EVENLY,
+            user=user,
+        )
+        for i in range(25)
+    ]
+
+
+@pytest.mark.django_db
+def test_campaign_cursor_walks_all_pages(auth_client, user_view_group, many_campaigns):
+    url = reverse("api:campaigns")
+    seen = []
+    response = auth_client.get(url, {"page_size": 7})
+    assert response.data["count"] == 25
+    while True:
+        seen += [item["id"] for item in response.data["results"]]
+        if not response.data["next"]:
+            break
+        response = auth_client.get(response.data["next"])
+
+    assert seen == sorted((campaign.id for campaign in many_campaigns), reverse=True)
+
+
+@pytest.mark.django_db
+def test_campaign_cursor_without_count(auth_client, user_view_group, many_campaigns):
+    url = reverse("api:campaigns")
+    response = auth_client.get(url, {"count": "false"})
+
+    assert response.status_code == 200
+    assert "count" not in response.data
+    assert len(response.data["results"]) == 10
+
+
+@pytest.mark.django_db
+def test_invalid_cursor(auth_client, user_view_group, campaign):
+    url = reverse("api:campaigns")
+    response = auth_client.get(url, {"cursor": "not-a-cursor"})
+
+    assert response.status_code == 404
+
+
+@pytest.mark.django_db
+def test_banner_list_cursor(auth_client, user_view_group, banners):
+    url = reverse("api:banners", args=[banners[0].advertisement_id])
+    response = auth_client.get(url)
+
+    assert response.status_code == 200
+    assert [item["uid"] for item in response.data["results"]] == ["banner-2", "banner-1", "banner-0"]
+    assert response.data["next"] is None
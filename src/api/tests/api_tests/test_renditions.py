@@ -0,0 +1,162 @@
+import datetime
+import io
+import os
+import struct
+
+import pytest
+from django.contrib.auth.models import Permission
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from core import renditions, tasks
+from core.models import ads as ad_models
+from core.models import assets as asset_models
+from core.models import tasks as task_models
+from core.storage import banner_storage
+
+
+def gif(width, height):
+    return b"GIF89a" + struct.pack("<HH", width, height) + b"\x00" * 16
+
+
+def fake_render(payload):
+    return [{"kind": "thumbnail", "name": payload["source"], "width": 16, "height": 16}]
+
+
+def broken_render(payload):
+    raise RuntimeError("broken")
+
+
+def crashing_task(payload):
+    if payload["crash"]:
+        os._exit(1)
+    return payload
+
+
+@pytest.fixture
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    return tmp_path
+
+
+@pytest.fixture
+def user_banner_permissions(user):
+    user.user_permissions.add(*Permission.objects.filter(content_type__model="banner"))
+
+
+@pytest.fixture
+def fake_handlers(monkeypatch):
+    monkeypatch.setitem(tasks.HANDLERS, renditions.TASK_NAME, (f"{__name__}.fake_render", "core.renditions.save"))
+
+
+@pytest.mark.django_db
+def test_upload_schedules_one_task_per_file(auth_client, user_banner_permissions, advertisement, media_root):
+    for uid in ("first", "second"):
+        data = {"uid": uid, "file": SimpleUploadedFile("creative.gif", gif(300, 250))}
+        assert auth_client.post(reverse("api:banners", args=[advertisement.id]), data, format="multipart").status_code == 201
+    data = {"uid": "html", "width": 300, "height": 250, "file": SimpleUploadedFile("creative.html", b"<html></html>")}
+    assert auth_client.post(reverse("api:banners", args=[advertisement.id]), data, format="multipart").status_code == 201
+
+    (task,) = task_models.Task.objects.filter(name=renditions.TASK_NAME)
+    assert task.payload == {"source": ad_models.Banner.objects.get(uid="first").file.name}
+
+
+@pytest.mark.django_db
+def test_claim_is_exclusive_until_lease_expires():
+    task_models.Task.objects.enqueue("noop", [("a", {}), ("b", {})])
+
+    claimed = task_models.Task.objects.claim(10, lease_seconds=60)
+    assert [task.attempts for task in claimed] == [1, 1]
+    assert task_models.Task.objects.claim(10, lease_seconds=60) == []
+
+    task_models.Task.objects.filter(pk=claimed[0].pk).update(leased_until=timezone.now() - datetime.timedelta(seconds=1))
+    (reclaimed,) = task_models.Task.objects.claim(10, lease_seconds=60)
+    assert reclaimed.pk == claimed[0].pk and reclaimed.attempts == 2
+    # Старая аренда больше не может завершить задачу
+    assert task_models.Task.objects.complete(claimed[0]) == 0
+
+
+@pytest.mark.django_db
+def test_fail_backs_off_then_gives_up():
+    task_models.Task.objects.enqueue("noop", [("a", {})])
+
+    (task,) = task_models.Task.objects.claim(1, lease_seconds=60)
+    task_models.Task.objects.fail(task, "boom", max_attempts=2, retry_delay=30)
+    task.refresh_from_db()
+    assert task.status == task_models.Task.Status.PENDING and task.available_at > timezone.now()
+
+    task_models.Task.objects.filter(pk=task.pk).update(available_at=timezone.now())
+    (task,) = task_models.Task.objects.claim(1, lease_seconds=60)
+    task_models.Task.objects.fail(task, "boom", max_attempts=2, retry_delay=30)
+    task.refresh_from_db()
+    assert task.status == task_models.Task.Status.FAILED and task.error == "boom"
+
+
+@pytest.mark.django_db(transaction=True)
+def test_worker_stores_renditions(auth_client, user_banner_permissions, advertisement, media_root, fake_handlers):
+    banner = ad_models.Banner.objects.create(
+        advertisement=advertisement,
+        uid="banner",
+        width=300,
+        height=250,
+        file=banner_storage().save("a.gif", ContentFile(gif(300, 250))),
+    )
+    url = reverse("api:banners", args=[advertisement.id])
+    assert auth_client.get(url).data["results"][0]["renditions"] == {}
+
+    call_command("run_tasks", "--workers", "1", "--once", stdout=io.StringIO())
+
+    assert task_models.Task.objects.get().status == task_models.Task.Status.DONE
+    rendition = asset_models.BannerRendition.objects.get(source=banner.file.name)
+    assert (rendition.kind, rendition.width) == ("thumbnail", 16)
+    assert auth_client.get(url).data["results"][0]["renditions"] == {
+        "thumbnail": f"http://testserver{banner_storage().url(banner.file.name)}"
+    }
+    detail = auth_client.get(reverse("api:banner_detail", args=[advertisement.id, banner.id]))
+    assert detail.data["renditions"] == {"thumbnail": f"http://testserver{banner_storage().url(banner.file.name)}"}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_worker_records_errors(monkeypatch, advertisement, media_root):
+    monkeypatch.setitem(tasks.HANDLERS, renditions.TASK_NAME, (f"{__name__}.broken_render", "core.renditions.save"))
+    renditions.schedule(["banners/blobs/aa/bb/missing.png"])
+
+    call_command("run_tasks", "--workers", "1", "--once", "--max-attempts", "1", stdout=io.StringIO())
+
+    task = task_models.Task.objects.get()
+    assert task.status == task_models.Task.Status.FAILED
+    assert task.error == "RuntimeError: broken"
+
+
+@pytest.mark.django_db(transaction=True)
+def test_worker_survives_dead_pool_process(monkeypatch):
+    monkeypatch.setitem(tasks.HANDLERS, "crash", (f"{__name__}.crashing_task", None))
+    crashing, *collateral = [
+        task_models.Task.objects.create(name="crash", payload={"crash": crash}) for crash in (True, False, False, False)
+    ]
+
+    call_command("run_tasks", "--workers", "2", "--once", "--max-attempts", "1", stdout=io.StringIO())
+
+    crashing.refresh_from_db()
+    assert crashing.status == task_models.Task.Status.FAILED
+    assert crashing.error == "Процесс пула аварийно завершился"
+    for task in collateral:
+        task.refresh_from_db()
+        assert (task.status, task.attempts) == (task_models.Task.Status.DONE, 1)
+
+
+@pytest.mark.django_db
+def test_render_bounds_large_images(media_root, settings):
+    settings.BANNER_RENDITIONS = {"thumbnail": (100, 100)}
+    buffer = io.BytesIO()
+    Image.new("RGB", (2000, 500), "red").save(buffer, "JPEG")
+    source = banner_storage().save("big.jpg", ContentFile(buffer.getvalue()))
+
+    (rendition,) = renditions.render({"source": source})
+
+    assert (rendition["width"], rendition["height"]) == (100, 25)
+    assert rendition["name"] != source and rendition["name"].endswith(".jpeg")
@@ -0,0 +1,58 @@
+import pytest
+from django.urls import reverse
+
+from api.response_cache import response_cache
+from core.models import ads as ad_models
+
+
+@pytest.mark.django_db
+def test_repeated_listing_served_from_cache(auth_client, user_view_group, advertisement, banners, django_assert_num_queries):
+    url = reverse("api:banners", args=[advertisement.id])
+    first = auth_client.get(url)
+    assert first["X-Cache"] == "MISS"
+
+    with django_assert_num_queries(0):
+        second = auth_client.get(url)
+
+    assert second["X-Cache"] == "HIT"
+    assert second.json() == first.json()
+    assert second["ETag"] == first["ETag"]
+    assert response_cache.metrics()["banners"] == {"hits": 1, "misses": 1, "hit_ratio": 0.5}
+
+
+@pytest.mark.django_db
+def test_write_in_subtree_invalidates_listings(auth_client, user_view_group, campaign, advertisement, banners):
+    campaigns_url = reverse("api:campaigns")
+    banners_url = reverse("api:banners", args=[advertisement.id])
+    auth_client.get(campaigns_url)
+    auth_client.get(banners_url)
+
+    ad_models.Banner.objects.create(advertisement=advertisement, uid="new", width=1, height=1, file="banners/new.jpg")
+
+    campaigns = auth_client.get(campaigns_url)
+    assert campaigns["X-Cache"] == "MISS"
+    assert campaigns.data["results"][0]["banner_count"] == 4
+    assert auth_client.get(banners_url)["X-Cache"] == "MISS"
+
+
+@pytest.mark.django_db
+def test_cache_is_per_user_and_page(auth_client, user_view_group, super_user, advertisement, banners):
+    url = reverse("api:banners", args=[advertisement.id])
+    auth_client.get(url)
+
+    assert auth_client.get(url, {"page_size": 1})["X-Cache"] == "MISS"
+
+    auth_client.force_authenticate(user=super_user)
+    assert auth_client.get(url).status_code == 404
+
+
+@pytest.mark.django_db
+def test_delete_invalidates_listings(auth_client, user_view_group, advertisement, banners):
+    url = reverse("api:banners", args=[advertisement.id])
+    auth_client.get(url)
+
+    ad_models.Banner.objects.filter(id=banners[0].id).delete()
+
+    response = auth_client.get(url)
+    assert response["X-Cache"] == "MISS"
+    assert len(response.data["results"]) == 2
@@ -0,0 +1,106 @@
+import datetime
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+
+from core.models import ads as ad_models
+from core.serving import snapshot
+from core.serving.index import decision_index
+from core.serving.pacing import pacer
+
+
+@pytest.fixture
+def snapshot_path(settings, tmp_path):
+    settings.SERVING_SNAPSHOT_PATH = str(tmp_path / "serving.snap")
+    decision_index.reset()
+    pacer.reset()
+    yield tmp_path / "serving.snap"
+    settings.SERVING_SNAPSHOT_PATH = None
+    decision_index.reset()
+
+
+@pytest.mark.django_db
+def test_round_trip(banners, snapshot_path):
+    version = snapshot.publish(snapshot_path, snapshot.live_campaigns())
+
+    loaded = snapshot.load(snapshot_path)
+    assert loaded.version == version
+    assert [campaign["id"] for campaign in loaded.campaigns] == [banners[0].advertisement.campaign_id]
+    assert [banner["uid"] for banner in loaded.campaigns[0]["banners"]] == [banner.uid for banner in banners]
+
+
+@pytest.mark.django_db
+def test_only_live_campaigns(campaign, banners, snapshot_path):
+    ad_models.Banner.objects.filter(pk=banners[0].pk).update(is_active=False)
+    finished = ad_models.Campaign.objects.create(
+        name="Finished",
+        start_date=datetime.date.today() - datetime.timedelta(days=10),
+        end_date=datetime.date.today() - datetime.timedelta(days=1),
+        budget=10,
+        strategy=ad_models.Campaign.SpendingStrategy.EVENLY,
+        user=campaign.user,
+    )
+    advertisement = ad_models.Advertisement.objects.create(
+        name="Old", campaign=finished, place=ad_models.Advertisement.Placement.SITE, url="https://example.com"
+    )
+    ad_models.Banner.objects.create(advertisement=advertisement, uid="old", width=300, height=250, file="banners/old.png")
+
+    campaigns = snapshot.live_campaigns()
+    assert [c["id"] for c in campaigns] == [campaign.id]
+    assert {banner["uid"] for banner in campaigns[0]["banners"]} == {banners[1].uid, banners[2].uid}
+
+    ad_models.Campaign.objects.filter(pk=campaign.pk).update(targeting={"placement": ["mobile_app"]})
+    assert snapshot.live_campaigns() == []
+
+
+@pytest.mark.django_db
+def test_unchanged_snapshot_is_not_rewritten(banners, snapshot_path):
+    assert snapshot.publish(snapshot_path, snapshot.live_campaigns()) is not None
+    inode = snapshot_path.stat().st_ino
+
+    assert snapshot.publish(snapshot_path, snapshot.live_campaigns()) is None
+    assert snapshot_path.stat().st_ino == inode
+
+
+def test_corrupted_snapshot_is_rejected(snapshot_path):
+    snapshot.publish(snapshot_path, [])
+    data = bytearray(snapshot_path.read_bytes())
+    data[-1] ^= 0xFF
+    snapshot_path.write_bytes(bytes(data))
+
+    with pytest.raises(snapshot.SnapshotError):
+        snapshot.load(snapshot_path)
+
+
+def test_reader_swaps_on_new_version(snapshot_path):
+    reader = snapshot.SnapshotReader(snapshot_path, check_interval=0)
+    assert reader.get() is None
+
+    snapshot.publish(snapshot_path, [])
+    first = reader.get()
+    assert first.campaigns == []
+    assert reader.get() is first
+
+    snapshot.publish(snapshot_path, [{"id": 1, "banners": []}])
+    assert reader.get().version > first.version
+
+
+@pytest.mark.django_db
+def test_decide_serves_from_snapshot(simple_api_client, banners, snapshot_path, django_assert_num_queries):
+    call_command("build_serving_snapshot", "--once")
+    url = reverse("api:decide")
+    simple_api_client.get(url, {"place": "site", "width": 300, "height": 250})
+    # Снимок не меняется вместе с базой: баннеры подменяются только следующей публикацией
+    ad_models.Banner.objects.all().delete()
+
+    with django_assert_num_queries(0):
+        response = simple_api_client.get(url, {"place": "site", "width": 300, "height": 250})
+    assert response.status_code == 200
+    assert response.data["uid"] in {banner.uid for banner in banners}
+
+    call_command("build_serving_snapshot", "--once")
+    decision_index._snapshots.check_interval = 0
+    decision_index._snapshots._next_check = 0
+    response = simple_api_client.get(url, {"place": "site", "width": 300, "height": 250})
+    assert response.status_code == 204
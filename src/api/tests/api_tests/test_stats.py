@@ -0,0 +1,84 @@
+import pytest
+from django.core.management import call_command, CommandError
+
+from core.models import ads as ad_models
+from core.models import changes as change_models
+from core.models import stats as stats_models
+
+
+@pytest.mark.django_db
+def test_stats_follow_banner_changes(campaign, advertisement, banners):
+    stats = stats_models.CampaignStats.objects.get(campaign=campaign)
+    assert (stats.ad_count, stats.banner_count, stats.active_banner_count) == (1, 3, 3)
+    assert stats.file_formats == ["gif", "png"]
+
+    banners[0].is_active = False
+    banners[0].save(update_fields=["is_active"])
+    banners[2].delete()
+
+    stats.refresh_from_db()
+    ad_stats = stats_models.AdvertisementStats.objects.get(advertisement=advertisement)
+    assert (stats.banner_count, stats.active_banner_count, stats.file_formats) == (2, 1, ["png"])
+    assert (ad_stats.banner_count, ad_stats.active_banner_count, ad_stats.file_formats) == (2, 1, ["png"])
+
+
+@pytest.mark.django_db
+def test_stats_follow_advertisement_delete(campaign, advertisement, banners):
+    advertisement.delete()
+
+    stats = stats_models.CampaignStats.objects.get(campaign=campaign)
+    assert (stats.ad_count, stats.banner_count, stats.format_mask) == (0, 0, 0)
+
+    campaign.delete()
+    assert not stats_models.CampaignStats.objects.exists()
+
+
+@pytest.mark.django_db
+def test_stats_follow_reparenting(user, campaign, advertisement, banners):
+    other_campaign = ad_models.Campaign.objects.create(
+        name="Other campaign",
+        start_date=campaign.start_date,
+        end_date=campaign.end_date,
+        budget=1000,
+        strategy=campaign.strategy,
+        user=user,
+    )
+    other_ad = ad_models.Advertisement.objects.create(
+        name="Other advertisement", campaign=other_campaign, place=advertisement.place, url=advertisement.url
+    )
+    start = change_models.ChangeEvent.objects.order_by("-id").values_list("id", flat=True).first()
+
+    banners[2].advertisement = other_ad
+    banners[2].save()
+
+    ad_stats = stats_models.AdvertisementStats.objects.get(advertisement=advertisement)
+    stats = stats_models.CampaignStats.objects.get(campaign=campaign)
+    assert (ad_stats.banner_count, ad_stats.file_formats) == (2, ["png"])
+    assert (stats.banner_count, stats.file_formats) == (2, ["png"])
+    assert stats_models.CampaignStats.objects.get(campaign=other_campaign).banner_count == 1
+    # Потребители журнала узнают и о прежней кампании баннера
+    assert {campaign.id, other_campaign.id} <= set(
+        change_models.ChangeEvent.objects.filter(id__gt=start).values_list("campaign_id", flat=True)
+    )
+
+    advertisement.campaign = other_campaign
+    advertisement.save()
+
+    stats.refresh_from_db()
+    assert (stats.ad_count, stats.banner_count, stats.format_mask) == (0, 0, 0)
+    other_stats = stats_models.CampaignStats.objects.get(campaign=other_campaign)
+    assert (other_stats.ad_count, other_stats.banner_count) == (2, 3)
+    call_command("rebuild_stats", "--check")
+
+
+@pytest.mark.django_db
+def test_rebuild_stats_fixes_drift(campaign, banners):
+    call_command("rebuild_stats", "--check")
+
+    ad_models.Banner.objects.update(is_active=False)
+    with pytest.raises(CommandError):
+        call_command("rebuild_stats", "--check")
+
+    call_command("rebuild_stats")
+    call_command("rebuild_stats", "--check")
+    assert stats_models.CampaignStats.objects.get(campaign=campaign).active_banner_count == 0
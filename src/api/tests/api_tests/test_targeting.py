@@ -0,0 +1,89 @@
+import datetime
+import io
+import random
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+
+from core.management.commands.benchmark_targeting import random_request, random_targeting
+from core.models import ads as ad_models
+from core.serving.index import decision_index
+from core.targeting import compile_targeting, naive_match
+
+
+def campaign_data(targeting):
+    return {
+        "name": "Targeted campaign",
+        "start_date": datetime.date.today(),
+        "end_date": datetime.date.today(),
+        "budget": 1000,
+        "strategy": "evenly",
+        "targeting": targeting,
+    }
+
+
+@pytest.mark.django_db
+def test_create_campaign_normalizes_targeting(auth_super_client):
+    url = reverse("api:campaigns")
+    targeting = {"geo": ["spb", "msk", "msk"], "hour": {"exclude": [3, 1]}}
+    response = auth_super_client.post(url, campaign_data(targeting), format="json")
+
+    assert response.status_code == 201
+    assert response.data["targeting"] == {"geo": {"include": ["msk", "spb"]}, "hour": {"exclude": [1, 3]}}
+
+
+@pytest.mark.parametrize(
+    "targeting",
+    [
+        {"city": ["msk"]},
+        {"geo": "msk"},
+        {"geo": {"only": ["msk"]}},
+        {"hour": [25]},
+        {"placement": {"include": ["tv"]}},
+        ["msk"],
+    ],
+)
+@pytest.mark.django_db
+def test_create_campaign_with_invalid_targeting(auth_super_client, targeting):
+    url = reverse("api:campaigns")
+    response = auth_super_client.post(url, campaign_data(targeting), format="json")
+
+    assert response.status_code == 400
+
+
+def test_compiled_matcher_agrees_with_json():
+    rng = random.Random(42)
+    targetings = [random_targeting(rng) for _ in range(300)]
+    requests = [random_request(rng) for _ in range(100)]
+
+    for targeting in targetings:
+        matcher = compile_targeting(targeting)
+        for attributes, hour, place in requests:
+            assert matcher.matches(attributes, hour, place) == naive_match(targeting, attributes, hour, place)
+
+
+def test_matcher_is_shared_between_equal_rules():
+    assert compile_targeting({"geo": ["a", "b"]}) is compile_targeting({"geo": {"include": ["b", "a"]}})
+
+
+@pytest.mark.django_db
+def test_check_targeting_reports_and_fixes_legacy_rules(campaign, campaign_super_user, banners, caplog):
+    ad_models.Campaign.objects.filter(pk=campaign.pk).update(targeting={"geo": "msk"})
+    ad_models.Campaign.objects.filter(pk=campaign_super_user.pk).update(targeting={"geo": ["spb", "msk"]})
+
+    decision_index.reset()
+    decision_index.sync()
+    assert f"Кампания {campaign.id} пропущена" in caplog.text
+    decision_index.reset()
+
+    out = io.StringIO()
+    call_command("check_targeting", "--fix", stdout=out)
+    assert f"Кампания {campaign.id}:" in out.getvalue()
+    assert "Некорректный таргетинг: 1, не в каноническом виде: 1" in out.getvalue()
+    campaign_super_user.refresh_from_db()
+    assert campaign_super_user.targeting == {"geo": {"include": ["msk", "spb"]}}
+
+    call_command("check_targeting", "--clear-invalid", stdout=io.StringIO())
+    campaign.refresh_from_db()
+    assert campaign.targeting == {}
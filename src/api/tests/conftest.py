@@ -2,12 +2,20 @@ import datetime
 
 import pytest
 from django.contrib.auth.models import Group, Permission
+from django.core.cache import caches
 from rest_framework.test import APIClient
 
 from core.models import ads as ad_models
 from core.models import users as user_models
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Кеш прав и владения переживает откат транзакции теста, а id объектов в новых тестах повторяются
+    for cache in caches.all():
+        cache.clear()
+
+
 @pytest.fixture
 def simple_api_client():
     client = APIClient()
@@ -67,3 +75,24 @@ def campaign(user):
         strategy=ad_models.Campaign.SpendingStrategy.EVENLY,
         user=user,
     )
+
+
+@pytest.fixture
+def advertisement(campaign):
+    return ad_models.Advertisement.objects.create(
+        name="Test advertisement",
+        campaign=campaign,
+        place=ad_models.Advertisement.Placement.SITE,
+        url="https://example.com",
+        description="Test description",
+    )
+
+
+@pytest.fixture
+def banners(advertisement):
+    return [
+        ad_models.Banner.objects.create(
+            advertisement=advertisement, uid=f"banner-{i}", width=300, height=250, file=f"banners/{i}/banner.{ext}"
+        )
+        for i, ext in enumerate(["png", "PNG", "gif"])
+    ]
@@ -1,14 +1,54 @@
 from django.urls import path
 
+from . import async_views, delivery
 from . import views as api_view
 
 app_name = "api"
 
 urlpatterns = [
-    path("campaigns", api_view.CampaignListCreateView.as_view(), name="campaigns"),
-    path("campaigns/<int:pk>", api_view.CampaignDetailView.as_view(), name="campaign_detail"),
-    path("campaigns/<int:campaign_id>/ads", api_view.AdvertisementListCreateView.as_view(), name="ads"),
-    path("campaigns/<int:campaign_id>/ads/<int:pk>", api_view.AdvertisementDetailView.as_view(), name="ad_detail"),
-    path("ads/<int:ad_id>/banners", api_view.BannerListCreateView.as_view(), name="banners"),
-    path("ads/<int:ad_id>/banners/<int:pk>", api_view.BannerDetailView.as_view(), name="banner_detail"),
+    path(
+        "campaigns",
+        async_views.read_view(api_view.CampaignListCreateView.as_view(), async_views.CampaignListView.as_view()),
+        name="campaigns",
+    ),
+    path(
+        "campaigns/<int:pk>",
+        async_views.read_view(api_view.CampaignDetailView.as_view(), async_views.CampaignDetailView.as_view()),
+        name="campaign_detail",
+    ),
+    path("campaigns/export", api_view.CampaignExportView.as_view(), name="campaign_export"),
+    path("campaigns/import", api_view.CampaignImportView.as_view(), name="campaign_import"),
+    path("campaigns/<int:pk>/stats", api_view.CampaignDeliveryStatsView.as_view(), name="campaign_stats"),
+    path(
+        "campaigns/<int:campaign_id>/ads",
+        async_views.read_view(api_view.AdvertisementListCreateView.as_view(), async_views.AdvertisementListView.as_view()),
+        name="ads",
+    ),
+    path("campaigns/<int:campaign_id>/ads/bulk", api_view.AdvertisementBulkView.as_view(), name="ads_bulk"),
+    path(
+        "campaigns/<int:campaign_id>/ads/<int:pk>",
+        async_views.read_view(api_view.AdvertisementDetailView.as_view(), async_views.AdvertisementDetailView.as_view()),
+        name="ad_detail",
+    ),
+    path(
+        "ads/<int:ad_id>/banners",
+        async_views.read_view(api_view.BannerListCreateView.as_view(), async_views.BannerListView.as_view()),
+        name="banners",
+    ),
+    path("ads/<int:ad_id>/banners/bulk", api_view.BannerBulkView.as_view(), name="banners_bulk"),
+    path("ads/<int:ad_id>/banners/uploads", api_view.BannerUploadCreateView.as_view(), name="banner_uploads"),
+    path("ads/<int:ad_id>/banners/uploads/<uuid:pk>", api_view.BannerUploadView.as_view(), name="banner_upload"),
+    path(
+        "ads/<int:ad_id>/banners/uploads/<uuid:pk>/complete",
+        api_view.BannerUploadCompleteView.as_view(),
+        name="banner_upload_complete",
+    ),
+    path(
+        "ads/<int:ad_id>/banners/<int:pk>",
+        async_views.read_view(api_view.BannerDetailView.as_view(), async_views.BannerDetailView.as_view()),
+        name="banner_detail",
+    ),
+    path("assets/<path:name>", delivery.BannerAssetView.as_view(), name="banner_asset"),
+    path("decide", api_view.DecisionView.as_view(), name="decide"),
+    path("events", api_view.DeliveryEventView.as_view(), name="events"),
 ]
@@ -1,13 +1,71 @@
+import abc
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from rest_framework import generics
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import generics, permissions, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-from api import serializers
-from api.pagination import CampaignPagination
+from api import fast_serializers, imports, serializers
+from api.conditional import ConditionalGetMixin
+from api.pagination import CampaignPagination, KeysetPagination
+from api.permissions import BannerUploadPermissions
+from api.response_cache import CachedListMixin
+from core import authz, events, export, outbox, renditions, uploads
 from core.models import ads as ads_models
+from core.models import assets as asset_models
+from core.models import stats as stats_models
+from core.rollups import delivery_stats
+from core.serving.index import decision_index
+from core.signals import bulk_changes
+
+
+class AtomicWriteMixin:
+    """Объект и его запись в журнале изменений (core.outbox) коммитятся вместе."""
+
+    def create(self, request, *args, **kwargs):
+        with transaction.atomic():
+            return super().create(request, *args, **kwargs)
+
+    def update(self, request, *args, **kwargs):
+        with transaction.atomic():
+            return super().update(request, *args, **kwargs)
+
+    def destroy(self, request, *args, **kwargs):
+        with transaction.atomic():
+            return super().destroy(request, *args, **kwargs)
+
 
+class BannerStatsMixin:
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page is not None:
+            queryset.model.objects.attach_banner_stats(page)
+        return page
 
-class CampaignListCreateView(generics.ListCreateAPIView):
+    def get_object(self):
+        obj = super().get_object()
+        obj._meta.model.objects.attach_banner_stats([obj])
+        return obj
+
+
+class CampaignListCreateView(
+    AtomicWriteMixin,
+    CachedListMixin,
+    ConditionalGetMixin,
+    fast_serializers.ValuesListMixin,
+    BannerStatsMixin,
+    generics.ListCreateAPIView,
+):
+    cache_name = "campaigns"
     serializer_class = serializers.CampaignSerializer
+    fast_serializer_class = fast_serializers.CampaignValuesSerializer
     pagination_class = CampaignPagination
 
     def get_queryset(self):
@@ -17,56 +75,441 @@ class CampaignListCreateView(generics.ListCreateAPIView):
         serializer.save(user=self.request.user)
 
 
-class CampaignDetailView(generics.RetrieveUpdateDestroyAPIView):
+class CampaignDetailView(AtomicWriteMixin, ConditionalGetMixin, BannerStatsMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = serializers.CampaignSerializer
 
     def get_queryset(self):
         return ads_models.Campaign.objects.filter(user=self.request.user)
 
 
-class AdvertisementListCreateView(generics.ListCreateAPIView):
+class CampaignDeliveryStatsView(generics.GenericAPIView):
+    def get_queryset(self):
+        return ads_models.Campaign.objects.filter(user=self.request.user)
+
+    def get(self, request, pk):
+        campaign = self.get_object()
+        query = serializers.DeliveryStatsQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        return Response({"campaign": campaign.id, **query.data, **delivery_stats(campaign.id, **query.validated_data)})
+
+
+class CampaignExportView(generics.GenericAPIView):
+    def get_queryset(self):
+        return ads_models.Campaign.objects.filter(user=self.request.user)
+
+    def get(self, request):
+        output_format = request.query_params.get("output", "csv")
+        if output_format not in export.FORMATS:
+            raise ValidationError({"output": [f"Допустимые значения: {', '.join(export.FORMATS)}"]})
+        # Под ASGI нужен асинхронный итератор, под WSGI синхронный: иначе Django соберёт выгрузку в памяти
+        lines = export.aexport_lines if isinstance(request._request, ASGIRequest) else export.export_lines
+        response = StreamingHttpResponse(lines(request.user, output_format), content_type=export.FORMATS[output_format])
+        response["Content-Disposition"] = f'attachment; filename="campaigns.{output_format}"'
+        return response
+
+
+class CampaignImportView(generics.GenericAPIView):
+    max_errors = 100
+
+    def get_queryset(self):
+        return ads_models.Campaign.objects.filter(user=self.request.user)
+
+    def post(self, request):
+        upload = request.FILES.get("file")
+        if upload is None:
+            raise ValidationError({"file": ["Файл не передан"]})
+        input_format = request.query_params.get("input") or imports.detect_format(upload.name)
+        if input_format not in export.FORMATS:
+            raise ValidationError({"input": [f"Допустимые значения: {', '.join(export.FORMATS)}"]})
+
+        errors = []
+
+        def collect(row_number, row_errors):
+            if len(errors) < self.max_errors:
+                errors.append({"row": row_number, "errors": row_errors})
+
+        importer = imports.CampaignImporter(request.user, on_error=collect)
+        counts = importer.run(imports.read_rows(imports.text_stream(upload), input_format))
+        return Response(
+            {**counts, "errors": errors}, status=status.HTTP_201_CREATED if counts["campaigns"] else status.HTTP_200_OK
+        )
+
+
+def check_campaign(request, campaign_id):
+    if not authz.owns_campaign(request.user, campaign_id):
+        raise Http404("No Campaign matches the given query.")
+    return campaign_id
+
+
+def check_advertisement(request, ad_id):
+    if not authz.owns_advertisement(request.user, ad_id):
+        raise Http404("No Advertisement matches the given query.")
+    return ad_id
+
+
+class AdvertisementListCreateView(
+    AtomicWriteMixin,
+    CachedListMixin,
+    ConditionalGetMixin,
+    fast_serializers.ValuesListMixin,
+    BannerStatsMixin,
+    generics.ListCreateAPIView,
+):
+    cache_name = "ads"
     serializer_class = serializers.AdvertisementSerializer
+    fast_serializer_class = fast_serializers.AdvertisementValuesSerializer
+    pagination_class = KeysetPagination
 
-    def get_campaign(self):
-        return get_object_or_404(ads_models.Campaign, id=self.kwargs["campaign_id"], user=self.request.user)
+    def get_queryset(self):
+        return ads_models.Advertisement.objects.filter(campaign_id=check_campaign(self.request, self.kwargs["campaign_id"]))
+
+    def perform_create(self, serializer):
+        serializer.save(campaign_id=check_campaign(self.request, self.kwargs["campaign_id"]))
+
+
+class AdvertisementDetailView(AtomicWriteMixin, ConditionalGetMixin, BannerStatsMixin, generics.RetrieveUpdateDestroyAPIView):
+    serializer_class = serializers.AdvertisementSerializer
+
+    def get_queryset(self):
+        return ads_models.Advertisement.objects.filter(campaign_id=check_campaign(self.request, self.kwargs["campaign_id"]))
+
+
+class BannerListCreateView(
+    AtomicWriteMixin, CachedListMixin, ConditionalGetMixin, fast_serializers.ValuesListMixin, generics.ListCreateAPIView
+):
+    cache_name = "banners"
+    serializer_class = serializers.BannerSerializer
+    fast_serializer_class = fast_serializers.BannerValuesSerializer
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
-        campaign = self.get_campaign()
-        return ads_models.Advertisement.objects.filter(campaign=campaign)
+        return ads_models.Banner.objects.filter(advertisement_id=check_advertisement(self.request, self.kwargs["ad_id"]))
 
     def perform_create(self, serializer):
-        campaign = self.get_campaign()
-        serializer.save(campaign=campaign)
+        serializer.save(advertisement_id=check_advertisement(self.request, self.kwargs["ad_id"]))
+
 
+class BannerDetailView(AtomicWriteMixin, ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
+    serializer_class = serializers.BannerSerializer
+
+    def get_queryset(self):
+        return ads_models.Banner.objects.filter(advertisement_id=check_advertisement(self.request, self.kwargs["ad_id"]))
 
-class AdvertisementDetailView(generics.RetrieveUpdateDestroyAPIView):
+
+def _bulk_id(value):
+    """id элемента массовой операции: только целое число, не bool и не строка."""
+    return value if isinstance(value, int) and not isinstance(value, bool) else None
+
+
+class BulkMixin(abc.ABC):
+    """
+    Массовые операции над дочерними объектами: родитель проверяется один раз, запись идёт
+    через bulk_create/bulk_update в одной транзакции, ошибки возвращаются по индексу элемента.
+    Представление определяет get_parent и mark_changed.
+    """
+
+    bulk_serializer_class = None
+    parent_field = None
+    max_bulk_size = 10_000
+    batch_size = 1000
+
+    @abc.abstractmethod
+    def get_parent(self):
+        """Родитель из URL, проверенный на доступ пользователю."""
+
+    @property
+    def parent(self):
+        if not hasattr(self, "_parent"):
+            self._parent = self.get_parent()
+        return self._parent
+
+    def get_items(self):
+        items = self.request.data
+        if not isinstance(items, list) or not items:
+            raise ValidationError("Ожидается непустой список")
+        if len(items) > self.max_bulk_size:
+            raise ValidationError(f"Не больше {self.max_bulk_size} элементов за запрос")
+        return items
+
+    def validate_items(self, items, partial=False):
+        child = self.bulk_serializer_class(context=self.get_serializer_context(), partial=partial)
+        valid, errors = [], []
+        for index, item in enumerate(items):
+            try:
+                valid.append((index, child.run_validation(item)))
+            except ValidationError as e:
+                errors.append({"index": index, "errors": e.detail})
+        return valid, errors
+
+    def check_batch(self, valid, instances=None):
+        return valid, []
+
+    def before_update(self, obj, data):
+        pass
+
+    @abc.abstractmethod
+    def mark_changed(self, changes, objects, created=False):
+        """Дописывает в changes (bulk_changes) затронутых родителей: bulk-операции не отправляют сигналы."""
+
+    def serialize(self, objects):
+        return self.get_serializer(objects, many=True).data
+
+    def bulk_response(self, key, done, errors, success_status):
+        if errors and not done:
+            response_status = status.HTTP_400_BAD_REQUEST
+        elif errors:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = success_status
+        return Response({key: done, "errors": sorted(errors, key=lambda e: e["index"])}, status=response_status)
+
+    def post(self, request, *args, **kwargs):
+        valid, errors = self.validate_items(self.get_items())
+        valid, batch_errors = self.check_batch(valid)
+        model = self.get_queryset().model
+        objects = [model(**data, **{self.parent_field: self.parent}) for _, data in valid]
+        with transaction.atomic(), bulk_changes() as changes:
+            model.objects.bulk_create(objects, batch_size=self.batch_size)
+            self.mark_changed(changes, objects, created=True)
+            changes["outbox"].extend(outbox.entry(obj, outbox.Action.CREATED) for obj in objects)
+        return self.bulk_response("created", self.serialize(objects), errors + batch_errors, status.HTTP_201_CREATED)
+
+    def patch(self, request, *args, **kwargs):
+        items = self.get_items()
+        ids = [_bulk_id(item.get("id")) if isinstance(item, dict) else None for item in items]
+        instances = self.get_queryset().in_bulk({pk for pk in ids if pk is not None})
+        missing, seen = [], set()
+        for index, pk in enumerate(ids):
+            if pk is None:
+                missing.append({"index": index, "errors": {"id": ["Ожидается целое число"]}})
+            elif pk not in instances:
+                missing.append({"index": index, "errors": {"id": ["Объект не найден"]}})
+            elif pk in seen:
+                # Один объект правится один раз: иначе итог зависел бы от порядка элементов в bulk_update
+                missing.append({"index": index, "errors": {"id": ["Объект уже изменяется в этом запросе"]}})
+            seen.add(pk)
+        missing_indexes = {error["index"] for error in missing}
+        found = [(index, item) for index, item in enumerate(items) if index not in missing_indexes]
+
+        valid, errors = self.validate_items([item for _, item in found], partial=True)
+        valid = [(found[index][0], data) for index, data in valid]
+        errors = [{**error, "index": found[error["index"]][0]} for error in errors]
+        valid, batch_errors = self.check_batch(valid, instances={ids[index]: instances[ids[index]] for index, _ in valid})
+
+        objects, fields = [], {"updated_at"}
+        now = timezone.now()
+        for index, data in valid:
+            obj = instances[ids[index]]
+            self.before_update(obj, data)
+            for field, value in data.items():
+                setattr(obj, field, value)
+            obj.updated_at = now
+            fields.update(data)
+            objects.append(obj)
+        with transaction.atomic(), bulk_changes() as changes:
+            self.get_queryset().model.objects.bulk_update(objects, fields, batch_size=self.batch_size)
+            self.mark_changed(changes, objects)
+            changes["outbox"].extend(outbox.entry(obj, outbox.save_action(obj, created=False)) for obj in objects)
+        return self.bulk_response("updated", self.serialize(objects), missing + errors + batch_errors, status.HTTP_200_OK)
+
+    def delete(self, request, *args, **kwargs):
+        ids = [_bulk_id(item) for item in self.get_items()]
+        with transaction.atomic(), bulk_changes() as changes:
+            queryset = self.get_queryset().filter(id__in={pk for pk in ids if pk is not None})
+            found = set(queryset.values_list("id", flat=True))
+            queryset.delete()
+            self.mark_changed(changes, [])
+        errors = [
+            {"index": index, "errors": {"id": ["Ожидается целое число" if pk is None else "Объект не найден"]}}
+            for index, pk in enumerate(ids)
+            if pk not in found
+        ]
+        return self.bulk_response("deleted", sorted(found), errors, status.HTTP_200_OK)
+
+
+class AdvertisementBulkView(BulkMixin, generics.GenericAPIView):
     serializer_class = serializers.AdvertisementSerializer
+    bulk_serializer_class = serializers.AdvertisementSerializer
+    parent_field = "campaign"
+
+    def get_parent(self):
+        return get_object_or_404(ads_models.Campaign, id=self.kwargs["campaign_id"], user=self.request.user)
 
     def get_queryset(self):
-        return ads_models.Advertisement.objects.filter(
-            campaign__id=self.kwargs["campaign_id"], campaign__user=self.request.user
-        )
+        return ads_models.Advertisement.objects.filter(campaign=self.parent)
+
+    def mark_changed(self, changes, objects, created=False):
+        # bulk_create не отправляет post_save, поэтому пустые агрегаты создаются здесь
+        if created:
+            stats_models.AdvertisementStats.objects.bulk_create(
+                [stats_models.AdvertisementStats(advertisement=obj) for obj in objects], batch_size=self.batch_size
+            )
+        changes["campaigns"].add(self.parent.id)
 
+    def serialize(self, objects):
+        return super().serialize(ads_models.Advertisement.objects.attach_banner_stats(objects))
 
-class BannerListCreateView(generics.ListCreateAPIView):
+
+class BannerBulkView(BulkMixin, generics.GenericAPIView):
     serializer_class = serializers.BannerSerializer
+    bulk_serializer_class = serializers.BannerBulkSerializer
+    parent_field = "advertisement"
 
-    def get_advertisement(self):
+    def get_parent(self):
         return get_object_or_404(ads_models.Advertisement, id=self.kwargs["ad_id"], campaign__user=self.request.user)
 
     def get_queryset(self):
-        ad = self.get_advertisement()
-        return ads_models.Banner.objects.filter(advertisement=ad)
+        return ads_models.Banner.objects.filter(advertisement=self.parent)
 
-    def perform_create(self, serializer):
-        ad = self.get_advertisement()
-        serializer.save(advertisement=ad)
+    def serialize(self, objects):
+        context = self.get_serializer_context()
+        context["renditions"] = asset_models.BannerRendition.objects.for_sources(obj.file.name for obj in objects)
+        return self.get_serializer(objects, many=True, context=context).data
 
+    def check_batch(self, valid, instances=None):
+        instances = instances or {}
+        own_ids = {obj.pk for obj in instances.values()}
+        uids = [data["uid"] for _, data in valid if "uid" in data]
+        taken = set(ads_models.Banner.objects.filter(uid__in=uids).exclude(id__in=own_ids).values_list("uid", flat=True))
+        seen, checked, errors = set(), [], []
+        for index, data in valid:
+            uid = data.get("uid")
+            if uid is not None and (uid in taken or uid in seen):
+                errors.append({"index": index, "errors": {"uid": ["Баннер с таким uid уже существует."]}})
+                continue
+            seen.add(uid)
+            checked.append((index, data))
+        return checked, errors
 
-class BannerDetailView(generics.RetrieveUpdateDestroyAPIView):
-    serializer_class = serializers.BannerSerializer
+    def before_update(self, obj, data):
+        if "file" in data:
+            obj._previous_file = obj.file.name
+        if "is_active" in data:
+            obj._previous_active = obj.is_active
+
+    def mark_changed(self, changes, objects, created=False):
+        # bulk_create/bulk_update не отправляют сигналы, ссылки на файлы считаются здесь
+        if created:
+            asset_models.BannerBlob.objects.acquire(obj.file.name for obj in objects)
+            renditions.schedule(obj.file.name for obj in objects)
+        else:
+            moved = [obj for obj in objects if getattr(obj, "_previous_file", obj.file.name) != obj.file.name]
+            asset_models.BannerBlob.objects.acquire(obj.file.name for obj in moved)
+            asset_models.BannerBlob.objects.release(obj._previous_file for obj in moved)
+            renditions.schedule(obj.file.name for obj in moved)
+        changes["advertisements"].add(self.parent.id)
+
+
+class DecisionView(APIView):
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        query = serializers.DecisionQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        attributes = {key: value for key, value in request.query_params.items() if key not in query.fields}
+
+        banner = decision_index.decide(**query.validated_data, attributes=attributes)
+        if banner is None:
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        return Response({**banner, "event_token": events.issue_token(banner)})
+
+
+class DeliveryEventView(APIView):
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+    max_batch_size = 1000
+
+    def post(self, request):
+        many = isinstance(request.data, list)
+        if many and len(request.data) > self.max_batch_size:
+            return Response(
+                {"detail": f"Не больше {self.max_batch_size} событий за запрос"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        serializer = serializers.DeliveryEventSerializer(data=request.data, many=many)
+        serializer.is_valid(raise_exception=True)
+
+        records = serializer.validated_data if many else [serializer.validated_data]
+        events.EventSpool().append(records)
+        return Response({"accepted": len(records)}, status=status.HTTP_202_ACCEPTED)
+
+
+class BannerUploadMixin:
+    """Загрузка файла баннера по частям: создание, дозапись частей со смещением, завершение в Banner."""
+
+    serializer_class = serializers.BannerUploadSerializer
+    permission_classes = [permissions.IsAuthenticated, BannerUploadPermissions]
 
     def get_queryset(self):
-        return ads_models.Banner.objects.filter(
-            advertisement__id=self.kwargs["ad_id"], advertisement__campaign__user=self.request.user
+        return asset_models.BannerUpload.objects.filter(
+            user=self.request.user, advertisement_id=check_advertisement(self.request, self.kwargs["ad_id"])
         )
+
+    def upload_response(self, upload, response_status=status.HTTP_200_OK, **kwargs):
+        response = Response(self.get_serializer(upload).data, status=response_status, **kwargs)
+        response["Upload-Offset"] = upload.offset
+        return response
+
+
+class BannerUploadCreateView(BannerUploadMixin, generics.GenericAPIView):
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = serializer.save(user=request.user, advertisement_id=check_advertisement(request, self.kwargs["ad_id"]))
+        location = reverse("api:banner_upload", args=[upload.advertisement_id, upload.pk])
+        return self.upload_response(upload, status.HTTP_201_CREATED, headers={"Location": location})
+
+
+class BannerUploadView(BannerUploadMixin, generics.RetrieveDestroyAPIView):
+    def retrieve(self, request, *args, **kwargs):
+        return self.upload_response(self.get_object())
+
+    def patch(self, request, *args, **kwargs):
+        """Тело запроса — байты части как есть (application/offset+octet-stream), смещение в заголовке Upload-Offset."""
+        upload = self.get_object()
+        try:
+            offset = int(request.headers["Upload-Offset"])
+            length = int(request.headers["Content-Length"])
+        except (KeyError, ValueError):
+            raise ValidationError({"detail": "Нужны заголовки Upload-Offset и Content-Length"})
+        if length > settings.BANNER_UPLOAD_CHUNK_MAX_SIZE:
+            return Response(
+                {"detail": f"Часть больше {settings.BANNER_UPLOAD_CHUNK_MAX_SIZE} байт"},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+        try:
+            upload.offset = uploads.append_chunk(upload, offset, request.stream, length)
+        except uploads.OffsetMismatch as e:
+            upload.offset = e.offset
+            return self.upload_response(upload, status.HTTP_409_CONFLICT)
+        except uploads.UploadError as e:
+            raise ValidationError({"detail": str(e)})
+        return self.upload_response(upload)
+
+    def perform_destroy(self, instance):
+        uploads.discard(instance)
+        instance.delete()
+
+
+class BannerUploadCompleteView(BannerUploadMixin, generics.GenericAPIView):
+    def post(self, request, *args, **kwargs):
+        """Собирает принятый файл в Banner; поля баннера, кроме file, передаются в теле, как при обычном создании."""
+        context = self.get_serializer_context()
+        with transaction.atomic():
+            upload = get_object_or_404(self.get_queryset().select_for_update(), pk=self.kwargs["pk"])
+            if upload.banner_id is not None:
+                # Повтор завершения после оборванного ответа возвращает уже созданный баннер
+                return Response(serializers.BannerSerializer(upload.banner, context=context).data)
+            data = request.data.copy()
+            try:
+                with uploads.assembled_file(upload) as file:
+                    data["file"] = file
+                    serializer = serializers.BannerSerializer(data=data, context=context)
+                    serializer.is_valid(raise_exception=True)
+                    banner = serializer.save(advertisement_id=upload.advertisement_id)
+            except uploads.UploadError:
+                return self.upload_response(upload, status.HTTP_409_CONFLICT)
+            upload.banner = banner
+            upload.save(update_fields=["banner", "updated_at"])
+            transaction.on_commit(lambda: uploads.discard(upload))
+        return Response(serializers.BannerSerializer(banner, context=context).data, status=status.HTTP_201_CREATED)
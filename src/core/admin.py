@@ -1,7 +1,10 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.utils.html import format_html
 
+from core import renditions
 from core.models import ads as ad_models
+from core.models import tasks as task_models
 from core.models import User
 
 
@@ -38,8 +41,25 @@ class AdvertisementAdmin(admin.ModelAdmin):
 @admin.register(ad_models.Banner)
 class BannerAdmin(admin.ModelAdmin):
     list_display = (
+        "thumbnail",
         "advertisement__name",
         "uid",
         "is_active",
     )
     search_fields = ("uid",)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_renditions("thumbnail")
+
+    @admin.display(description="Превью")
+    def thumbnail(self, obj):
+        if not obj.thumbnail_rendition:
+            return "—"
+        return format_html('<img src="{}" alt="{}" loading="lazy">', renditions.url(obj.thumbnail_rendition), obj.uid)
+
+
+@admin.register(task_models.Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ("name", "key", "status", "attempts", "available_at", "updated_at")
+    list_filter = ("name", "status")
+    search_fields = ("key",)
@@ -0,0 +1,80 @@
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from core.models import ads as ad_models
+
+PERMISSIONS_VERSION_KEY = "authz:permissions-version"
+
+
+def _permissions_version():
+    # Версия создаётся заново после вытеснения, поэтому берётся время, а не 1: старые ключи не оживут
+    return cache.get_or_set(PERMISSIONS_VERSION_KEY, time.time_ns, None)
+
+
+def _ownership_key(user_id):
+    return f"authz:ownership:{user_id}"
+
+
+def user_permissions(user):
+    key = f"authz:permissions:{_permissions_version()}:{user.pk}"
+    perms = cache.get(key)
+    if perms is None:
+        perms = frozenset(user.get_all_permissions())
+        cache.set(key, perms, settings.AUTHZ_CACHE_TIMEOUT)
+    return perms
+
+
+def has_perms(user, perms):
+    if not user.is_active:
+        return False
+    if user.is_superuser:
+        return True
+    return set(perms) <= user_permissions(user)
+
+
+def invalidate_permissions():
+    """Права групп меняются у всех участников сразу, поэтому сбрасывается общая версия, а не ключи пользователей."""
+    cache.set(PERMISSIONS_VERSION_KEY, time.time_ns(), None)
+
+
+def ownership(user_id, refresh=False):
+    """Наборы id кампаний и объявлений пользователя: {"campaigns": frozenset, "advertisements": frozenset}."""
+    key = _ownership_key(user_id)
+    owned = None if refresh else cache.get(key)
+    if owned is None:
+        owned = {
+            "campaigns": frozenset(ad_models.Campaign.objects.filter(user_id=user_id).values_list("id", flat=True)),
+            "advertisements": frozenset(
+                ad_models.Advertisement.objects.filter(campaign__user_id=user_id).values_list("id", flat=True)
+            ),
+        }
+        cache.set(key, owned, settings.AUTHZ_CACHE_TIMEOUT)
+    return owned
+
+
+def invalidate_ownership(*user_ids):
+    cache.delete_many([_ownership_key(user_id) for user_id in user_ids if user_id is not None])
+
+
+def _owns(user, kind, pk):
+    if pk in ownership(user.pk)[kind]:
+        return True
+    # Новые объекты не сбрасывают кеш: промах перечитывает наборы один раз.
+    # Удалённые id могут остаться в наборе до пересчёта, но запрос по ним всё равно ничего не найдёт.
+    return pk in ownership(user.pk, refresh=True)[kind]
+
+
+def owns_campaign(user, campaign_id):
+    return _owns(user, "campaigns", campaign_id)
+
+
+def owns_advertisement(user, advertisement_id):
+    return _owns(user, "advertisements", advertisement_id)
+
+
+ahas_perms = sync_to_async(has_perms)
+aowns_campaign = sync_to_async(owns_campaign)
+aowns_advertisement = sync_to_async(owns_advertisement)
@@ -0,0 +1,142 @@
+import gzip
+import io
+import re
+import shutil
+import tempfile
+
+from django.core.files import File
+
+from core.storage import banner_storage
+
+try:
+    import brotli
+except ImportError:  # без brotli отдаются только gzip-варианты
+    brotli = None
+
+PRECOMPRESS_TASK = "banner_precompress"
+COMPRESSIBLE_EXTENSIONS = {"htm", "html"}
+# Кодировки в порядке предпочтения и суффиксы файлов с заранее сжатым содержимым
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+VARIANT_SUFFIXES = tuple(suffix for _, suffix in ENCODINGS)
+BLOCK_SIZE = 64 * 1024
+IMMUTABLE_NAME = re.compile(r"^banners/blobs/[0-9a-f]{2}/[0-9a-f]{2}/(?P<digest>[0-9a-f]{64})\.\w+$")
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def is_compressible(name):
+    return str(name).rsplit(".", 1)[-1].lower() in COMPRESSIBLE_EXTENSIONS
+
+
+def content_digest(name):
+    """sha256 содержимого, если имя выдано хранилищем по содержимому, иначе None: такой файл может измениться."""
+    match = IMMUTABLE_NAME.match(name)
+    return match and match["digest"]
+
+
+def variant_names(name):
+    return [name + suffix for suffix in VARIANT_SUFFIXES]
+
+
+def _compress_gzip(source, target):
+    # mtime=0: одинаковый креатив даёт одинаковый архив
+    with gzip.GzipFile(fileobj=target, mode="wb", compresslevel=9, mtime=0) as archive:
+        shutil.copyfileobj(source, archive, BLOCK_SIZE)
+
+
+def _compress_brotli(source, target):
+    compressor = brotli.Compressor(mode=brotli.MODE_TEXT, quality=11)
+    for block in iter(lambda: source.read(BLOCK_SIZE), b""):
+        target.write(compressor.process(block))
+    target.write(compressor.finish())
+
+
+def precompress(payload):
+    """Выполняется в процессе пула run_tasks: сохраняет name.br и name.gz рядом с оригиналом, если они меньше него."""
+    storage = banner_storage()
+    source = payload["source"]
+    compressors = {"gzip": _compress_gzip, "br": _compress_brotli if brotli is not None else None}
+    # Варианты лежат по имени оригинала с суффиксом, а не по хешу своего содержимого
+    save = getattr(storage, "save_derived", storage.save)
+    created = []
+    with storage.open(source) as original:
+        size = storage.size(source)
+        for encoding, suffix in ENCODINGS:
+            if compressors[encoding] is None:
+                continue
+            original.seek(0)
+            with tempfile.SpooledTemporaryFile(max_size=BLOCK_SIZE * 16) as compressed:
+                compressors[encoding](original, compressed)
+                if compressed.tell() >= size:
+                    continue
+                compressed.seek(0)
+                created.append(save(source + suffix, File(compressed, name=source + suffix)))
+    return created
+
+
+def parse_range(header, size):
+    """
+    (начало, конец включительно) для одного диапазона Range: bytes=...; None — отдать файл целиком.
+    Несколько диапазонов не поддерживаются и тоже отдаются целиком, это допускает RFC 9110.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start, _, end = header[len("bytes=") :].strip().partition("-")
+    try:
+        if not start:
+            length = int(end)
+            if length <= 0:
+                raise RangeNotSatisfiable
+            return max(size - length, 0), size - 1
+        start = int(start)
+        end = int(end) if end else size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable
+    if start > end:
+        return None
+    return start, min(end, size - 1)
+
+
+class RangeFile(io.RawIOBase):
+    """
+    Окно [start, end] файла для FileResponse. Позиции абсолютные, поэтому сервер с wsgi.file_wrapper
+    отправляет окно через sendfile по fileno и Content-Length, без чтения в процесс.
+    """
+
+    def __init__(self, file, start, end):
+        super().__init__()
+        self.file = file
+        self.start = start
+        self.end = end + 1
+        self.file.seek(start)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def tell(self):
+        return self.file.tell()
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_END:
+            return self.file.seek(self.end + offset)
+        return self.file.seek(offset, whence)
+
+    def read(self, size=-1):
+        remaining = self.end - self.file.tell()
+        if remaining <= 0:
+            return b""
+        return self.file.read(remaining if size is None or size < 0 else min(size, remaining))
+
+    def close(self):
+        self.file.close()
+        super().close()
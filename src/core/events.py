@@ -0,0 +1,134 @@
+import fcntl
+import json
+import os
+import time
+import uuid
+from decimal import Decimal
+from pathlib import Path
+
+from django.conf import settings
+from django.core import signing
+from django.utils.dateparse import parse_datetime
+
+from core.models import ads as ad_models
+from core.models import events as event_models
+
+
+class EventSpool:
+    """
+    Append-only файл с событиями в формате NDJSON. API дописывает события одним write,
+    воркер атомарно переименовывает файл и вычитывает его пачками.
+
+    Писатели держат разделяемый flock на время записи, воркер перед чтением переименованного файла
+    берёт исключительный: так он дожидается писателей, открывших файл до переименования.
+    """
+
+    drain_suffix = ".drain"
+
+    def __init__(self, path=None):
+        self.path = Path(path or settings.EVENTS_SPOOL_PATH)
+
+    def _open_current(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        while True:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            fcntl.flock(fd, fcntl.LOCK_SH)
+            # Файл могли переименовать между open и flock: тогда запись ушла бы в уже вычитанный файл
+            try:
+                if os.fstat(fd).st_ino == os.stat(self.path).st_ino:
+                    return fd
+            except FileNotFoundError:
+                pass
+            os.close(fd)
+
+    def append(self, events):
+        data = "".join(json.dumps(event, default=str) + "\n" for event in events).encode()
+        fd = self._open_current()
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view) :]
+        finally:
+            os.close(fd)
+
+    def rotate(self):
+        if self.path.exists() and self.path.stat().st_size:
+            self.path.rename(self.path.with_name(f"{self.path.name}.{time.time_ns()}{self.drain_suffix}"))
+        return sorted(self.path.parent.glob(f"{self.path.name}.*{self.drain_suffix}"))
+
+    def read(self, drain_path):
+        with open(drain_path, encoding="utf-8") as file:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+            for line in file:
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # Оборванная запись (например, диск заполнен) не должна останавливать разбор остального файла
+                    continue
+
+
+TOKEN_SALT = "core.events.delivery"
+
+
+def issue_token(banner):
+    """Подписанный токен решения /api/decide: события принимаются только по нему."""
+    return signing.dumps({"uid": banner["uid"], "decision": uuid.uuid4().hex}, salt=TOKEN_SALT)
+
+
+def open_token(token):
+    """Содержимое токена; BadSignature, если токен подделан или старше EVENT_TOKEN_MAX_AGE."""
+    return signing.loads(token, salt=TOKEN_SALT, max_age=settings.EVENT_TOKEN_MAX_AGE)
+
+
+def event_id(decision, kind):
+    # Один показ и один клик на решение: повтор события с тем же токеном отбрасывается по event_id
+    return uuid.uuid5(uuid.UUID(decision), kind)
+
+
+def flush_events(records):
+    """Пишет пачку событий одним bulk_create. Возвращает (записано, пропущено)."""
+    banners = {
+        uid: (banner_id, ad_id, campaign_id)
+        for uid, banner_id, ad_id, campaign_id in ad_models.Banner.objects.filter(
+            uid__in={record["uid"] for record in records}
+        ).values_list("uid", "id", "advertisement_id", "advertisement__campaign_id")
+    }
+    # Стоимость считает сервер: клиент может прислать только факт показа или клика
+    impression_cost = Decimal(settings.PACING_IMPRESSION_COST)
+    events = []
+    for record in records:
+        if record["uid"] not in banners:
+            continue
+        banner_id, ad_id, campaign_id = banners[record["uid"]]
+        events.append(
+            event_models.DeliveryEvent(
+                event_id=record["event_id"],
+                kind=record["kind"],
+                banner_id=banner_id,
+                advertisement_id=ad_id,
+                campaign_id=campaign_id,
+                cost=impression_cost if record["kind"] == event_models.DeliveryEvent.Kind.IMPRESSION else 0,
+                occurred_at=parse_datetime(record["occurred_at"]),
+            )
+        )
+    event_models.DeliveryEvent.objects.bulk_create(events, ignore_conflicts=True)
+    return len(events), len(records) - len(events)
+
+
+def drain_spool(spool, batch_size):
+    written = skipped = 0
+    for drain_path in spool.rotate():
+        batch = []
+        for record in spool.read(drain_path):
+            batch.append(record)
+            if len(batch) >= batch_size:
+                counts = flush_events(batch)
+                written, skipped, batch = written + counts[0], skipped + counts[1], []
+        if batch:
+            counts = flush_events(batch)
+            written, skipped = written + counts[0], skipped + counts[1]
+        # Повторная обработка файла после сбоя безопасна: event_id уникален
+        drain_path.unlink()
+    return written, skipped
@@ -0,0 +1,145 @@
+import csv
+import itertools
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+
+from core.models import ads as ad_models
+
+CHUNK_SIZE = 2000
+FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+CAMPAIGN_FIELDS = {
+    "campaign_id": "id",
+    "campaign_name": "name",
+    "start_date": "start_date",
+    "end_date": "end_date",
+    "budget": "budget",
+    "strategy": "strategy",
+    "max_impressions_per_day": "max_impressions_per_day",
+    "targeting": "targeting",
+}
+ADVERTISEMENT_FIELDS = {
+    "advertisement_id": "id",
+    "advertisement_name": "name",
+    "place": "place",
+    "url": "url",
+    "description": "description",
+}
+BANNER_FIELDS = {
+    "banner_id": "id",
+    "uid": "uid",
+    "width": "width",
+    "height": "height",
+    "file": "file",
+    "is_active": "is_active",
+}
+COLUMNS = [*CAMPAIGN_FIELDS, *ADVERTISEMENT_FIELDS, *BANNER_FIELDS]
+
+
+def _stream(queryset, fields, order, chunk_size):
+    columns = list(fields)
+    rows = queryset.order_by(*order).values_list(*fields.values()).iterator(chunk_size=chunk_size)
+    return (dict(zip(columns, row)) for row in rows)
+
+
+def _children(stream, pending, key, parent_key):
+    """
+    Забирает из упорядоченного потока строки родителя parent_key. Строки, чей родитель не попал
+    в обход (например, созданный между открытием курсоров), пропускаются.
+    """
+    row = pending.get(stream)
+    while row is not None and key(row) < parent_key:
+        row = next(stream, None)
+    while row is not None and key(row) == parent_key:
+        yield row
+        row = next(stream, None)
+    pending[stream] = row
+
+
+def _ad_key(row):
+    return (row["_campaign"],)
+
+
+def _banner_key(row):
+    return row["_campaign"], row["_advertisement"]
+
+
+def _strip(row):
+    return {column: value for column, value in row.items() if not column.startswith("_")}
+
+
+def export_rows(user, chunk_size=CHUNK_SIZE):
+    """
+    Обходит дерево кампания -> объявление -> баннер тремя упорядоченными серверными курсорами и
+    отдаёт плоские строки: по одной на баннер, объявления и кампании без детей дают строку с пустыми полями.
+    """
+    campaigns = _stream(ad_models.Campaign.objects.filter(user=user), CAMPAIGN_FIELDS, ["id"], chunk_size)
+    ads = _stream(
+        ad_models.Advertisement.objects.filter(campaign__user=user),
+        {**ADVERTISEMENT_FIELDS, "_campaign": "campaign_id"},
+        ["campaign_id", "id"],
+        chunk_size,
+    )
+    banners = _stream(
+        ad_models.Banner.objects.filter(advertisement__campaign__user=user),
+        {**BANNER_FIELDS, "_campaign": "advertisement__campaign_id", "_advertisement": "advertisement_id"},
+        ["advertisement__campaign_id", "advertisement_id", "id"],
+        chunk_size,
+    )
+    empty_ad = dict.fromkeys(ADVERTISEMENT_FIELDS)
+    empty_banner = dict.fromkeys(BANNER_FIELDS)
+    pending = {ads: next(ads, None), banners: next(banners, None)}
+    for campaign in campaigns:
+        has_ads = False
+        for ad in _children(ads, pending, _ad_key, (campaign["campaign_id"],)):
+            has_ads = True
+            has_banners = False
+            for banner in _children(banners, pending, _banner_key, (campaign["campaign_id"], ad["advertisement_id"])):
+                has_banners = True
+                yield {**campaign, **_strip(ad), **_strip(banner)}
+            if not has_banners:
+                yield {**campaign, **_strip(ad), **empty_banner}
+        if not has_ads:
+            yield {**campaign, **empty_ad, **empty_banner}
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def _csv_value(value):
+    return json.dumps(value, ensure_ascii=False) if isinstance(value, (dict, list)) else value
+
+
+def csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(COLUMNS)
+    for row in rows:
+        yield writer.writerow([_csv_value(row[column]) for column in COLUMNS])
+
+
+def ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + "\n"
+
+
+def export_lines(user, output_format, chunk_size=CHUNK_SIZE):
+    rows = export_rows(user, chunk_size)
+    return csv_lines(rows) if output_format == "csv" else ndjson_lines(rows)
+
+
+async def aexport_lines(user, output_format, chunk_size=CHUNK_SIZE):
+    """
+    export_lines для ASGI. Синхронный генератор Django под ASGI собирает в список целиком, поэтому строки
+    забираются пачками по chunk_size в потоке запроса (thread_sensitive), где живут курсоры.
+    """
+    lines = export_lines(user, output_format, chunk_size)
+    take = sync_to_async(lambda: "".join(itertools.islice(lines, chunk_size)))
+    try:
+        while chunk := await take():
+            yield chunk
+    finally:
+        await sync_to_async(lines.close)()
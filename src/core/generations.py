@@ -0,0 +1,46 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from core.models import ads as ad_models
+
+
+def _key(user_id):
+    return f"generation:{user_id}"
+
+
+def current(user_id):
+    """Поколение дерева кампаний пользователя. Любая запись в дереве его сдвигает."""
+    return cache.get_or_set(_key(user_id), time.time_ns, None)
+
+
+async def acurrent(user_id):
+    return await cache.aget_or_set(_key(user_id), time.time_ns, None)
+
+
+def _bump(user_ids):
+    for user_id in user_ids:
+        try:
+            cache.incr(_key(user_id))
+        except ValueError:
+            # После вытеснения поколение начинается со времени, а не с 1, чтобы не совпасть со старым
+            cache.set(_key(user_id), time.time_ns(), None)
+
+
+def bump(*user_ids):
+    """
+    Сдвигает поколение сразу и ещё раз после коммита: ответ, прочитанный до коммита и сохранённый
+    под уже сдвинутым поколением, не переживёт второго сдвига.
+    """
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if not user_ids:
+        return
+    _bump(user_ids)
+    transaction.on_commit(lambda: _bump(user_ids))
+
+
+def bump_campaigns(campaign_ids):
+    if not campaign_ids:
+        return
+    bump(*ad_models.Campaign.objects.filter(id__in=campaign_ids).values_list("user_id", flat=True).distinct())
@@ -0,0 +1,87 @@
+import io
+import struct
+
+from django.core.exceptions import ValidationError
+
+IMAGE_EXTENSIONS = {"gif", "png", "jpg", "jpeg"}
+# JPEG-сегменты перепрыгиваются seek'ом, поэтому предел ограничивает смещение SOF, а не прочитанные байты
+JPEG_SCAN_LIMIT = 1024 * 1024
+# Маркеры SOF с размерами кадра; C4, C8 и CC — таблицы и расширения, не кадры
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def _jpeg_size(file, start):
+    file.seek(start + 2)
+    while file.tell() - start < JPEG_SCAN_LIMIT:
+        byte = file.read(1)
+        if byte != b"\xff":
+            return None
+        marker = file.read(1)
+        while marker == b"\xff":
+            marker = file.read(1)
+        if not marker:
+            return None
+        marker = marker[0]
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            continue
+        if marker == 0xD9:
+            return None
+        segment = file.read(2)
+        if len(segment) < 2:
+            return None
+        (length,) = struct.unpack(">H", segment)
+        if marker in JPEG_SOF_MARKERS:
+            frame = file.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack(">HH", frame[1:5])
+            return width, height
+        file.seek(length - 2, io.SEEK_CUR)
+    return None
+
+
+def image_size(file):
+    """
+    Размеры GIF, PNG или JPEG по заголовку без декодирования: (ширина, высота) или None.
+    GIF и PNG — первые 24 байта, у JPEG читаются только заголовки сегментов до кадра.
+    Позиция файла восстанавливается.
+    """
+    start = file.tell()
+    try:
+        head = file.read(24)
+        if head[:6] in (b"GIF87a", b"GIF89a") and len(head) >= 10:
+            return struct.unpack("<HH", head[6:10])
+        if head[:8] == b"\x89PNG\r\n\x1a\n" and head[12:16] == b"IHDR" and len(head) >= 24:
+            return struct.unpack(">II", head[16:24])
+        if head[:2] == b"\xff\xd8":
+            return _jpeg_size(file, start)
+        return None
+    finally:
+        file.seek(start)
+
+
+def is_image(name):
+    return str(name).rsplit(".", 1)[-1].lower() in IMAGE_EXTENSIONS
+
+
+def resolve_dimensions(file, width=None, height=None):
+    """
+    Сверяет введённые размеры баннера с файлом. Незаполненные берутся из файла, расхождение — ошибка.
+    Для HTML и нераспознанных файлов размеры обязательны.
+    """
+    size = image_size(file) if file is not None and is_image(file.name) else None
+    errors = {}
+    if size is None:
+        for field, value in (("width", width), ("height", height)):
+            if value is None:
+                errors[field] = "Размер не удалось определить по файлу, укажите его."
+        if errors:
+            raise ValidationError(errors)
+        return width, height
+
+    for field, value, actual in (("width", width, size[0]), ("height", height, size[1])):
+        if value is not None and value != actual:
+            errors[field] = f"Не совпадает с размером изображения: {actual}."
+    if errors:
+        raise ValidationError(errors)
+    return size
@@ -0,0 +1,91 @@
+import os
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from core import outbox
+from core.imagesize import IMAGE_EXTENSIONS, image_size
+from core.models import ads as ad_models
+from core.signals import bulk_changes
+from core.storage import banner_storage
+from core.tasks import process_pool
+
+BATCH_SIZE = 500
+
+
+def _sniff(item):
+    """Выполняется в дочернем процессе: только хранилище, без обращений к базе."""
+    pk, name = item
+    try:
+        with banner_storage().open(name) as file:
+            return pk, image_size(file)
+    except OSError:
+        return pk, None
+
+
+class Command(BaseCommand):
+    help = "Заполняет ширину и высоту баннеров-изображений по заголовкам файлов"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Число процессов для чтения файлов")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+        parser.add_argument("--dry-run", action="store_true", help="Только показать расхождения")
+
+    def handle(self, *args, **options):
+        images = reduce(or_, (Q(file__iendswith=f".{extension}") for extension in IMAGE_EXTENSIONS))
+        banners = ad_models.Banner.objects.filter(images).order_by("id")
+        self.dry_run = options["dry_run"]
+        fixed = unreadable = invalid = last_id = 0
+
+        with process_pool(options["workers"]) as executor:
+            while True:
+                rows = list(
+                    banners.filter(id__gt=last_id).values_list("id", "file", "width", "height", "advertisement_id")[
+                        : options["batch_size"]
+                    ]
+                )
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+                sizes = dict(executor.map(_sniff, [(pk, name) for pk, name, *_ in rows], chunksize=64))
+                changed, failed, out_of_range = self.compare(rows, sizes)
+                fixed += changed
+                unreadable += failed
+                invalid += out_of_range
+
+        self.stdout.write(f"Исправлено баннеров: {fixed}, не прочитано файлов: {unreadable}, недопустимые размеры: {invalid}")
+
+    @staticmethod
+    def in_range(size):
+        fields = (ad_models.Banner._meta.get_field("width"), ad_models.Banner._meta.get_field("height"))
+        try:
+            for field, value in zip(fields, size):
+                field.run_validators(value)
+        except ValidationError:
+            return False
+        return True
+
+    def compare(self, rows, sizes):
+        changed, unreadable, invalid = [], 0, 0
+        for pk, name, width, height, advertisement_id in rows:
+            size = sizes[pk]
+            if size is None:
+                unreadable += 1
+                self.stdout.write(f"Не удалось прочитать размеры: {name}", self.style.WARNING)
+            elif not self.in_range(size):
+                invalid += 1
+                self.stdout.write(f"Баннер {pk}: размеры из файла вне допустимых {size[0]}x{size[1]}", self.style.WARNING)
+            elif size != (width, height):
+                self.stdout.write(f"Баннер {pk}: {width}x{height} -> {size[0]}x{size[1]}")
+                changed.append(ad_models.Banner(pk=pk, width=size[0], height=size[1], advertisement_id=advertisement_id))
+        if changed and not self.dry_run:
+            # Размеры участвуют в подборе баннеров, поэтому индекс затронутых кампаний сбрасывается
+            with transaction.atomic(), bulk_changes() as changes:
+                ad_models.Banner.objects.bulk_update(changed, ["width", "height"])
+                changes["advertisements"].update(banner.advertisement_id for banner in changed)
+                changes["outbox"].extend(outbox.entry(banner, outbox.Action.UPDATED) for banner in changed)
+        return len(changed), unreadable, invalid
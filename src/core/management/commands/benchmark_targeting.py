@@ -0,0 +1,85 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.serving.inverted_index import TargetingIndex
+from core.targeting import compile_targeting, naive_match, PLACEMENT_BITS
+
+GEO = [f"region-{i}" for i in range(80)]
+DEVICES = ["ios", "android", "web", "screen"]
+STORES = [f"store-{i}" for i in range(500)]
+
+
+def random_values(rng, pool, count):
+    return rng.sample(pool, rng.randint(1, count))
+
+
+def random_targeting(rng):
+    targeting = {}
+    if rng.random() < 0.7:
+        targeting["geo"] = {"include": random_values(rng, GEO, 10)}
+    if rng.random() < 0.4:
+        targeting["device"] = {"exclude": random_values(rng, DEVICES, 2)}
+    if rng.random() < 0.3:
+        targeting["store"] = {"include": random_values(rng, STORES, 50)}
+    if rng.random() < 0.3:
+        start = rng.randrange(24)
+        targeting["hour"] = {"include": [(start + i) % 24 for i in range(rng.randint(4, 16))]}
+    if rng.random() < 0.2:
+        targeting["placement"] = {"exclude": random_values(rng, list(PLACEMENT_BITS), 1)}
+    return targeting
+
+
+def random_request(rng):
+    attributes = {"geo": rng.choice(GEO), "device": rng.choice(DEVICES), "store": rng.choice(STORES)}
+    return attributes, rng.randrange(24), rng.choice(list(PLACEMENT_BITS))
+
+
+class Command(BaseCommand):
+    help = "Сравнивает скомпилированный таргетинг с прямым обходом JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--campaigns", type=int, default=5000)
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        targetings = [random_targeting(rng) for _ in range(options["campaigns"])]
+        requests = [random_request(rng) for _ in range(options["requests"])]
+
+        started = time.perf_counter()
+        matchers = [compile_targeting(targeting) for targeting in targetings]
+        compile_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        naive = [
+            sum(naive_match(targeting, attributes, hour, place) for targeting in targetings)
+            for attributes, hour, place in requests
+        ]
+        naive_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        compiled = [
+            sum(matcher.matches(attributes, hour, place) for matcher in matchers) for attributes, hour, place in requests
+        ]
+        compiled_time = time.perf_counter() - started
+
+        index = TargetingIndex()
+        for campaign_id, matcher in enumerate(matchers):
+            index.add(campaign_id, matcher)
+        started = time.perf_counter()
+        indexed = [len(index.candidates(attributes, hour, place)) for attributes, hour, place in requests]
+        indexed_time = time.perf_counter() - started
+
+        checks = len(targetings) * len(requests)
+        self.stdout.write(f"Кампаний: {len(targetings)}, запросов: {len(requests)}")
+        self.stdout.write(f"Компиляция: {compile_time / len(targetings) * 1e6:.2f} мкс на кампанию")
+        self.stdout.write(f"JSON: {naive_time / checks * 1e6:.3f} мкс на проверку")
+        self.stdout.write(f"Matcher: {compiled_time / checks * 1e6:.3f} мкс на проверку")
+        self.stdout.write(f"Ускорение: {naive_time / compiled_time:.1f}x, результаты совпадают: {naive == compiled}")
+        self.stdout.write(
+            f"Инвертированный индекс: {indexed_time / len(requests) * 1e6:.1f} мкс на запрос "
+            f"против {compiled_time / len(requests) * 1e6:.1f} мкс перебором, результаты совпадают: {indexed == compiled}"
+        )
@@ -0,0 +1,28 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.serving.snapshot import live_campaigns, publish
+
+
+class Command(BaseCommand):
+    help = "Собирает снимок живых кампаний и публикует его для обслуживающих процессов"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", default=settings.SERVING_SNAPSHOT_PATH, help="Файл снимка")
+        parser.add_argument("--interval", type=float, default=5.0, help="Пауза между сборками, секунды")
+        parser.add_argument("--once", action="store_true", help="Одна сборка и выход")
+
+    def handle(self, *args, **options):
+        if not options["path"]:
+            raise CommandError("Не задан путь: --path или SERVING_SNAPSHOT_PATH")
+        while True:
+            campaigns = live_campaigns()
+            version = publish(options["path"], campaigns)
+            if version is not None:
+                banners = sum(len(campaign["banners"]) for campaign in campaigns)
+                self.stdout.write(f"Опубликован снимок {version}: кампаний {len(campaigns)}, баннеров {banners}")
+            if options["once"]:
+                return
+            time.sleep(options["interval"])
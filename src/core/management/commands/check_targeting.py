@@ -0,0 +1,67 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from core import outbox
+from core.models import ads as ad_models
+from core.signals import bulk_changes
+from core.targeting import validate_targeting
+
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = (
+        "Проверяет таргетинг кампаний, записанный до проверки в API. Некорректный таргетинг кампания "
+        "не показывается; --fix приводит корректный к каноническому виду, а --clear-invalid очищает некорректный"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fix", action="store_true", help="Сохранить таргетинг в каноническом виде")
+        parser.add_argument(
+            "--clear-invalid",
+            action="store_true",
+            help="Очистить некорректный таргетинг: кампания начнёт показываться без ограничений",
+        )
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        campaigns = ad_models.Campaign.objects.order_by("id").only("id", "targeting")
+        invalid = normalized = last_id = 0
+        while True:
+            batch = list(campaigns.filter(id__gt=last_id)[: options["batch_size"]])
+            if not batch:
+                break
+            last_id = batch[-1].id
+            changed = []
+            for campaign in batch:
+                try:
+                    targeting = validate_targeting(campaign.targeting)
+                except ValidationError as error:
+                    invalid += 1
+                    self.stdout.write(f"Кампания {campaign.id}: {'; '.join(error.messages)}", self.style.WARNING)
+                    if options["clear_invalid"]:
+                        campaign.targeting = {}
+                        changed.append(campaign)
+                    continue
+                if targeting != campaign.targeting:
+                    normalized += 1
+                    if options["fix"]:
+                        campaign.targeting = targeting
+                        changed.append(campaign)
+            self.save(changed)
+
+        self.stdout.write(f"Некорректный таргетинг: {invalid}, не в каноническом виде: {normalized}")
+
+    def save(self, campaigns):
+        if not campaigns:
+            return
+        now = timezone.now()
+        for campaign in campaigns:
+            campaign.updated_at = now
+        # Таргетинг участвует в подборе баннеров, поэтому изменения идут через журнал и индекс
+        with transaction.atomic(), bulk_changes() as changes:
+            ad_models.Campaign.objects.bulk_update(campaigns, ["targeting", "updated_at"])
+            changes["campaigns"].update(campaign.id for campaign in campaigns)
+            changes["outbox"].extend(outbox.entry(campaign, outbox.Action.UPDATED) for campaign in campaigns)
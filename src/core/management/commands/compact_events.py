@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.rollups import compact_events
+
+
+class Command(BaseCommand):
+    help = "Агрегирует новые события в почасовую и дневную статистику"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100_000, help="Сколько событий обрабатывать за проход")
+        parser.add_argument("--interval", type=float, default=60.0, help="Пауза между проходами, секунды")
+        parser.add_argument("--once", action="store_true", help="Обработать всё накопленное и выйти")
+
+    def handle(self, *args, **options):
+        while True:
+            hours = compact_events(options["batch_size"])
+            if hours:
+                self.stdout.write(f"Пересчитано часов: {hours}")
+                continue
+            if options["once"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.events import drain_spool, EventSpool
+
+
+class Command(BaseCommand):
+    help = "Переносит события показов и кликов из spool-файла в базу пачками"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000, help="Максимальный размер пачки bulk_create")
+        parser.add_argument("--interval", type=float, default=1.0, help="Пауза между сбросами, секунды")
+        parser.add_argument("--once", action="store_true", help="Один проход и выход")
+
+    def handle(self, *args, **options):
+        spool = EventSpool()
+        while True:
+            written, skipped = drain_spool(spool, options["batch_size"])
+            if written or skipped:
+                self.stdout.write(f"Записано событий: {written}, пропущено: {skipped}")
+            if options["once"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,28 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core import export
+
+
+class Command(BaseCommand):
+    help = "Выгружает кампании, объявления и баннеры пользователя в CSV или NDJSON потоково"
+
+    def add_arguments(self, parser):
+        parser.add_argument("username", help="Пользователь, чьи кампании выгружаются")
+        parser.add_argument("--format", choices=list(export.FORMATS), default="csv", dest="output_format")
+        parser.add_argument("--output", help="Файл для выгрузки, по умолчанию stdout")
+        parser.add_argument("--chunk-size", type=int, default=export.CHUNK_SIZE, help="Размер пачки серверного курсора")
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(username=options["username"])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"Пользователь {options['username']} не найден")
+
+        lines = export.export_lines(user, options["output_format"], options["chunk_size"])
+        if not options["output"]:
+            for line in lines:
+                self.stdout.write(line, ending="")
+            return
+        with open(options["output"], "w", encoding="utf-8", newline="") as file:
+            file.writelines(lines)
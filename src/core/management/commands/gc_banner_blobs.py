@@ -0,0 +1,142 @@
+import datetime
+import posixpath
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.utils import timezone
+
+from core import delivery
+from core.models import ads as ad_models
+from core.models import assets as asset_models
+from core.storage import banner_storage
+
+BATCH_SIZE = 500
+
+
+def _batches(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _walk(storage, path):
+    directories, files = storage.listdir(path)
+    for file in files:
+        yield posixpath.join(path, file)
+    for directory in directories:
+        yield from _walk(storage, posixpath.join(path, directory))
+
+
+class Command(BaseCommand):
+    help = "Удаляет файлы баннеров, на которые не ссылается ни один баннер, вместе с их уменьшенными копиями"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace-hours", type=float, default=24, help="Не трогать файлы, отпущенные или загруженные позже этого срока"
+        )
+        parser.add_argument("--recount", action="store_true", help="Пересчитать счётчики ссылок по таблице баннеров")
+        parser.add_argument("--scan-storage", action="store_true", help="Искать в хранилище файлы без записи о ссылках")
+        parser.add_argument("--dry-run", action="store_true", help="Только показать, что будет удалено")
+
+    def handle(self, *args, **options):
+        self.storage = banner_storage()
+        self.dry_run = options["dry_run"]
+        cutoff = timezone.now() - datetime.timedelta(hours=options["grace_hours"])
+
+        if options["recount"]:
+            self.stdout.write(f"Исправлено счётчиков: {self.recount()}")
+        self.stdout.write(f"Удалено файлов без ссылок: {self.collect(cutoff)}")
+        if options["scan_storage"]:
+            self.stdout.write(f"Удалено файлов без записи: {self.scan(cutoff)}")
+
+    def references(self, names):
+        return dict(
+            ad_models.Banner.objects.filter(file__in=names)
+            .values("file")
+            .annotate(count=Count("id"))
+            .values_list("file", "count")
+        )
+
+    def rendition_names(self, names):
+        return set(asset_models.BannerRendition.objects.filter(name__in=names).values_list("name", flat=True))
+
+    def recount(self):
+        fixed = 0
+        blobs = asset_models.BannerBlob.objects.order_by("id").iterator(chunk_size=BATCH_SIZE)
+        for batch in _batches(blobs, BATCH_SIZE):
+            counts = self.references([blob.name for blob in batch])
+            changed = [blob for blob in batch if blob.ref_count != counts.get(blob.name, 0)]
+            for blob in changed:
+                blob.ref_count = counts.get(blob.name, 0)
+            if changed and not self.dry_run:
+                asset_models.BannerBlob.objects.bulk_update(changed, ["ref_count"])
+            fixed += len(changed)
+        return fixed
+
+    def collect(self, cutoff):
+        # Счётчик лишь подсказка: bulk-операции мимо сигналов могли его сбить, поэтому ссылки проверяются по баннерам
+        deleted = 0
+        candidates = asset_models.BannerBlob.objects.filter(ref_count=0, updated_at__lt=cutoff).order_by("id")
+        for batch in _batches(candidates.iterator(chunk_size=BATCH_SIZE), BATCH_SIZE):
+            counts = self.references([blob.name for blob in batch])
+            # Уменьшенная копия может совпасть по содержимому с загруженным файлом
+            used_as_rendition = self.rendition_names([blob.name for blob in batch])
+            removed = []
+            for blob in batch:
+                if blob.name in counts:
+                    if not self.dry_run:
+                        asset_models.BannerBlob.objects.filter(pk=blob.pk).update(ref_count=counts[blob.name])
+                    continue
+                if blob.name in used_as_rendition:
+                    continue
+                # Запись удаляется раньше файла и только если за это время на неё никто не сослался
+                if self.dry_run or asset_models.BannerBlob.objects.filter(pk=blob.pk, ref_count=0).delete()[0]:
+                    self.delete(blob.name)
+                    removed.append(blob.name)
+            deleted += len(removed) + self.drop_renditions(removed)
+        return deleted
+
+    def drop_renditions(self, sources):
+        """Удаляет копии удалённых оригиналов; файл копии остаётся, если он сам оригинал или копия другого файла."""
+        renditions = asset_models.BannerRendition.objects.filter(source__in=sources)
+        names = set(renditions.exclude(name__in=sources).values_list("name", flat=True))
+        if not self.dry_run:
+            renditions.delete()
+        names -= set(self.references(names))
+        names -= set(asset_models.BannerBlob.objects.filter(name__in=names).values_list("name", flat=True))
+        names -= self.rendition_names(names) if not self.dry_run else set()
+        for name in names:
+            self.delete(name)
+        return len(names)
+
+    def scan(self, cutoff):
+        deleted = 0
+        prefix = getattr(self.storage, "blob_prefix", "banners/blobs")
+        if not self.storage.exists(prefix):
+            return deleted
+        for batch in _batches(_walk(self.storage, prefix), BATCH_SIZE):
+            # Сжатый вариант живёт, пока жив оригинал
+            originals = {name: name[:-3] for name in batch if name.endswith(delivery.VARIANT_SUFFIXES)}
+            names = {*batch, *originals.values()}
+            known = set(asset_models.BannerBlob.objects.filter(name__in=names).values_list("name", flat=True))
+            known.update(self.references(names))
+            known.update(self.rendition_names(names))
+            for name in batch:
+                if name in known or originals.get(name) in known:
+                    continue
+                if self.storage.get_modified_time(name) < cutoff:
+                    self.delete(name)
+                    deleted += 1
+        return deleted
+
+    def delete(self, name):
+        self.stdout.write(f"Удаление {name}", self.style.WARNING)
+        if not self.dry_run:
+            self.storage.delete(name)
+            for variant in delivery.variant_names(name):
+                self.storage.delete(variant)
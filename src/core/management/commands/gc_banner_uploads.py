@@ -0,0 +1,41 @@
+import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core import uploads
+from core.models import assets as asset_models
+
+
+class Command(BaseCommand):
+    help = "Удаляет брошенные загрузки баннеров по частям и их файлы"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hours", type=float, default=24, help="Сколько часов ждать продолжения загрузки")
+        parser.add_argument("--dry-run", action="store_true", help="Только показать, что будет удалено")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - datetime.timedelta(hours=options["hours"])
+        expired = asset_models.BannerUpload.objects.filter(updated_at__lt=cutoff)
+        count = 0
+        for upload in expired.filter(banner__isnull=True).iterator():
+            self.stdout.write(f"Удаление {upload}", self.style.WARNING)
+            if not options["dry_run"]:
+                uploads.discard(upload)
+            count += 1
+        if not options["dry_run"]:
+            expired.delete()
+
+        # Части, оставшиеся от упавших процессов, и файлы загрузок без записи в базе
+        known = {f"{pk}.part" for pk in asset_models.BannerUpload.objects.values_list("pk", flat=True)}
+        directory = Path(settings.BANNER_UPLOAD_DIR)
+        stray = 0
+        for path in directory.iterdir() if directory.exists() else []:
+            modified = datetime.datetime.fromtimestamp(path.stat().st_mtime, tz=datetime.timezone.utc)
+            if path.is_file() and path.name not in known and modified < cutoff:
+                if not options["dry_run"]:
+                    path.unlink(missing_ok=True)
+                stray += 1
+        self.stdout.write(f"Удалено загрузок: {count}, лишних файлов: {stray}")
@@ -0,0 +1,25 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.db.models import Min
+from django.utils import timezone
+
+from core.models import changes as change_models
+
+
+class Command(BaseCommand):
+    help = "Удаляет из журнала изменений старые записи, уже прочитанные всеми потребителями"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=float, default=7, help="Сколько дней хранить изменения")
+        parser.add_argument("--dry-run", action="store_true", help="Только посчитать записи")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - datetime.timedelta(days=options["days"])
+        expired = change_models.ChangeEvent.objects.filter(created_at__lt=cutoff)
+        # Отставший потребитель держит журнал: иначе он пропустит изменения молча
+        position = change_models.ChangeConsumer.objects.aggregate(position=Min("position"))["position"]
+        if position is not None:
+            expired = expired.filter(id__lte=position)
+        count = expired.count() if options["dry_run"] else expired.delete()[0]
+        self.stdout.write(f"Удалено изменений: {count}")
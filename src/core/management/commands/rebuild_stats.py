@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.models import stats as stats_models
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает агрегаты кампаний и объявлений с нуля и проверяет расхождения"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--check", action="store_true", help="Только проверить расхождения, ничего не менять")
+
+    def handle(self, *args, **options):
+        campaign_rollups, ad_rollups = stats_models.compute_rollups()
+        drift = self.find_drift(stats_models.CampaignStats, campaign_rollups) + self.find_drift(
+            stats_models.AdvertisementStats, ad_rollups
+        )
+        for line in drift:
+            self.stdout.write(line)
+
+        if options["check"]:
+            if drift:
+                raise CommandError(f"Найдено расхождений: {len(drift)}")
+            self.stdout.write(self.style.SUCCESS("Расхождений нет"))
+            return
+
+        with transaction.atomic():
+            self.rebuild(stats_models.CampaignStats, campaign_rollups)
+            self.rebuild(stats_models.AdvertisementStats, ad_rollups)
+        self.stdout.write(self.style.SUCCESS(f"Пересчитано кампаний: {len(campaign_rollups)}, объявлений: {len(ad_rollups)}"))
+
+    def find_drift(self, model, rollups):
+        fields = list(next(iter(rollups.values()), {}))
+        stored = {row.pop("pk"): row for row in model.objects.values("pk", *fields).iterator()}
+        drift = [f"{model.__name__} {pk}: нет записи" for pk in rollups.keys() - stored.keys()]
+        drift += [f"{model.__name__} {pk}: лишняя запись" for pk in stored.keys() - rollups.keys()]
+        for pk in rollups.keys() & stored.keys():
+            if stored[pk] != rollups[pk]:
+                drift.append(f"{model.__name__} {pk}: {stored[pk]} != {rollups[pk]}")
+        return drift
+
+    def rebuild(self, model, rollups):
+        model.objects.all().delete()
+        model.objects.bulk_create((model(pk=pk, **rollup) for pk, rollup in rollups.items()), batch_size=BATCH_SIZE)
@@ -0,0 +1,89 @@
+import os
+import time
+import traceback
+from concurrent.futures import as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core import tasks
+from core.models import tasks as task_models
+
+
+class Command(BaseCommand):
+    help = "Выполняет фоновые задачи из таблицы Task в пуле процессов"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Число процессов пула")
+        parser.add_argument("--batch-size", type=int, default=20, help="Сколько задач забирать за раз")
+        parser.add_argument("--lease", type=int, default=300, help="Через сколько секунд зависшая задача вернётся в очередь")
+        parser.add_argument("--max-attempts", type=int, default=5)
+        parser.add_argument("--retry-delay", type=float, default=30, help="Пауза перед первым повтором, секунды")
+        parser.add_argument("--interval", type=float, default=1.0, help="Пауза при пустой очереди, секунды")
+        parser.add_argument("--once", action="store_true", help="Выполнить то, что уже в очереди, и выйти")
+        parser.add_argument("--retry-failed", action="store_true", help="Вернуть в очередь задачи с ошибкой")
+
+    def handle(self, *args, **options):
+        if options["retry_failed"]:
+            self.stdout.write(f"Возвращено в очередь: {task_models.Task.objects.retry_failed()}")
+
+        suspects = []
+        while True:
+            with tasks.process_pool(options["workers"]) as executor:
+                try:
+                    self.serve(executor, suspects, options)
+                    return
+                except BrokenProcessPool:
+                    self.stdout.write("Процесс пула аварийно завершился, пул пересоздаётся", self.style.WARNING)
+
+    def serve(self, executor, suspects, options):
+        """
+        Выполняет задачи, пока пул цел. Когда процесс пула умирает, падают все незавершённые задачи пачки,
+        а виновника не определить: они возвращаются в suspects и в новом пуле выполняются по одной,
+        в той же аренде и без новой попытки. Попытка засчитывается только задаче, уронившей пул в одиночку.
+        """
+        while suspects:
+            task = suspects.pop(0)
+            future = executor.submit(tasks.execute, task.name, task.payload)
+            if isinstance(future.exception(), BrokenProcessPool):
+                error = "Процесс пула аварийно завершился"
+                task_models.Task.objects.fail(task, error, options["max_attempts"], options["retry_delay"])
+                self.stdout.write(f"{task}: {error}", self.style.ERROR)
+                raise BrokenProcessPool(error)
+            self.finish(task, future, options)
+
+        while True:
+            claimed = task_models.Task.objects.claim(options["batch_size"], options["lease"])
+            if not claimed:
+                if options["once"]:
+                    return
+                time.sleep(options["interval"])
+                continue
+            futures = {}
+            try:
+                for task in claimed:
+                    futures[executor.submit(tasks.execute, task.name, task.payload)] = task
+            except BrokenProcessPool:
+                # Пул сломался ещё до отправки всей пачки: оставшиеся задачи тоже выполняются в новом пуле
+                suspects.extend(claimed[len(futures) :])
+            for future in as_completed(futures):
+                if isinstance(future.exception(), BrokenProcessPool):
+                    suspects.append(futures[future])
+                else:
+                    self.finish(futures[future], future, options)
+            if suspects:
+                suspects.sort(key=lambda task: task.id)
+                raise BrokenProcessPool
+
+    def finish(self, task, future, options):
+        try:
+            with transaction.atomic():
+                tasks.save(task.name, task.payload, future.result())
+                if not task_models.Task.objects.complete(task):
+                    # Аренда истекла и задачу забрал другой воркер: результат остаётся за ним
+                    transaction.set_rollback(True)
+        except Exception as e:
+            error = "".join(traceback.format_exception_only(e)).strip()
+            task_models.Task.objects.fail(task, error, options["max_attempts"], options["retry_delay"])
+            self.stdout.write(f"{task}: {error}", self.style.ERROR)
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from core.serving.pacing import simulate_day
+
+
+class Command(BaseCommand):
+    help = "Симулирует сутки трафика и показывает равномерность расхода бюджета и стоимость решения"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--campaigns", type=int, default=20)
+        parser.add_argument("--requests", type=int, default=200_000)
+        parser.add_argument("--oversupply", type=float, default=3.0, help="Во сколько раз трафика больше бюджета")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        report = simulate_day(
+            campaigns=options["campaigns"],
+            requests=options["requests"],
+            oversupply=options["oversupply"],
+            seed=options["seed"],
+        )
+        self.stdout.write(f"Кампаний: {report['campaigns']}, запросов: {report['requests']}")
+        self.stdout.write(f"Израсходовано бюджета: {report['delivered_share']:.1%}")
+        self.stdout.write(
+            f"Отклонение от почасового плана: среднее {report['hourly_deviation_mean']:.1%}, "
+            f"максимальное {report['hourly_deviation_max']:.1%}"
+        )
+        self.stdout.write(f"Время решения: {report['decision_us']:.2f} мкс")
@@ -0,0 +1,74 @@
+# Generated by Django 5.2.11 on 2026-10-18 14:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+ALLOWED_EXTENSIONS = ["gif", "png", "jpg", "jpeg", "htm", "html"]
+
+
+def populate_stats(apps, schema_editor):
+    Campaign = apps.get_model("core", "Campaign")
+    Advertisement = apps.get_model("core", "Advertisement")
+    Banner = apps.get_model("core", "Banner")
+    CampaignStats = apps.get_model("core", "CampaignStats")
+    AdvertisementStats = apps.get_model("core", "AdvertisementStats")
+
+    ad_stats = {pk: AdvertisementStats(advertisement_id=pk) for pk in Advertisement.objects.values_list("id", flat=True)}
+    for ad_id, file, is_active in Banner.objects.values_list("advertisement_id", "file", "is_active").iterator():
+        stats = ad_stats[ad_id]
+        stats.banner_count += 1
+        stats.active_banner_count += int(is_active)
+        ext = file.split(".")[-1].lower()
+        if ext in ALLOWED_EXTENSIONS:
+            stats.format_mask |= 1 << ALLOWED_EXTENSIONS.index(ext)
+
+    campaign_stats = {pk: CampaignStats(campaign_id=pk) for pk in Campaign.objects.values_list("id", flat=True)}
+    for ad_id, campaign_id in Advertisement.objects.values_list("id", "campaign_id").iterator():
+        stats = campaign_stats[campaign_id]
+        stats.ad_count += 1
+        stats.banner_count += ad_stats[ad_id].banner_count
+        stats.active_banner_count += ad_stats[ad_id].active_banner_count
+        stats.format_mask |= ad_stats[ad_id].format_mask
+
+    AdvertisementStats.objects.bulk_create(ad_stats.values(), batch_size=1000)
+    CampaignStats.objects.bulk_create(campaign_stats.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_alter_advertisement_campaign_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdvertisementStats',
+            fields=[
+                ('banner_count', models.PositiveIntegerField(default=0, verbose_name='Кол-во баннеров')),
+                ('active_banner_count', models.PositiveIntegerField(default=0, verbose_name='Кол-во активных баннеров')),
+                ('format_mask', models.PositiveIntegerField(default=0, verbose_name='Битовая маска форматов файлов')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('advertisement', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='core.advertisement', verbose_name='Объявление')),
+            ],
+            options={
+                'verbose_name': 'Статистика объявления',
+                'verbose_name_plural': 'Статистика объявлений',
+            },
+        ),
+        migrations.CreateModel(
+            name='CampaignStats',
+            fields=[
+                ('banner_count', models.PositiveIntegerField(default=0, verbose_name='Кол-во баннеров')),
+                ('active_banner_count', models.PositiveIntegerField(default=0, verbose_name='Кол-во активных баннеров')),
+                ('format_mask', models.PositiveIntegerField(default=0, verbose_name='Битовая маска форматов файлов')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('campaign', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='core.campaign', verbose_name='Кампания')),
+                ('ad_count', models.PositiveIntegerField(default=0, verbose_name='Кол-во объявлений')),
+            ],
+            options={
+                'verbose_name': 'Статистика кампании',
+                'verbose_name_plural': 'Статистика кампаний',
+            },
+        ),
+        migrations.RunPython(populate_stats, migrations.RunPython.noop),
+    ]
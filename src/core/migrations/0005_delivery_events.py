@@ -0,0 +1,34 @@
+# Generated by Django 5.2.11 on 2026-10-18 14:58
+
+import uuid
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeliveryEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.UUIDField(default=uuid.uuid4, unique=True, verbose_name='Идентификатор события')),
+                ('kind', models.CharField(choices=[('impression', 'Показ'), ('click', 'Клик')], max_length=15, verbose_name='Тип события')),
+                ('cost', models.DecimalField(decimal_places=4, default=0, max_digits=12, verbose_name='Стоимость')),
+                ('occurred_at', models.DateTimeField(db_index=True, verbose_name='Время события')),
+                ('received_at', models.DateTimeField(auto_now_add=True, verbose_name='Время записи')),
+                ('advertisement', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core.advertisement', verbose_name='Объявление')),
+                ('banner', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core.banner', verbose_name='Баннер')),
+                ('campaign', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core.campaign', verbose_name='Кампания')),
+            ],
+            options={
+                'verbose_name': 'Событие показа',
+                'verbose_name_plural': 'События показов',
+            },
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.11 on 2026-10-18 14:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_delivery_events'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=63, unique=True, verbose_name='Название')),
+                ('last_event_id', models.BigIntegerField(default=0, verbose_name='Последнее обработанное событие')),
+            ],
+            options={
+                'verbose_name': 'Отметка агрегации',
+                'verbose_name_plural': 'Отметки агрегации',
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyDeliveryRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('impressions', models.PositiveBigIntegerField(default=0, verbose_name='Показы')),
+                ('clicks', models.PositiveBigIntegerField(default=0, verbose_name='Клики')),
+                ('spend', models.DecimalField(decimal_places=4, default=0, max_digits=16, verbose_name='Расход')),
+                ('bucket', models.DateField(verbose_name='День')),
+                ('advertisement', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core.advertisement', verbose_name='Объявление')),
+                ('banner', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core.banner', verbose_name='Баннер')),
+                ('campaign', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core.campaign', verbose_name='Кампания')),
+            ],
+            options={
+                'verbose_name': 'Дневная статистика показов',
+                'verbose_name_plural': 'Дневная статистика показов',
+                'indexes': [models.Index(fields=['campaign', 'bucket'], name='daily_rollup_campaign_bucket')],
+                'constraints': [models.UniqueConstraint(fields=('bucket', 'banner'), name='daily_rollup_bucket_banner')],
+            },
+        ),
+        migrations.CreateModel(
+            name='HourlyDeliveryRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('impressions', models.PositiveBigIntegerField(default=0, verbose_name='Показы')),
+                ('clicks', models.PositiveBigIntegerField(default=0, verbose_name='Клики')),
+                ('spend', models.DecimalField(decimal_places=4, default=0, max_digits=16, verbose_name='Расход')),
+                ('bucket', models.DateTimeField(verbose_name='Час')),
+                ('advertisement', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core.advertisement', verbose_name='Объявление')),
+                ('banner', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core.banner', verbose_name='Баннер')),
+                ('campaign', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core.campaign', verbose_name='Кампания')),
+            ],
+            options={
+                'verbose_name': 'Почасовая статистика показов',
+                'verbose_name_plural': 'Почасовая статистика показов',
+                'indexes': [models.Index(fields=['campaign', 'bucket'], name='hourly_rollup_campaign_bucket')],
+                'constraints': [models.UniqueConstraint(fields=('bucket', 'banner'), name='hourly_rollup_bucket_banner')],
+            },
+        ),
+    ]
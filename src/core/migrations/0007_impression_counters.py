@@ -0,0 +1,28 @@
+# Generated by Django 5.2.11 on 2026-10-18 15:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_delivery_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyImpressionCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Показы')),
+                ('campaign', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.campaign', verbose_name='Кампания')),
+            ],
+            options={
+                'verbose_name': 'Счётчик показов за день',
+                'verbose_name_plural': 'Счётчики показов за день',
+                'constraints': [models.UniqueConstraint(fields=('campaign', 'day'), name='impression_counter_campaign_day')],
+            },
+        ),
+    ]
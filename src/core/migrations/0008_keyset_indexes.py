@@ -0,0 +1,25 @@
+# Generated by Django 5.2.11 on 2026-10-18 15:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0007_impression_counters"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="advertisement",
+            index=models.Index(fields=["campaign", "-created_at", "-id"], name="advertisement_campaign_keyset"),
+        ),
+        migrations.AddIndex(
+            model_name="banner",
+            index=models.Index(fields=["advertisement", "-created_at", "-id"], name="banner_advertisement_keyset"),
+        ),
+        migrations.AddIndex(
+            model_name="campaign",
+            index=models.Index(fields=["user", "-created_at", "-id"], name="campaign_user_keyset"),
+        ),
+    ]
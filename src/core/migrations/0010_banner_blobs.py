@@ -0,0 +1,56 @@
+# Generated by Django 5.2.11 on 2026-10-18 15:46
+
+import django.core.validators
+from django.db import migrations, models
+from django.db.models import Count
+
+import core.models.ads
+import core.storage
+
+
+def populate_blobs(apps, schema_editor):
+    Banner = apps.get_model("core", "Banner")
+    BannerBlob = apps.get_model("core", "BannerBlob")
+    rows = Banner.objects.exclude(file="").values("file").annotate(ref_count=Count("id")).order_by()
+    BannerBlob.objects.bulk_create(
+        (BannerBlob(name=row["file"], ref_count=row["ref_count"]) for row in rows.iterator()), batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0009_import_checkpoints"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BannerBlob",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("name", models.CharField(max_length=255, unique=True, verbose_name="Путь в хранилище")),
+                ("ref_count", models.PositiveIntegerField(db_index=True, default=0, verbose_name="Кол-во баннеров")),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Файл баннера",
+                "verbose_name_plural": "Файлы баннеров",
+            },
+        ),
+        migrations.AlterField(
+            model_name="banner",
+            name="file",
+            field=models.FileField(
+                storage=core.storage.banner_storage,
+                upload_to=core.models.ads.banner_upload_path,
+                validators=[
+                    django.core.validators.FileExtensionValidator(
+                        allowed_extensions=["gif", "png", "jpg", "jpeg", "htm", "html"]
+                    )
+                ],
+                verbose_name="Файл с рекламными материалами",
+            ),
+        ),
+        migrations.RunPython(populate_blobs, migrations.RunPython.noop),
+    ]
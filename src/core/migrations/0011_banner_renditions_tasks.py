@@ -0,0 +1,90 @@
+# Generated by Django 5.2.11 on 2026-10-18 15:59
+
+import django.utils.timezone
+from django.db import migrations, models
+
+IMAGE_EXTENSIONS = ("gif", "png", "jpg", "jpeg")
+
+
+def schedule_renditions(apps, schema_editor):
+    Banner = apps.get_model("core", "Banner")
+    Task = apps.get_model("core", "Task")
+    names = Banner.objects.exclude(file="").values_list("file", flat=True).distinct().order_by()
+    Task.objects.bulk_create(
+        (
+            Task(name="banner_renditions", key=f"banner_renditions:{name}", payload={"source": name})
+            for name in names.iterator()
+            if name.rsplit(".", 1)[-1].lower() in IMAGE_EXTENSIONS
+        ),
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0010_banner_blobs"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BannerRendition",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("source", models.CharField(db_index=True, max_length=255, verbose_name="Исходный файл")),
+                ("kind", models.CharField(max_length=32, verbose_name="Вид")),
+                ("name", models.CharField(db_index=True, max_length=255, verbose_name="Путь в хранилище")),
+                ("width", models.PositiveIntegerField(verbose_name="Ширина")),
+                ("height", models.PositiveIntegerField(verbose_name="Высота")),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "verbose_name": "Копия баннера",
+                "verbose_name_plural": "Копии баннеров",
+                "constraints": [models.UniqueConstraint(fields=("source", "kind"), name="banner_rendition_source_kind")],
+            },
+        ),
+        migrations.CreateModel(
+            name="Task",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("name", models.CharField(max_length=64, verbose_name="Задача")),
+                (
+                    "key",
+                    models.CharField(blank=True, max_length=255, null=True, unique=True, verbose_name="Ключ идемпотентности"),
+                ),
+                ("payload", models.JSONField(blank=True, default=dict, verbose_name="Параметры")),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "В очереди"),
+                            ("running", "Выполняется"),
+                            ("done", "Выполнена"),
+                            ("failed", "Ошибка"),
+                        ],
+                        default="pending",
+                        max_length=16,
+                        verbose_name="Статус",
+                    ),
+                ),
+                ("attempts", models.PositiveIntegerField(default=0, verbose_name="Попыток")),
+                ("available_at", models.DateTimeField(default=django.utils.timezone.now, verbose_name="Не раньше")),
+                ("lease", models.UUIDField(blank=True, null=True, verbose_name="Аренда")),
+                ("leased_until", models.DateTimeField(blank=True, null=True, verbose_name="Аренда до")),
+                ("error", models.TextField(blank=True, verbose_name="Последняя ошибка")),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Фоновая задача",
+                "verbose_name_plural": "Фоновые задачи",
+                "indexes": [
+                    models.Index(fields=["status", "available_at"], name="task_queue"),
+                    models.Index(fields=["lease"], name="task_lease"),
+                ],
+            },
+        ),
+        migrations.RunPython(schedule_renditions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.11 on 2026-10-18 16:06
+
+import uuid
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0011_banner_renditions_tasks"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BannerUpload",
+            fields=[
+                ("id", models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ("filename", models.CharField(max_length=255, verbose_name="Имя файла")),
+                ("size", models.PositiveBigIntegerField(verbose_name="Размер, байт")),
+                ("offset", models.PositiveBigIntegerField(default=0, verbose_name="Принято, байт")),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True, db_index=True)),
+                (
+                    "advertisement",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="uploads",
+                        to="core.advertisement",
+                        verbose_name="Объявление",
+                    ),
+                ),
+                (
+                    "banner",
+                    models.OneToOneField(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="upload",
+                        to="core.banner",
+                        verbose_name="Баннер",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name="Пользователь"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Загрузка баннера",
+                "verbose_name_plural": "Загрузки баннеров",
+            },
+        ),
+    ]
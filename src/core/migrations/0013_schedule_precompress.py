@@ -0,0 +1,31 @@
+# Generated by Django 5.2.11 on 2026-10-18 16:10
+
+from django.db import migrations
+
+COMPRESSIBLE_EXTENSIONS = ("htm", "html")
+
+
+def schedule_precompress(apps, schema_editor):
+    Banner = apps.get_model("core", "Banner")
+    Task = apps.get_model("core", "Task")
+    names = Banner.objects.exclude(file="").values_list("file", flat=True).distinct().order_by()
+    Task.objects.bulk_create(
+        (
+            Task(name="banner_precompress", key=f"banner_precompress:{name}", payload={"source": name})
+            for name in names.iterator()
+            if name.rsplit(".", 1)[-1].lower() in COMPRESSIBLE_EXTENSIONS
+        ),
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0012_banner_uploads"),
+    ]
+
+    operations = [
+        migrations.RunPython(schedule_precompress, migrations.RunPython.noop),
+    ]
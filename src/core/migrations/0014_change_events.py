@@ -0,0 +1,74 @@
+# Generated by Django 5.2.11 on 2026-10-18 16:22
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0013_schedule_precompress"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ChangeConsumer",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("name", models.CharField(max_length=255, unique=True, verbose_name="Название")),
+                ("position", models.BigIntegerField(default=0, verbose_name="Последнее обработанное изменение")),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Потребитель журнала изменений",
+                "verbose_name_plural": "Потребители журнала изменений",
+            },
+        ),
+        migrations.CreateModel(
+            name="ChangeEvent",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                (
+                    "entity",
+                    models.CharField(
+                        choices=[("campaign", "Кампания"), ("advertisement", "Объявление"), ("banner", "Баннер")],
+                        max_length=15,
+                        verbose_name="Сущность",
+                    ),
+                ),
+                ("object_id", models.BigIntegerField(verbose_name="Идентификатор объекта")),
+                (
+                    "action",
+                    models.CharField(
+                        choices=[
+                            ("created", "Создание"),
+                            ("updated", "Изменение"),
+                            ("deleted", "Удаление"),
+                            ("archived", "Архивирование"),
+                        ],
+                        max_length=15,
+                        verbose_name="Действие",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name="Время изменения"),
+                ),
+                (
+                    "campaign",
+                    models.ForeignKey(
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="+",
+                        to="core.campaign",
+                        verbose_name="Кампания",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Изменение каталога",
+                "verbose_name_plural": "Журнал изменений каталога",
+            },
+        ),
+    ]
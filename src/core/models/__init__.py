@@ -1 +1,7 @@
+from .assets import BannerBlob, BannerRendition, BannerUpload
+from .changes import ChangeConsumer, ChangeEvent
+from .events import DailyDeliveryRollup, DailyImpressionCounter, DeliveryEvent, HourlyDeliveryRollup, RollupWatermark
+from .imports import ImportCheckpoint
+from .stats import AdvertisementStats, CampaignStats
+from .tasks import Task
 from .users import User
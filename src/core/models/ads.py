@@ -4,7 +4,11 @@ from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.core.validators import FileExtensionValidator, MaxValueValidator, MinValueValidator
 from django.db import models
-from django.db.models import Q
+from django.db.models import Count, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Lower, Reverse, Right, StrIndex
+
+from core.storage import banner_storage
+from .assets import BannerRendition
 
 ALLOWED_EXTENSIONS = ["gif", "png", "jpg", "jpeg", "htm", "html"]
 
@@ -16,6 +20,57 @@ class TimeStampModel(models.Model):
     class Meta:
         abstract = True
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Значения из базы: сигналы сравнивают с ними новые, не перечитывая строку
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def loaded_value(self, attname):
+        """Значение поля на момент загрузки или последнего сохранения; None, если объект не из базы."""
+        return getattr(self, "_loaded_values", {}).get(attname)
+
+    def _remember_values(self, attnames=None):
+        deferred = self.get_deferred_fields()
+        loaded = getattr(self, "_loaded_values", {})
+        for field in self._meta.concrete_fields:
+            if field.attname not in deferred and (attnames is None or field.attname in attnames):
+                loaded[field.attname] = field.get_prep_value(field.value_from_object(self))
+        self._loaded_values = loaded
+
+    def save(self, *args, update_fields=None, **kwargs):
+        super().save(*args, update_fields=update_fields, **kwargs)
+        attnames = None if update_fields is None else {self._meta.get_field(name).attname for name in update_fields}
+        self._remember_values(attnames)
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        self._remember_values(None if fields is None else {self._meta.get_field(name).attname for name in fields})
+
+
+class BannerStatsQuerySet(models.QuerySet):
+    @property
+    def stats_model(self):
+        return self.model._meta.get_field("stats").related_model
+
+    def _apply_banner_stats(self, objects, stats):
+        for obj in objects:
+            row = stats.get(obj.pk) or self.stats_model()
+            obj.banner_count = row.banner_count
+            obj.file_formats = row.file_formats
+        return objects
+
+    def attach_banner_stats(self, objects):
+        objects = list(objects)
+        stats = self.stats_model.objects.in_bulk([obj.pk for obj in objects])
+        return self._apply_banner_stats(objects, stats)
+
+    async def aattach_banner_stats(self, objects):
+        objects = list(objects)
+        stats = await self.stats_model.objects.ain_bulk([obj.pk for obj in objects])
+        return self._apply_banner_stats(objects, stats)
+
 
 class Campaign(TimeStampModel):
     class SpendingStrategy(models.TextChoices):
@@ -36,9 +91,12 @@ class Campaign(TimeStampModel):
     )
     targeting = models.JSONField(default=dict, blank=True, verbose_name="Таргетинг")
 
+    objects = BannerStatsQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Рекламная кампания"
         verbose_name_plural = "Рекламные кампании"
+        indexes = [models.Index(fields=["user", "-created_at", "-id"], name="campaign_user_keyset")]
         constraints = [
             models.CheckConstraint(check=Q(budget__gte=0), name="budget_positive"),
             models.CheckConstraint(
@@ -77,9 +135,12 @@ class Advertisement(TimeStampModel):
     url = models.URLField(verbose_name="Url рекламного объекта")
     description = models.TextField(verbose_name="Текст объявления")
 
+    objects = BannerStatsQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Рекламное объявление"
         verbose_name_plural = "Рекламные объявления"
+        indexes = [models.Index(fields=["campaign", "-created_at", "-id"], name="advertisement_campaign_keyset")]
 
     def __str__(self):
         return self.name
@@ -90,6 +151,38 @@ def banner_upload_path(instance, filename: str):
     return f"banners/{instance.advertisement_id}/{instance.uid}/{uuid.uuid4()}.{ext}"
 
 
+class BannerQuerySet(models.QuerySet):
+    def with_file_format(self):
+        return self.annotate(file_format=Lower(Right("file", StrIndex(Reverse("file"), Value(".")) - 1)))
+
+    def with_renditions(self, *kinds):
+        """Аннотирует <вид>_rendition путём уменьшенной копии файла; None, пока воркер её не построил."""
+        return self.annotate(
+            **{
+                f"{kind}_rendition": Subquery(
+                    BannerRendition.objects.filter(source=OuterRef("file"), kind=kind).values("name")[:1]
+                )
+                for kind in kinds
+            }
+        )
+
+    def stats_by(self, group_field, ids=None):
+        queryset = self if ids is None else self.filter(**{f"{group_field}__in": ids})
+        rows = (
+            queryset.with_file_format()
+            .values(group_field, "file_format")
+            .annotate(banner_count=Count("id"), active_banner_count=Count("id", filter=Q(is_active=True)))
+            .order_by()
+        )
+        stats = {pk: {"banner_count": 0, "active_banner_count": 0, "file_formats": set()} for pk in ids or []}
+        for row in rows:
+            item = stats.setdefault(row[group_field], {"banner_count": 0, "active_banner_count": 0, "file_formats": set()})
+            item["banner_count"] += row["banner_count"]
+            item["active_banner_count"] += row["active_banner_count"]
+            item["file_formats"].add(row["file_format"])
+        return stats
+
+
 class Banner(TimeStampModel):
     advertisement = models.ForeignKey(
         Advertisement, on_delete=models.CASCADE, related_name="banners", verbose_name="Объявление"
@@ -99,14 +192,18 @@ class Banner(TimeStampModel):
     height = models.PositiveIntegerField(validators=[MinValueValidator(1), MaxValueValidator(20000)], verbose_name="Высота")
     file = models.FileField(
         upload_to=banner_upload_path,
+        storage=banner_storage,
         validators=[FileExtensionValidator(allowed_extensions=ALLOWED_EXTENSIONS)],
         verbose_name="Файл с рекламными материалами",
     )
     is_active = models.BooleanField(default=True, verbose_name="Статус", db_index=True)
 
+    objects = BannerQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Баннер"
         verbose_name_plural = "Баннеры"
+        indexes = [models.Index(fields=["advertisement", "-created_at", "-id"], name="banner_advertisement_keyset")]
 
     def __str__(self):
         return f"{self.uid} ({self.width}x{self.height})"
@@ -0,0 +1,106 @@
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+
+class BannerBlobQuerySet(models.QuerySet):
+    def acquire(self, names):
+        """Увеличивает счётчики ссылок; имена могут повторяться, каждое повторение — отдельная ссылка."""
+        for name, count in Counter(name for name in names if name).items():
+            if self.filter(name=name).update(ref_count=F("ref_count") + count, updated_at=timezone.now()):
+                continue
+            try:
+                with transaction.atomic():
+                    self.create(name=name, ref_count=count)
+            except IntegrityError:
+                self.filter(name=name).update(ref_count=F("ref_count") + count, updated_at=timezone.now())
+
+    def release(self, names):
+        for name, count in Counter(name for name in names if name).items():
+            self.filter(name=name).update(ref_count=Greatest(F("ref_count") - count, Value(0)), updated_at=timezone.now())
+
+
+class BannerBlob(models.Model):
+    name = models.CharField(max_length=255, unique=True, verbose_name="Путь в хранилище")
+    ref_count = models.PositiveIntegerField(default=0, verbose_name="Кол-во баннеров", db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = BannerBlobQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Файл баннера"
+        verbose_name_plural = "Файлы баннеров"
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count})"
+
+
+class BannerRenditionQuerySet(models.QuerySet):
+    def for_sources(self, sources):
+        """{исходный файл: {вид: rendition}} для набора файлов одним запросом."""
+        renditions = {}
+        for rendition in self.filter(source__in={source for source in sources if source}):
+            renditions.setdefault(rendition.source, {})[rendition.kind] = rendition
+        return renditions
+
+    async def afor_sources(self, sources):
+        renditions = {}
+        async for rendition in self.filter(source__in={source for source in sources if source}):
+            renditions.setdefault(rendition.source, {})[rendition.kind] = rendition
+        return renditions
+
+
+class BannerRendition(models.Model):
+    """Уменьшенная копия файла баннера. Привязана к файлу, а не к баннеру: общий креатив рендерится один раз."""
+
+    source = models.CharField(max_length=255, verbose_name="Исходный файл", db_index=True)
+    kind = models.CharField(max_length=32, verbose_name="Вид")
+    name = models.CharField(max_length=255, verbose_name="Путь в хранилище", db_index=True)
+    width = models.PositiveIntegerField(verbose_name="Ширина")
+    height = models.PositiveIntegerField(verbose_name="Высота")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = BannerRenditionQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Копия баннера"
+        verbose_name_plural = "Копии баннеров"
+        constraints = [models.UniqueConstraint(fields=["source", "kind"], name="banner_rendition_source_kind")]
+
+    def __str__(self):
+        return f"{self.source} {self.kind} ({self.width}x{self.height})"
+
+
+class BannerUpload(models.Model):
+    """Загрузка файла баннера по частям: offset — сколько байт уже принято и записано на диск."""
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, verbose_name="Пользователь")
+    advertisement = models.ForeignKey(
+        "core.Advertisement", on_delete=models.CASCADE, related_name="uploads", verbose_name="Объявление"
+    )
+    filename = models.CharField(max_length=255, verbose_name="Имя файла")
+    size = models.PositiveBigIntegerField(verbose_name="Размер, байт")
+    offset = models.PositiveBigIntegerField(default=0, verbose_name="Принято, байт")
+    banner = models.OneToOneField(
+        "core.Banner", on_delete=models.SET_NULL, null=True, blank=True, related_name="upload", verbose_name="Баннер"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        verbose_name = "Загрузка баннера"
+        verbose_name_plural = "Загрузки баннеров"
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size})"
+
+    @property
+    def is_received(self):
+        return self.offset == self.size
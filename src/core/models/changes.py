@@ -0,0 +1,61 @@
+from django.db import models
+from django.utils import timezone
+
+from .ads import Campaign
+
+
+class ChangeEventQuerySet(models.QuerySet):
+    def record(self, entries):
+        """entries — кортежи (сущность, действие, id объекта, id кампании). Пишется в транзакции самого изменения."""
+        now = timezone.now()
+        events = [
+            self.model(entity=entity, action=action, object_id=object_id, campaign_id=campaign_id, created_at=now)
+            for entity, action, object_id, campaign_id in entries
+        ]
+        return self.bulk_create(events)
+
+
+class ChangeEvent(models.Model):
+    """Журнал изменений кампаний, объявлений и баннеров (outbox). id — позиция в журнале."""
+
+    class Entity(models.TextChoices):
+        CAMPAIGN = "campaign", "Кампания"
+        ADVERTISEMENT = "advertisement", "Объявление"
+        BANNER = "banner", "Баннер"
+
+    class Action(models.TextChoices):
+        CREATED = "created", "Создание"
+        UPDATED = "updated", "Изменение"
+        DELETED = "deleted", "Удаление"
+        ARCHIVED = "archived", "Архивирование"
+
+    entity = models.CharField(max_length=15, choices=Entity.choices, verbose_name="Сущность")
+    object_id = models.BigIntegerField(verbose_name="Идентификатор объекта")
+    # Журнал переживает удаление кампании, поэтому без ограничений целостности
+    campaign = models.ForeignKey(
+        Campaign, on_delete=models.DO_NOTHING, db_constraint=False, related_name="+", verbose_name="Кампания"
+    )
+    action = models.CharField(max_length=15, choices=Action.choices, verbose_name="Действие")
+    created_at = models.DateTimeField(default=timezone.now, db_index=True, verbose_name="Время изменения")
+
+    objects = ChangeEventQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Изменение каталога"
+        verbose_name_plural = "Журнал изменений каталога"
+
+    def __str__(self):
+        return f"{self.id}: {self.action} {self.entity} {self.object_id}"
+
+
+class ChangeConsumer(models.Model):
+    name = models.CharField(max_length=255, unique=True, verbose_name="Название")
+    position = models.BigIntegerField(default=0, verbose_name="Последнее обработанное изменение")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Потребитель журнала изменений"
+        verbose_name_plural = "Потребители журнала изменений"
+
+    def __str__(self):
+        return f"{self.name}: {self.position}"
@@ -0,0 +1,98 @@
+import uuid
+
+from django.db import models
+
+from .ads import Advertisement, Banner, Campaign
+
+
+class DeliveryEvent(models.Model):
+    class Kind(models.TextChoices):
+        IMPRESSION = "impression", "Показ"
+        CLICK = "click", "Клик"
+
+    event_id = models.UUIDField(default=uuid.uuid4, unique=True, verbose_name="Идентификатор события")
+    kind = models.CharField(max_length=15, choices=Kind.choices, verbose_name="Тип события")
+    # Журнал событий переживает удаление баннеров, поэтому без ограничений целостности
+    banner = models.ForeignKey(
+        Banner, on_delete=models.DO_NOTHING, db_constraint=False, related_name="+", verbose_name="Баннер"
+    )
+    advertisement = models.ForeignKey(
+        Advertisement, on_delete=models.DO_NOTHING, db_constraint=False, related_name="+", verbose_name="Объявление"
+    )
+    campaign = models.ForeignKey(
+        Campaign, on_delete=models.DO_NOTHING, db_constraint=False, related_name="+", verbose_name="Кампания"
+    )
+    cost = models.DecimalField(max_digits=12, decimal_places=4, default=0, verbose_name="Стоимость")
+    occurred_at = models.DateTimeField(db_index=True, verbose_name="Время события")
+    received_at = models.DateTimeField(auto_now_add=True, verbose_name="Время записи")
+
+    class Meta:
+        verbose_name = "Событие показа"
+        verbose_name_plural = "События показов"
+
+    def __str__(self):
+        return f"{self.kind} {self.banner_id} ({self.occurred_at})"
+
+
+class DeliveryRollup(models.Model):
+    banner = models.ForeignKey(
+        Banner, on_delete=models.DO_NOTHING, db_constraint=False, related_name="+", verbose_name="Баннер"
+    )
+    advertisement = models.ForeignKey(
+        Advertisement, on_delete=models.DO_NOTHING, db_constraint=False, related_name="+", verbose_name="Объявление"
+    )
+    campaign = models.ForeignKey(
+        Campaign, on_delete=models.DO_NOTHING, db_constraint=False, related_name="+", verbose_name="Кампания"
+    )
+    impressions = models.PositiveBigIntegerField(default=0, verbose_name="Показы")
+    clicks = models.PositiveBigIntegerField(default=0, verbose_name="Клики")
+    spend = models.DecimalField(max_digits=16, decimal_places=4, default=0, verbose_name="Расход")
+
+    class Meta:
+        abstract = True
+
+
+class HourlyDeliveryRollup(DeliveryRollup):
+    bucket = models.DateTimeField(verbose_name="Час")
+
+    class Meta:
+        verbose_name = "Почасовая статистика показов"
+        verbose_name_plural = "Почасовая статистика показов"
+        constraints = [models.UniqueConstraint(fields=["bucket", "banner"], name="hourly_rollup_bucket_banner")]
+        indexes = [models.Index(fields=["campaign", "bucket"], name="hourly_rollup_campaign_bucket")]
+
+
+class DailyDeliveryRollup(DeliveryRollup):
+    bucket = models.DateField(verbose_name="День")
+
+    class Meta:
+        verbose_name = "Дневная статистика показов"
+        verbose_name_plural = "Дневная статистика показов"
+        constraints = [models.UniqueConstraint(fields=["bucket", "banner"], name="daily_rollup_bucket_banner")]
+        indexes = [models.Index(fields=["campaign", "bucket"], name="daily_rollup_campaign_bucket")]
+
+
+class RollupWatermark(models.Model):
+    name = models.CharField(max_length=63, unique=True, verbose_name="Название")
+    last_event_id = models.BigIntegerField(default=0, verbose_name="Последнее обработанное событие")
+
+    class Meta:
+        verbose_name = "Отметка агрегации"
+        verbose_name_plural = "Отметки агрегации"
+
+    def __str__(self):
+        return f"{self.name}: {self.last_event_id}"
+
+
+class DailyImpressionCounter(models.Model):
+    campaign = models.ForeignKey(Campaign, on_delete=models.CASCADE, related_name="+", verbose_name="Кампания")
+    day = models.DateField(verbose_name="День")
+    count = models.PositiveIntegerField(default=0, verbose_name="Показы")
+
+    class Meta:
+        verbose_name = "Счётчик показов за день"
+        verbose_name_plural = "Счётчики показов за день"
+        constraints = [models.UniqueConstraint(fields=["campaign", "day"], name="impression_counter_campaign_day")]
+
+    def __str__(self):
+        return f"{self.campaign_id} {self.day}: {self.count}"
@@ -0,0 +1,15 @@
+from django.db import models
+
+
+class ImportCheckpoint(models.Model):
+    name = models.CharField(max_length=255, unique=True, verbose_name="Название")
+    position = models.PositiveBigIntegerField(default=0, verbose_name="Обработано строк")
+    state = models.JSONField(default=dict, blank=True, verbose_name="Состояние")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Контрольная точка импорта"
+        verbose_name_plural = "Контрольные точки импорта"
+
+    def __str__(self):
+        return f"{self.name}: {self.position}"
@@ -0,0 +1,145 @@
+from django.db import models
+from django.utils import timezone
+
+from .ads import Advertisement, ALLOWED_EXTENSIONS, Banner, Campaign
+
+FORMAT_BITS = {ext: 1 << i for i, ext in enumerate(ALLOWED_EXTENSIONS)}
+
+
+def formats_to_mask(formats):
+    mask = 0
+    for ext in formats:
+        mask |= FORMAT_BITS.get(ext, 0)
+    return mask
+
+
+def mask_to_formats(mask):
+    return sorted(ext for ext, bit in FORMAT_BITS.items() if mask & bit)
+
+
+def _banner_rollup(stats):
+    return {
+        "banner_count": stats["banner_count"],
+        "active_banner_count": stats["active_banner_count"],
+        "format_mask": formats_to_mask(stats["file_formats"]),
+    }
+
+
+def _campaign_rollup(ad_rollups):
+    rollup = {"banner_count": 0, "active_banner_count": 0, "format_mask": 0, "ad_count": 0}
+    for ad_rollup in ad_rollups:
+        rollup["banner_count"] += ad_rollup["banner_count"] or 0
+        rollup["active_banner_count"] += ad_rollup["active_banner_count"] or 0
+        rollup["format_mask"] |= ad_rollup["format_mask"] or 0
+        rollup["ad_count"] += 1
+    return rollup
+
+
+def compute_rollups():
+    """Пересчитывает агрегаты всего дерева с нуля: (по кампаниям, по объявлениям)."""
+    banner_stats = Banner.objects.stats_by("advertisement")
+    empty = {"banner_count": 0, "active_banner_count": 0, "file_formats": ()}
+
+    ad_rollups = {}
+    ads_by_campaign = {pk: [] for pk in Campaign.objects.values_list("id", flat=True).iterator()}
+    for ad_id, campaign_id in Advertisement.objects.values_list("id", "campaign_id").iterator():
+        ad_rollups[ad_id] = _banner_rollup(banner_stats.get(ad_id, empty))
+        ads_by_campaign[campaign_id].append(ad_rollups[ad_id])
+
+    campaign_rollups = {pk: _campaign_rollup(rollups) for pk, rollups in ads_by_campaign.items()}
+    return campaign_rollups, ad_rollups
+
+
+class StatsQuerySet(models.QuerySet):
+    owner_model = None
+
+    def save_rollup(self, pk, rollup):
+        if not self.filter(pk=pk).update(**rollup, updated_at=timezone.now()):
+            if self.owner_model.objects.filter(pk=pk).exists():
+                self.create(pk=pk, **rollup)
+
+    def save_rollups(self, rollups, batch_size=1000):
+        """Пачечный вариант save_rollup: недостающие строки создаются, существующие обновляются одним bulk_update."""
+        existing = set(self.filter(pk__in=rollups).values_list("pk", flat=True))
+        owners = set(self.owner_model.objects.filter(pk__in=rollups.keys() - existing).values_list("pk", flat=True))
+        now = timezone.now()
+        self.bulk_create([self.model(pk=pk, **rollups[pk]) for pk in owners], batch_size=batch_size)
+        fields = [*next(iter(rollups.values()), {}), "updated_at"]
+        rows = [self.model(pk=pk, **rollups[pk], updated_at=now) for pk in existing]
+        if rows:
+            self.bulk_update(rows, fields, batch_size=batch_size)
+
+
+class AdvertisementStatsQuerySet(StatsQuerySet):
+    owner_model = Advertisement
+
+    def refresh(self, advertisement_id):
+        stats = Banner.objects.stats_by("advertisement", [advertisement_id])[advertisement_id]
+        self.save_rollup(advertisement_id, _banner_rollup(stats))
+
+    def refresh_many(self, advertisement_ids):
+        stats = Banner.objects.stats_by("advertisement", list(advertisement_ids))
+        self.save_rollups({pk: _banner_rollup(item) for pk, item in stats.items()})
+
+
+class CampaignStatsQuerySet(StatsQuerySet):
+    owner_model = Campaign
+
+    def refresh(self, campaign_id):
+        ad_rollups = Advertisement.objects.filter(campaign_id=campaign_id).values(
+            banner_count=models.F("stats__banner_count"),
+            active_banner_count=models.F("stats__active_banner_count"),
+            format_mask=models.F("stats__format_mask"),
+        )
+        self.save_rollup(campaign_id, _campaign_rollup(ad_rollups))
+
+    def refresh_many(self, campaign_ids):
+        ads_by_campaign = {pk: [] for pk in campaign_ids}
+        ad_rollups = Advertisement.objects.filter(campaign_id__in=ads_by_campaign).values(
+            "campaign_id",
+            banner_count=models.F("stats__banner_count"),
+            active_banner_count=models.F("stats__active_banner_count"),
+            format_mask=models.F("stats__format_mask"),
+        )
+        for ad_rollup in ad_rollups.iterator():
+            ads_by_campaign[ad_rollup["campaign_id"]].append(ad_rollup)
+        self.save_rollups({pk: _campaign_rollup(rollups) for pk, rollups in ads_by_campaign.items()})
+
+
+class StatsModel(models.Model):
+    banner_count = models.PositiveIntegerField(default=0, verbose_name="Кол-во баннеров")
+    active_banner_count = models.PositiveIntegerField(default=0, verbose_name="Кол-во активных баннеров")
+    format_mask = models.PositiveIntegerField(default=0, verbose_name="Битовая маска форматов файлов")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+    @property
+    def file_formats(self):
+        return mask_to_formats(self.format_mask)
+
+
+class AdvertisementStats(StatsModel):
+    advertisement = models.OneToOneField(
+        Advertisement, on_delete=models.CASCADE, primary_key=True, related_name="stats", verbose_name="Объявление"
+    )
+
+    objects = AdvertisementStatsQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Статистика объявления"
+        verbose_name_plural = "Статистика объявлений"
+
+
+class CampaignStats(StatsModel):
+    campaign = models.OneToOneField(
+        Campaign, on_delete=models.CASCADE, primary_key=True, related_name="stats", verbose_name="Кампания"
+    )
+    ad_count = models.PositiveIntegerField(default=0, verbose_name="Кол-во объявлений")
+
+    objects = CampaignStatsQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Статистика кампании"
+        verbose_name_plural = "Статистика кампаний"
@@ -0,0 +1,92 @@
+import datetime
+import uuid
+
+from django.db import models
+from django.db.models import F, Q
+from django.utils import timezone
+
+
+class TaskQuerySet(models.QuerySet):
+    def enqueue(self, name, payloads):
+        """payloads — пары (ключ, данные); задача с уже существующим ключом повторно не ставится."""
+        tasks = [self.model(name=name, key=key, payload=payload) for key, payload in payloads]
+        return self.bulk_create(tasks, ignore_conflicts=True)
+
+    def _claimable(self, now):
+        # Задачи упавшего воркера возвращаются в очередь после истечения аренды
+        return self.filter(
+            Q(status=Task.Status.PENDING, available_at__lte=now) | Q(status=Task.Status.RUNNING, leased_until__lt=now)
+        )
+
+    def claim(self, limit, lease_seconds):
+        """
+        Забирает до limit задач под новую аренду. Захват — один условный UPDATE, поэтому
+        параллельные воркеры не получат одну задачу и без SELECT FOR UPDATE.
+        """
+        now = timezone.now()
+        ids = list(self._claimable(now).order_by("available_at", "id").values_list("id", flat=True)[:limit])
+        if not ids:
+            return []
+        lease = uuid.uuid4()
+        self._claimable(now).filter(id__in=ids).update(
+            status=Task.Status.RUNNING,
+            lease=lease,
+            leased_until=now + datetime.timedelta(seconds=lease_seconds),
+            attempts=F("attempts") + 1,
+            updated_at=now,
+        )
+        return list(self.filter(lease=lease).order_by("id"))
+
+    def complete(self, task):
+        return self.filter(pk=task.pk, lease=task.lease).update(
+            status=Task.Status.DONE, lease=None, leased_until=None, error="", updated_at=timezone.now()
+        )
+
+    def fail(self, task, error, max_attempts, retry_delay):
+        now = timezone.now()
+        if task.attempts >= max_attempts:
+            changes = {"status": Task.Status.FAILED}
+        else:
+            delay = retry_delay * 2 ** (task.attempts - 1)
+            changes = {"status": Task.Status.PENDING, "available_at": now + datetime.timedelta(seconds=delay)}
+        return self.filter(pk=task.pk, lease=task.lease).update(
+            lease=None, leased_until=None, error=error, updated_at=now, **changes
+        )
+
+    def retry_failed(self):
+        return self.filter(status=Task.Status.FAILED).update(
+            status=Task.Status.PENDING, attempts=0, available_at=timezone.now(), updated_at=timezone.now()
+        )
+
+
+class Task(models.Model):
+    class Status(models.TextChoices):
+        PENDING = "pending", "В очереди"
+        RUNNING = "running", "Выполняется"
+        DONE = "done", "Выполнена"
+        FAILED = "failed", "Ошибка"
+
+    name = models.CharField(max_length=64, verbose_name="Задача")
+    key = models.CharField(max_length=255, unique=True, null=True, blank=True, verbose_name="Ключ идемпотентности")
+    payload = models.JSONField(default=dict, blank=True, verbose_name="Параметры")
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.PENDING, verbose_name="Статус")
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Попыток")
+    available_at = models.DateTimeField(default=timezone.now, verbose_name="Не раньше")
+    lease = models.UUIDField(null=True, blank=True, verbose_name="Аренда")
+    leased_until = models.DateTimeField(null=True, blank=True, verbose_name="Аренда до")
+    error = models.TextField(blank=True, verbose_name="Последняя ошибка")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = TaskQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Фоновая задача"
+        verbose_name_plural = "Фоновые задачи"
+        indexes = [
+            models.Index(fields=["status", "available_at"], name="task_queue"),
+            models.Index(fields=["lease"], name="task_lease"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
@@ -0,0 +1,108 @@
+import datetime
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from core.models import ads as ad_models
+from core.models import changes as change_models
+
+Action = change_models.ChangeEvent.Action
+ENTITIES = {
+    ad_models.Campaign: change_models.ChangeEvent.Entity.CAMPAIGN,
+    ad_models.Advertisement: change_models.ChangeEvent.Entity.ADVERTISEMENT,
+    ad_models.Banner: change_models.ChangeEvent.Entity.BANNER,
+}
+
+
+def entry(instance, action, origin=None):
+    """
+    Запись журнала для объекта: (сущность, действие, id, id кампании, id объявления).
+    Кампания баннера берётся из загруженного объявления или из origin каскадного удаления,
+    иначе остаётся None и находится в write одним запросом на пачку.
+    """
+    entity = ENTITIES[type(instance)]
+    if isinstance(instance, ad_models.Campaign):
+        return entity, action, instance.pk, instance.pk, None
+    if isinstance(instance, ad_models.Advertisement):
+        return entity, action, instance.pk, instance.campaign_id, instance.pk
+    if isinstance(origin, ad_models.Campaign):
+        campaign_id = origin.pk
+    elif isinstance(origin, ad_models.Advertisement) and origin.pk == instance.advertisement_id:
+        campaign_id = origin.campaign_id
+    elif ad_models.Banner.advertisement.is_cached(instance):
+        campaign_id = instance.advertisement.campaign_id
+    else:
+        campaign_id = None
+    return entity, action, instance.pk, campaign_id, instance.advertisement_id
+
+
+def save_action(instance, created):
+    if created:
+        return Action.CREATED
+    # Прежний статус баннера запоминается перед сохранением (pre_save или BulkMixin.before_update)
+    if instance.__dict__.pop("_previous_active", None) and not getattr(instance, "is_active", True):
+        return Action.ARCHIVED
+    return Action.UPDATED
+
+
+def write(entries):
+    entries = list(entries)
+    if not entries:
+        return []
+    # Удалённые в той же пачке объявления уже не найти в базе, их кампании известны из их же записей
+    campaigns = {
+        advertisement_id: campaign_id
+        for entity, _, _, campaign_id, advertisement_id in entries
+        if entity == change_models.ChangeEvent.Entity.ADVERTISEMENT
+    }
+    unknown = {advertisement_id for *_, campaign_id, advertisement_id in entries if campaign_id is None} - campaigns.keys()
+    if unknown:
+        campaigns.update(ad_models.Advertisement.objects.filter(id__in=unknown).values_list("id", "campaign_id"))
+    return change_models.ChangeEvent.objects.record(
+        (entity, action, object_id, campaign_id if campaign_id is not None else campaigns[advertisement_id])
+        for entity, action, object_id, campaign_id, advertisement_id in entries
+    )
+
+
+def head():
+    """Позиция последнего изменения. Потребитель, строящий состояние с нуля, запоминает её до чтения таблиц."""
+    return change_models.ChangeEvent.objects.aggregate(position=Max("id"))["position"] or 0
+
+
+def read(after, limit=1000):
+    """
+    Изменения после позиции after по порядку. id выдаются при вставке, а видны после коммита, поэтому
+    пропуск в id может быть ещё не закоммиченной транзакцией: на свежем пропуске чтение останавливается
+    и продолжится со следующего вызова. Пропуск старше OUTBOX_SETTLE_SECONDS считается откатом.
+    """
+    events = change_models.ChangeEvent.objects.filter(id__gt=after).order_by("id")[:limit]
+    horizon = timezone.now() - datetime.timedelta(seconds=settings.OUTBOX_SETTLE_SECONDS)
+    ready, previous = [], after
+    for event in events:
+        if event.id != previous + 1 and event.created_at > horizon:
+            break
+        ready.append(event)
+        previous = event.id
+    return ready
+
+
+@contextmanager
+def consume(name, limit=1000, start=0):
+    """
+    Следующая пачка изменений потребителя name. Позиция сдвигается, только если блок завершился без ошибки,
+    в той же транзакции, что и записи самого потребителя, поэтому пачка обрабатывается ровно один раз
+    для изменений в базе и хотя бы один раз для внешних кешей. Потребители с одним именем ждут друг друга.
+    start — позиция нового потребителя, обычно head(), снятая перед построением его состояния с нуля.
+    """
+    with transaction.atomic():
+        consumer, _ = change_models.ChangeConsumer.objects.select_for_update().get_or_create(
+            name=name, defaults={"position": start}
+        )
+        events = read(consumer.position, limit)
+        yield events
+        if events:
+            consumer.position = events[-1].id
+            consumer.save(update_fields=["position", "updated_at"])
@@ -0,0 +1,83 @@
+import io
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from PIL import Image
+
+from core import delivery, generations
+from core.imagesize import is_image
+from core.models import ads as ad_models
+from core.models import assets as asset_models
+from core.models import tasks as task_models
+from core.storage import banner_storage
+
+TASK_NAME = "banner_renditions"
+# Валидаторы баннера допускают 20000x20000, это больше встроенной защиты Pillow от decompression bomb
+MAX_PIXELS = 20000 * 20000
+
+
+def _enqueue(task_name, names):
+    task_models.Task.objects.enqueue(task_name, ((f"{task_name}:{name}", {"source": name}) for name in sorted(names)))
+
+
+def schedule(names):
+    """Ставит в очередь обработку новых файлов: уменьшенные копии изображений и сжатые варианты HTML."""
+    names = {name for name in names if name}
+    images = {name for name in names if is_image(name)}
+    if images:
+        images -= set(asset_models.BannerRendition.objects.filter(source__in=images).values_list("source", flat=True))
+        _enqueue(TASK_NAME, images)
+    _enqueue(delivery.PRECOMPRESS_TASK, {name for name in names if delivery.is_compressible(name)})
+
+
+def render(payload):
+    """Выполняется в процессе пула: строит копии в рамках BANNER_RENDITIONS и сохраняет их рядом с оригиналом."""
+    Image.MAX_IMAGE_PIXELS = MAX_PIXELS
+    storage = banner_storage()
+    source = payload["source"]
+    renditions = []
+    with storage.open(source) as file:
+        for kind, box in settings.BANNER_RENDITIONS.items():
+            file.seek(0)
+            with Image.open(file) as image:
+                original_size = image.size
+                output_format = "JPEG" if image.format == "JPEG" else "PNG"
+                # thumbnail у JPEG декодирует сразу в уменьшенном масштабе, полный кадр в память не попадает
+                image.thumbnail(box)
+                if image.size == original_size:
+                    renditions.append({"kind": kind, "name": source, "width": image.width, "height": image.height})
+                    continue
+                if output_format == "JPEG" and image.mode not in ("RGB", "L"):
+                    image = image.convert("RGB")
+                buffer = io.BytesIO()
+                image.save(buffer, output_format, optimize=True)
+            name = storage.save(f"{kind}.{output_format.lower()}", ContentFile(buffer.getvalue()))
+            renditions.append({"kind": kind, "name": name, "width": image.width, "height": image.height})
+    return renditions
+
+
+def save(payload, renditions):
+    source = payload["source"]
+    asset_models.BannerRendition.objects.bulk_create(
+        [asset_models.BannerRendition(source=source, **rendition) for rendition in renditions],
+        update_conflicts=True,
+        unique_fields=["source", "kind"],
+        update_fields=["name", "width", "height"],
+    )
+    # Ссылки на копии появляются в ответах API без правки баннеров, поэтому ETag и кеш страниц сдвигаются вручную
+    banners = ad_models.Banner.objects.filter(file=source)
+    banners.update(updated_at=timezone.now())
+    generations.bump(*banners.values_list("advertisement__campaign__user_id", flat=True).distinct())
+
+
+def url(name, request=None):
+    if not name:
+        return None
+    path = banner_storage().url(name)
+    return request.build_absolute_uri(path) if request is not None else path
+
+
+def urls(renditions, request=None):
+    """{вид: url} по {вид: BannerRendition} из BannerRendition.objects.for_sources."""
+    return {kind: url(rendition.name, request) for kind, rendition in renditions.items()}
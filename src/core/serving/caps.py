@@ -0,0 +1,114 @@
+import abc
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils.module_loading import import_string
+
+from core.models import events as event_models
+
+
+class CounterBackend(abc.ABC):
+    @abc.abstractmethod
+    def try_increment(self, campaign_id, day, cap):
+        """Атомарно увеличивает счётчик показов, если лимит ещё не достигнут."""
+
+
+class LocalCounterBackend(CounterBackend):
+    """Счётчики в памяти процесса. Подходит только для одного воркера и тестов."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def try_increment(self, campaign_id, day, cap):
+        with self._lock:
+            count = self._counts.get((campaign_id, day), 0)
+            if count >= cap:
+                return False
+            self._counts[(campaign_id, day)] = count + 1
+            return True
+
+
+class CacheCounterBackend(CounterBackend):
+    """Общие счётчики на атомарном incr кеша Django (memcached, redis)."""
+
+    timeout = 2 * 24 * 60 * 60
+
+    def __init__(self, alias="default"):
+        self.cache = caches[alias]
+
+    def try_increment(self, campaign_id, day, cap):
+        key = f"impressions:{campaign_id}:{day.isoformat()}"
+        try:
+            count = self.cache.incr(key)
+        except ValueError:
+            self.cache.add(key, 0, self.timeout)
+            count = self.cache.incr(key)
+        if count > cap:
+            # Откатываем перебор, чтобы счётчик совпадал с числом показов при повышении лимита
+            self.cache.decr(key)
+            return False
+        return True
+
+
+class DatabaseCounterBackend(CounterBackend):
+    """
+    Общие счётчики в Postgres: один условный UPDATE без явных блокировок,
+    строка блокируется только на время самого запроса.
+    """
+
+    def try_increment(self, campaign_id, day, cap):
+        counters = event_models.DailyImpressionCounter.objects.filter(campaign_id=campaign_id, day=day)
+        if counters.filter(count__lt=cap).update(count=F("count") + 1):
+            return True
+        if cap < 1 or counters.exists():
+            return False
+        try:
+            with transaction.atomic():
+                event_models.DailyImpressionCounter.objects.create(campaign_id=campaign_id, day=day, count=1)
+            return True
+        except IntegrityError:
+            return self.try_increment(campaign_id, day, cap)
+
+
+class ImpressionCapper:
+    """
+    Дневной лимит показов на общем счётчике бэкенда. Отказ счётчика запоминается в процессе вместе
+    с лимитом: за день счётчик только растёт, поэтому при том же лимите кампания остаётся исчерпанной
+    во всех воркерах, а новый лимит из индекса снова идёт к общему счётчику без сброса пометок.
+    """
+
+    def __init__(self, backend=None):
+        self._backend = backend
+        self._day = None
+        self._exhausted = set()
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = import_string(settings.IMPRESSION_COUNTER_BACKEND)()
+        return self._backend
+
+    def reset(self, backend=None):
+        self._backend = backend
+        self._day = None
+        self._exhausted = set()
+
+    def try_serve(self, campaign_id, day, cap):
+        if cap is None:
+            return True
+        if day != self._day:
+            self._day, self._exhausted = day, set()
+        # Исчерпанные при этом лимите кампании отсекаются локально, без обращения к счётчику
+        if (campaign_id, cap) in self._exhausted:
+            return False
+        if self.backend.try_increment(campaign_id, day, cap):
+            return True
+        self._exhausted.add((campaign_id, cap))
+        return False
+
+
+impression_capper = ImpressionCapper()
@@ -0,0 +1,242 @@
+import datetime
+import logging
+import random
+import threading
+import time
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from core import outbox
+from core.models import ads as ad_models
+from core.serving.caps import impression_capper
+from core.serving.inverted_index import TargetingIndex
+from core.serving.pacing import pacer
+from core.serving.snapshot import SnapshotReader
+from core.storage import banner_storage
+from core.targeting import compile_targeting, Matcher
+
+logger = logging.getLogger(__name__)
+
+
+class Candidate(NamedTuple):
+    campaign_id: int
+    start_date: datetime.date
+    end_date: datetime.date
+    strategy: str
+    max_impressions_per_day: int | None
+    targeting: Matcher
+    banner: dict
+
+    def is_running(self, now):
+        return self.start_date <= now.date() <= self.end_date
+
+    def admit(self, now):
+        if self.strategy == ad_models.Campaign.SpendingStrategy.EVENLY:
+            if not pacer.allow(self.campaign_id, now):
+                return False
+            pacer.record(self.campaign_id)
+            return True
+        return impression_capper.try_serve(self.campaign_id, now.date(), self.max_impressions_per_day)
+
+
+class DecisionIndex:
+    """
+    Индекс активных баннеров в памяти процесса: (место, ширина, высота) -> кампания -> кандидаты,
+    плюс инвертированный индекс таргетинга по кампаниям. Изменения моделей после коммита помечают
+    кампанию как устаревшую, и она перечитывается из базы при следующем решении. Изменения других
+    процессов индекс узнаёт из журнала изменений (core.outbox), который дочитывает не чаще раза
+    в DECISION_INDEX_POLL_SECONDS, поэтому в установившемся режиме запросов к базе почти нет.
+
+    Если задан SERVING_SNAPSHOT_PATH, индекс строится из снимка build_serving_snapshot и целиком
+    подменяется при смене его версии; к базе индекс обращается, только пока снимок не опубликован.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._buckets = {}
+            self._keys_by_campaign = {}
+            self._targeting = TargetingIndex()
+            self._dirty = set()
+            self._loaded = False
+            self._snapshots = SnapshotReader(settings.SERVING_SNAPSHOT_PATH) if settings.SERVING_SNAPSHOT_PATH else None
+            self._snapshot_version = None
+            self._position = 0
+            self._polled_at = 0.0
+
+    def invalidate(self, campaign_id):
+        # До коммита индекс перечитал бы старые данные и снял пометку
+        transaction.on_commit(lambda: self._dirty.add(campaign_id))
+
+    def decide(self, place, width, height, attributes, now=None):
+        self.sync()
+        now = now or timezone.localtime()
+        bucket = self._buckets.get((place, width, height))
+        if not bucket:
+            return None
+        campaign_ids = self._targeting.candidates(attributes, now.hour) & bucket.keys()
+        candidates = [c for campaign_id in campaign_ids for c in bucket[campaign_id] if c.is_running(now)]
+        while candidates:
+            candidate = candidates.pop(random.randrange(len(candidates)))
+            if candidate.admit(now):
+                return candidate.banner
+        return None
+
+    def sync(self):
+        snapshot = self._snapshots and self._snapshots.get()
+        if snapshot is not None:
+            self._sync_snapshot(snapshot)
+            return
+        self._poll_changes()
+        if self._loaded and not self._dirty:
+            return
+        with self._lock:
+            if not self._loaded:
+                self._dirty = set()
+                # Позиция журнала снимается до чтения таблиц: изменения во время загрузки перечитаются ещё раз
+                self._position = outbox.head()
+                self._polled_at = time.monotonic()
+                self._replace_campaigns(None, self._load())
+                self._loaded = True
+            elif self._dirty:
+                dirty, self._dirty = self._dirty, set()
+                self._replace_campaigns(dirty, self._load(campaign_ids=dirty))
+
+    def _poll_changes(self, limit=1000):
+        if not self._loaded or time.monotonic() - self._polled_at < settings.DECISION_INDEX_POLL_SECONDS:
+            return
+        with self._lock:
+            self._polled_at = time.monotonic()
+            while True:
+                events = outbox.read(self._position, limit)
+                if events:
+                    self._dirty.update(event.campaign_id for event in events)
+                    self._position = events[-1].id
+                if len(events) < limit:
+                    break
+
+    def _sync_snapshot(self, snapshot):
+        if snapshot.version == self._snapshot_version:
+            return
+        with self._lock:
+            if snapshot.version == self._snapshot_version:
+                return
+            # Новый индекс собирается в стороне, а структуры подменяются присваиванием: decide видит старый или новый
+            staged = DecisionIndex()
+            staged._replace_campaigns(None, self._from_snapshot(snapshot))
+            self._buckets, self._keys_by_campaign, self._targeting = (
+                staged._buckets,
+                staged._keys_by_campaign,
+                staged._targeting,
+            )
+            # Свежесть снимка обеспечивает его сборщик, пометки сигналов здесь не нужны
+            self._dirty = set()
+            self._loaded = True
+            self._snapshot_version = snapshot.version
+
+    def _from_snapshot(self, snapshot):
+        for campaign in snapshot.campaigns:
+            targeting = compile_targeting(campaign["targeting"])
+            start_date = datetime.date.fromisoformat(campaign["start_date"])
+            end_date = datetime.date.fromisoformat(campaign["end_date"])
+            for banner in campaign["banners"]:
+                banner = dict(banner, campaign=campaign["id"])
+                key = (banner.pop("place"), banner["width"], banner["height"])
+                yield key, Candidate(
+                    campaign_id=campaign["id"],
+                    start_date=start_date,
+                    end_date=end_date,
+                    strategy=campaign["strategy"],
+                    max_impressions_per_day=campaign["max_impressions_per_day"],
+                    targeting=targeting,
+                    banner=banner,
+                )
+
+    def _load(self, campaign_ids=None):
+        storage = banner_storage()
+        banners = ad_models.Banner.objects.filter(is_active=True, advertisement__campaign__end_date__gte=timezone.localdate())
+        if campaign_ids is not None:
+            banners = banners.filter(advertisement__campaign_id__in=campaign_ids)
+        rows = banners.values(
+            "id",
+            "uid",
+            "width",
+            "height",
+            "file",
+            "advertisement_id",
+            "advertisement__place",
+            "advertisement__url",
+            "advertisement__campaign_id",
+            "advertisement__campaign__start_date",
+            "advertisement__campaign__end_date",
+            "advertisement__campaign__strategy",
+            "advertisement__campaign__max_impressions_per_day",
+            "advertisement__campaign__targeting",
+        )
+        skipped = set()
+        for row in rows.iterator():
+            try:
+                targeting = compile_targeting(row["advertisement__campaign__targeting"])
+            except ValidationError as error:
+                campaign_id = row["advertisement__campaign_id"]
+                if campaign_id not in skipped:
+                    skipped.add(campaign_id)
+                    # Таргетинг, записанный до проверки в API; исправляется командой check_targeting
+                    logger.warning("Кампания %s пропущена: некорректный таргетинг: %s", campaign_id, "; ".join(error.messages))
+                continue
+            if not targeting.allows_placement(row["advertisement__place"]):
+                continue
+            key = (row["advertisement__place"], row["width"], row["height"])
+            yield key, Candidate(
+                campaign_id=row["advertisement__campaign_id"],
+                start_date=row["advertisement__campaign__start_date"],
+                end_date=row["advertisement__campaign__end_date"],
+                strategy=row["advertisement__campaign__strategy"],
+                max_impressions_per_day=row["advertisement__campaign__max_impressions_per_day"],
+                targeting=targeting,
+                banner={
+                    "id": row["id"],
+                    "uid": row["uid"],
+                    "width": row["width"],
+                    "height": row["height"],
+                    "file": storage.url(row["file"]),
+                    "url": row["advertisement__url"],
+                    "advertisement": row["advertisement_id"],
+                    "campaign": row["advertisement__campaign_id"],
+                },
+            )
+
+    def _replace_campaigns(self, campaign_ids, entries):
+        fresh = {}
+        for key, candidate in entries:
+            fresh.setdefault(key, {}).setdefault(candidate.campaign_id, []).append(candidate)
+
+        # Правятся копии, а подменяются все три структуры одним присваиванием: decide видит старый индекс или новый
+        buckets = dict(self._buckets)
+        keys_by_campaign = {campaign_id: set(keys) for campaign_id, keys in self._keys_by_campaign.items()}
+        targeting = self._targeting.copy()
+        touched = set(fresh)
+        for campaign_id in campaign_ids or ():
+            touched |= keys_by_campaign.pop(campaign_id, set())
+            targeting.remove(campaign_id)
+        for key in touched:
+            bucket = {cid: c for cid, c in buckets.get(key, {}).items() if cid not in (campaign_ids or ())}
+            for campaign_id, candidates in fresh.get(key, {}).items():
+                bucket[campaign_id] = tuple(candidates)
+                keys_by_campaign.setdefault(campaign_id, set()).add(key)
+                targeting.add(campaign_id, candidates[0].targeting)
+            if bucket:
+                buckets[key] = bucket
+            else:
+                buckets.pop(key, None)
+        self._buckets, self._keys_by_campaign, self._targeting = buckets, keys_by_campaign, targeting
+
+
+decision_index = DecisionIndex()
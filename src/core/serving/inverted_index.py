@@ -0,0 +1,85 @@
+from core.targeting import PLACEMENT_BITS, STRING_DIMENSIONS
+
+
+class TargetingIndex:
+    """
+    Инвертированный индекс таргетинга: значение параметра -> кампании, которые его принимают.
+    Кандидаты находятся пересечением списков, а не проверкой каждой кампании.
+    """
+
+    def __init__(self):
+        self._matchers = {}
+        self._open = {dimension: set() for dimension in STRING_DIMENSIONS}
+        self._include = {dimension: {} for dimension in STRING_DIMENSIONS}
+        self._exclude = {dimension: {} for dimension in STRING_DIMENSIONS}
+        self._hours = [set() for _ in range(24)]
+        self._placements = {place: set() for place in PLACEMENT_BITS}
+
+    def __len__(self):
+        return len(self._matchers)
+
+    def copy(self):
+        """Независимая копия списков: правится в стороне, пока decide читает оригинал."""
+        clone = TargetingIndex.__new__(TargetingIndex)
+        clone._matchers = dict(self._matchers)
+        clone._open = {dimension: set(campaigns) for dimension, campaigns in self._open.items()}
+        clone._include = {
+            dimension: {value: set(campaigns) for value, campaigns in postings.items()}
+            for dimension, postings in self._include.items()
+        }
+        clone._exclude = {
+            dimension: {value: set(campaigns) for value, campaigns in postings.items()}
+            for dimension, postings in self._exclude.items()
+        }
+        clone._hours = [set(campaigns) for campaigns in self._hours]
+        clone._placements = {place: set(campaigns) for place, campaigns in self._placements.items()}
+        return clone
+
+    def add(self, campaign_id, matcher):
+        self.remove(campaign_id)
+        self._matchers[campaign_id] = matcher
+        constrained = set()
+        for dimension, include, exclude in matcher.rules:
+            if include is not None:
+                constrained.add(dimension)
+                for value in include:
+                    self._include[dimension].setdefault(value, set()).add(campaign_id)
+            for value in exclude:
+                self._exclude[dimension].setdefault(value, set()).add(campaign_id)
+        for dimension in STRING_DIMENSIONS:
+            if dimension not in constrained:
+                self._open[dimension].add(campaign_id)
+        for hour in range(24):
+            if matcher.hours >> hour & 1:
+                self._hours[hour].add(campaign_id)
+        for place, bit in PLACEMENT_BITS.items():
+            if matcher.placements & bit:
+                self._placements[place].add(campaign_id)
+
+    def remove(self, campaign_id):
+        matcher = self._matchers.pop(campaign_id, None)
+        if matcher is None:
+            return
+        for dimension, include, exclude in matcher.rules:
+            for postings, values in ((self._include[dimension], include or ()), (self._exclude[dimension], exclude)):
+                for value in values:
+                    postings[value].discard(campaign_id)
+                    if not postings[value]:
+                        del postings[value]
+        for postings in (*self._open.values(), *self._hours, *self._placements.values()):
+            postings.discard(campaign_id)
+
+    def candidates(self, attributes, hour, place=None):
+        result = self._hours[hour]
+        if place is not None:
+            result = result & self._placements.get(place, set())
+        for dimension in STRING_DIMENSIONS:
+            value = attributes.get(dimension)
+            accepted = self._include[dimension].get(value)
+            result = (result & self._open[dimension]) | (result & accepted if accepted else set())
+            excluded = self._exclude[dimension].get(value)
+            if excluded:
+                result = result - excluded
+            if not result:
+                break
+        return result
@@ -0,0 +1,259 @@
+import abc
+import bisect
+import datetime
+import random
+import threading
+import time
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Sum
+from django.db.models.functions import ExtractHour
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from core.models import ads as ad_models
+from core.models import events as event_models
+
+UNIFORM_CURVE = tuple((hour + 1) / 24 for hour in range(24))
+
+
+class PacingPlan(NamedTuple):
+    daily_budget: float
+    impression_cost: float
+    spent_today: float
+
+
+def curve_from_profile(profile):
+    """Накопленная доля дневного бюджета к концу каждого часа по профилю трафика."""
+    total = sum(profile)
+    if not total:
+        return UNIFORM_CURVE
+    cumulative, curve = 0, []
+    for weight in profile:
+        cumulative += weight
+        curve.append(cumulative / total)
+    return tuple(curve)
+
+
+def target_fraction(curve, now):
+    hour = now.hour
+    before = curve[hour - 1] if hour else 0.0
+    within = (now.minute * 60 + now.second) / 3600
+    return before + (curve[hour] - before) * within
+
+
+def load_traffic_curve(today, days=7):
+    rows = (
+        event_models.HourlyDeliveryRollup.objects.filter(
+            bucket__date__gte=today - datetime.timedelta(days=days), bucket__date__lt=today
+        )
+        .annotate(hour=ExtractHour("bucket"))
+        .values("hour")
+        .annotate(impressions=Sum("impressions"))
+        .order_by()
+    )
+    profile = [0] * 24
+    for row in rows:
+        profile[row["hour"]] = row["impressions"]
+    return curve_from_profile(profile)
+
+
+def load_plans(today):
+    campaigns = ad_models.Campaign.objects.filter(
+        strategy=ad_models.Campaign.SpendingStrategy.EVENLY, start_date__lte=today, end_date__gte=today
+    ).values_list("id", "budget", "end_date")
+    campaigns = list(campaigns)
+    ids = [campaign_id for campaign_id, _, _ in campaigns]
+
+    history = {
+        row["campaign_id"]: row
+        for row in event_models.DailyDeliveryRollup.objects.filter(campaign_id__in=ids, bucket__lt=today)
+        .values("campaign_id")
+        .annotate(spend=Sum("spend"), impressions=Sum("impressions"))
+        .order_by()
+    }
+    spent_today = dict(
+        event_models.HourlyDeliveryRollup.objects.filter(campaign_id__in=ids, bucket__date=today)
+        .values("campaign_id")
+        .annotate(spend=Sum("spend"))
+        .values_list("campaign_id", "spend")
+        .order_by()
+    )
+
+    default_cost = float(settings.PACING_IMPRESSION_COST)
+    plans = {}
+    for campaign_id, budget, end_date in campaigns:
+        spent = history.get(campaign_id, {"spend": 0, "impressions": 0})
+        remaining_days = (end_date - today).days + 1
+        impression_cost = float(spent["spend"]) / spent["impressions"] if spent["impressions"] else default_cost
+        plans[campaign_id] = PacingPlan(
+            daily_budget=max(float(budget) - float(spent["spend"] or 0), 0.0) / remaining_days,
+            impression_cost=impression_cost or default_cost,
+            spent_today=float(spent_today.get(campaign_id) or 0),
+        )
+    return plans
+
+
+class SpendCounter(abc.ABC):
+    """Расход кампаний за день с момента показа, до того как он попадёт в агрегаты."""
+
+    @abc.abstractmethod
+    def add(self, campaign_id, day, amount):
+        """Атомарно прибавляет amount к расходу кампании за день."""
+
+    @abc.abstractmethod
+    def get(self, campaign_id, day):
+        """Расход кампании за день."""
+
+
+class LocalSpendCounter(SpendCounter):
+    """Расход в памяти процесса. Подходит только для одного воркера, тестов и симуляции."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._spent = {}
+
+    def add(self, campaign_id, day, amount):
+        with self._lock:
+            self._spent[(campaign_id, day)] = self._spent.get((campaign_id, day), 0.0) + amount
+
+    def get(self, campaign_id, day):
+        return self._spent.get((campaign_id, day), 0.0)
+
+
+class CacheSpendCounter(SpendCounter):
+    """Общий для воркеров расход на атомарном incr кеша Django, в миллионных долях валюты."""
+
+    timeout = 2 * 24 * 60 * 60
+    units = 1_000_000
+
+    def __init__(self, alias="default"):
+        self.cache = caches[alias]
+
+    def _key(self, campaign_id, day):
+        return f"pacing-spend:{campaign_id}:{day.isoformat()}"
+
+    def add(self, campaign_id, day, amount):
+        key = self._key(campaign_id, day)
+        delta = round(amount * self.units)
+        try:
+            self.cache.incr(key, delta)
+        except ValueError:
+            self.cache.add(key, 0, self.timeout)
+            self.cache.incr(key, delta)
+
+    def get(self, campaign_id, day):
+        return self.cache.get(self._key(campaign_id, day), 0) / self.units
+
+
+class Pacer:
+    """
+    Равномерный расход бюджета: кампания, опередившая кривую пейсинга, получает показы
+    с вероятностью, падающей до нуля за один интервал перебора; отставшая — всегда.
+    Планы и кривая перечитываются из базы раз в refresh_interval секунд, поэтому изменённая
+    кампания начинает расходоваться по новому плану не позже чем через этот интервал.
+    Расход с момента показа общий для воркеров (PACING_SPEND_BACKEND).
+    """
+
+    refresh_interval = 60
+    interval_fraction = 5 / (24 * 60)
+
+    def __init__(self, loader=None, rng=random.random, counter=None):
+        self._loader = loader or (lambda today: (load_plans(today), load_traffic_curve(today)))
+        self._rng = rng
+        self._counter = counter
+        self._lock = threading.Lock()
+        self.reset()
+
+    @property
+    def counter(self):
+        if self._counter is None:
+            self._counter = import_string(settings.PACING_SPEND_BACKEND)()
+        return self._counter
+
+    def reset(self):
+        self._plans = {}
+        self._curve = UNIFORM_CURVE
+        self._day = None
+        self._refreshed_at = None
+
+    def refresh(self, now):
+        today = now.date()
+        plans, curve = self._loader(today)
+        with self._lock:
+            self._plans, self._curve, self._day = plans, curve, today
+            self._refreshed_at = time.monotonic()
+
+    def allow(self, campaign_id, now):
+        if self._refreshed_at is None or now.date() != self._day:
+            self.refresh(now)
+        elif time.monotonic() - self._refreshed_at > self.refresh_interval:
+            self.refresh(now)
+
+        plan = self._plans.get(campaign_id)
+        if plan is None:
+            return False
+        # Агрегаты отстают от показов, а счётчик пуст после вытеснения: берётся большая из оценок
+        spent = max(plan.spent_today, self.counter.get(campaign_id, self._day))
+        if spent + plan.impression_cost > plan.daily_budget:
+            return False
+
+        target = plan.daily_budget * target_fraction(self._curve, now)
+        if spent <= target:
+            return True
+        allowance = plan.daily_budget * self.interval_fraction
+        return self._rng() < 1 - (spent - target) / allowance
+
+    def record(self, campaign_id):
+        plan = self._plans.get(campaign_id)
+        if plan is not None:
+            self.counter.add(campaign_id, self._day, plan.impression_cost)
+
+
+pacer = Pacer()
+
+
+def simulate_day(campaigns=20, requests=200_000, oversupply=3.0, seed=0):
+    """
+    Прогоняет синтетические сутки трафика через Pacer без базы. Трафик распределён по
+    суточному профилю, бюджеты в oversupply раз меньше доступного трафика.
+    """
+    rng = random.Random(seed)
+    profile = [1 + 4 * max(0.0, 1 - abs(hour - 19) / 8) + 2 * max(0.0, 1 - abs(hour - 12) / 4) for hour in range(24)]
+    curve = curve_from_profile(profile)
+    impression_cost = 0.01
+    daily_budget = requests / campaigns * impression_cost / oversupply
+    plans = {
+        campaign_id: PacingPlan(daily_budget=daily_budget, impression_cost=impression_cost, spent_today=0.0)
+        for campaign_id in range(campaigns)
+    }
+    simulated = Pacer(loader=lambda today: (plans, curve), rng=rng.random, counter=LocalSpendCounter())
+    simulated.refresh_interval = float("inf")
+
+    day = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+    offsets = sorted(bisect.bisect(curve, rng.random()) * 3600 + rng.random() * 3600 for _ in range(requests))
+    hourly = [[0.0] * 24 for _ in range(campaigns)]
+    decision_time = 0.0
+    for offset in offsets:
+        now = day + datetime.timedelta(seconds=offset)
+        campaign_id = rng.randrange(campaigns)
+        started = time.perf_counter()
+        allowed = simulated.allow(campaign_id, now)
+        if allowed:
+            simulated.record(campaign_id)
+        decision_time += time.perf_counter() - started
+        if allowed:
+            hourly[campaign_id][now.hour] += impression_cost
+
+    targets = [daily_budget * (curve[hour] - (curve[hour - 1] if hour else 0)) for hour in range(24)]
+    deviations = [abs(spend - target) / target for spends in hourly for spend, target in zip(spends, targets) if target]
+    return {
+        "campaigns": campaigns,
+        "requests": requests,
+        "delivered_share": sum(map(sum, hourly)) / (daily_budget * campaigns),
+        "hourly_deviation_mean": sum(deviations) / len(deviations),
+        "hourly_deviation_max": max(deviations),
+        "decision_us": decision_time / requests * 1e6,
+    }
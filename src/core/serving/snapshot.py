@@ -0,0 +1,203 @@
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import NamedTuple
+
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+from core.models import ads as ad_models
+from core.storage import banner_storage
+from core.targeting import compile_targeting, validate_targeting
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"X5SNAP"
+FORMAT_VERSION = 1
+# Заголовок: сигнатура, версия формата, версия снимка, длина тела, sha256 тела; тело — компактный JSON
+HEADER = struct.Struct(">6sHQQ32s")
+
+
+class SnapshotError(Exception):
+    pass
+
+
+class Snapshot(NamedTuple):
+    # Версия — время публикации в наносекундах
+    version: int
+    campaigns: list
+
+
+def live_campaigns(today=None):
+    """
+    Кампании, которые показываются сегодня: даты включают сегодняшний день, есть активные баннеры,
+    таргетинг корректен и допускает место объявления. Пустой таргетинг означает показ без ограничений.
+    """
+    today = today or timezone.localdate()
+    rows = (
+        ad_models.Banner.objects.filter(
+            is_active=True,
+            advertisement__campaign__start_date__lte=today,
+            advertisement__campaign__end_date__gte=today,
+        )
+        .order_by("advertisement__campaign_id", "id")
+        .values(
+            "id",
+            "uid",
+            "width",
+            "height",
+            "file",
+            "advertisement_id",
+            "advertisement__place",
+            "advertisement__url",
+            "advertisement__campaign_id",
+            "advertisement__campaign__start_date",
+            "advertisement__campaign__end_date",
+            "advertisement__campaign__strategy",
+            "advertisement__campaign__max_impressions_per_day",
+            "advertisement__campaign__targeting",
+        )
+    )
+    storage = banner_storage()
+    campaigns = {}
+    for row in rows.iterator():
+        campaign_id = row["advertisement__campaign_id"]
+        if campaign_id not in campaigns:
+            try:
+                targeting = validate_targeting(row["advertisement__campaign__targeting"])
+            except ValidationError as error:
+                # Таргетинг, записанный до проверки в API; исправляется командой check_targeting
+                logger.warning("Кампания %s пропущена: некорректный таргетинг: %s", campaign_id, "; ".join(error.messages))
+                campaigns[campaign_id] = None
+                continue
+            campaigns[campaign_id] = {
+                "id": campaign_id,
+                "start_date": row["advertisement__campaign__start_date"].isoformat(),
+                "end_date": row["advertisement__campaign__end_date"].isoformat(),
+                "strategy": row["advertisement__campaign__strategy"],
+                "max_impressions_per_day": row["advertisement__campaign__max_impressions_per_day"],
+                "targeting": targeting,
+                "banners": [],
+            }
+        campaign = campaigns[campaign_id]
+        if campaign is None or not compile_targeting(campaign["targeting"]).allows_placement(row["advertisement__place"]):
+            continue
+        campaign["banners"].append(
+            {
+                "id": row["id"],
+                "uid": row["uid"],
+                "width": row["width"],
+                "height": row["height"],
+                "file": storage.url(row["file"]),
+                "url": row["advertisement__url"],
+                "advertisement": row["advertisement_id"],
+                "place": row["advertisement__place"],
+            }
+        )
+    return [campaign for campaign in campaigns.values() if campaign and campaign["banners"]]
+
+
+def _body(campaigns):
+    return json.dumps({"campaigns": list(campaigns)}, separators=(",", ":"), sort_keys=True).encode()
+
+
+def read_header(path):
+    with open(path, "rb") as file:
+        header = file.read(HEADER.size)
+    if len(header) < HEADER.size:
+        raise SnapshotError(f"{path}: обрезанный заголовок")
+    magic, format_version, version, length, digest = HEADER.unpack(header)
+    if magic != MAGIC or format_version != FORMAT_VERSION:
+        raise SnapshotError(f"{path}: неизвестный формат")
+    return version, length, digest
+
+
+def publish(path, campaigns):
+    """
+    Записывает снимок во временный файл рядом и атомарно подменяет им path. Возвращает новую версию
+    или None, если содержимое не изменилось. Читатели со старым mmap дочитывают прежний файл.
+    """
+    path = Path(path)
+    body = _body(campaigns)
+    digest = hashlib.sha256(body).digest()
+    try:
+        if read_header(path)[2] == digest:
+            return None
+    except (OSError, SnapshotError):
+        pass
+
+    version = time.time_ns()
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, version, len(body), digest)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(header)
+            file.write(body)
+            file.flush()
+            os.fsync(file.fileno())
+        os.chmod(temp, 0o644)
+        os.replace(temp, path)
+    except BaseException:
+        os.unlink(temp)
+        raise
+    return version
+
+
+def load(path):
+    """Читает снимок через mmap: страницы файла берутся из page cache и общие у всех процессов на машине."""
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        if len(mapped) < HEADER.size:
+            raise SnapshotError(f"{path}: обрезанный заголовок")
+        magic, format_version, version, length, digest = HEADER.unpack_from(mapped)
+        if magic != MAGIC or format_version != FORMAT_VERSION or len(mapped) != HEADER.size + length:
+            raise SnapshotError(f"{path}: неизвестный формат или обрезанный файл")
+        body = mapped[HEADER.size :]
+    if hashlib.sha256(body).digest() != digest:
+        raise SnapshotError(f"{path}: контрольная сумма не совпадает")
+    return Snapshot(version=version, campaigns=json.loads(body)["campaigns"])
+
+
+class SnapshotReader:
+    """
+    Следит за файлом снимка и перечитывает его при подмене. stat выполняется не чаще раза в check_interval
+    секунд, в остальное время get() не делает системных вызовов.
+    """
+
+    def __init__(self, path, check_interval=1.0):
+        self.path = Path(path)
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._identity = None
+        self._next_check = 0.0
+
+    def get(self):
+        if time.monotonic() >= self._next_check:
+            with self._lock:
+                if time.monotonic() >= self._next_check:
+                    self._refresh()
+                    self._next_check = time.monotonic() + self.check_interval
+        return self._snapshot
+
+    def _refresh(self):
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return
+        identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if identity == self._identity:
+            return
+        try:
+            self._snapshot = load(self.path)
+        except (OSError, ValueError, SnapshotError):
+            # Битый файл не заменяет рабочий снимок; следующая публикация сменит identity
+            pass
+        self._identity = identity
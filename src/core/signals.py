@@ -0,0 +1,260 @@
+import threading
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core import authz, generations, outbox, renditions
+from core.models import ads as ad_models
+from core.models import assets as asset_models
+from core.models import stats as stats_models
+from core.serving.index import decision_index
+
+_bulk = threading.local()
+
+
+def _deleted_directly(origin, model):
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return issubclass(origin_model, model)
+
+
+def _pending_changes():
+    return getattr(_bulk, "changes", None)
+
+
+@contextmanager
+def bulk_changes():
+    """
+    Откладывает пересчёт агрегатов и инвалидацию индекса до выхода из блока, чтобы массовые
+    операции обновляли каждое объявление и кампанию один раз, а не на каждую строку.
+    """
+    if _pending_changes() is not None:
+        yield _bulk.changes
+        return
+
+    changes = _bulk.changes = {"advertisements": set(), "campaigns": set(), "outbox": []}
+    try:
+        yield changes
+    finally:
+        _bulk.changes = None
+
+    outbox.write(changes["outbox"])
+
+    campaign_ids = set(changes["campaigns"])
+    campaign_ids.update(
+        ad_models.Advertisement.objects.filter(id__in=changes["advertisements"]).values_list("campaign_id", flat=True)
+    )
+    if changes["advertisements"]:
+        stats_models.AdvertisementStats.objects.refresh_many(changes["advertisements"])
+    if campaign_ids:
+        stats_models.CampaignStats.objects.refresh_many(campaign_ids)
+    for campaign_id in campaign_ids:
+        decision_index.invalidate(campaign_id)
+    generations.bump_campaigns(campaign_ids)
+
+
+def banner_changed(banner):
+    changes = _pending_changes()
+    if changes is not None:
+        changes["advertisements"].add(banner.advertisement_id)
+        return
+    advertisement = banner.advertisement
+    stats_models.AdvertisementStats.objects.refresh(advertisement.id)
+    stats_models.CampaignStats.objects.refresh(advertisement.campaign_id)
+    decision_index.invalidate(advertisement.campaign_id)
+    generations.bump_campaigns([advertisement.campaign_id])
+
+
+def advertisement_changed(advertisement):
+    changes = _pending_changes()
+    if changes is not None:
+        changes["advertisements"].add(advertisement.id)
+        return
+    stats_models.AdvertisementStats.objects.refresh(advertisement.id)
+    campaign_changed(advertisement.campaign_id)
+
+
+def campaign_changed(campaign_id):
+    changes = _pending_changes()
+    if changes is not None:
+        changes["campaigns"].add(campaign_id)
+        return
+    stats_models.CampaignStats.objects.refresh(campaign_id)
+    decision_index.invalidate(campaign_id)
+    generations.bump_campaigns([campaign_id])
+
+
+def record_change(instance, action, origin=None):
+    """Журнал изменений пишется в транзакции изменения; внутри bulk_changes — одной пачкой на выходе из блока."""
+    entry = outbox.entry(instance, action, origin)
+    changes = _pending_changes()
+    if changes is not None:
+        changes["outbox"].append(entry)
+        return
+    outbox.write([entry])
+
+
+@receiver(post_save, sender=ad_models.Campaign)
+def create_campaign_stats(sender, instance, created, **kwargs):
+    if created:
+        stats_models.CampaignStats.objects.create(campaign=instance)
+
+
+@receiver(post_save, sender=ad_models.Campaign)
+@receiver(post_delete, sender=ad_models.Campaign)
+def invalidate_decision_index_on_campaign_change(sender, instance, **kwargs):
+    decision_index.invalidate(instance.id)
+    generations.bump(instance.user_id)
+
+
+def _moved_from(instance, field):
+    """Прежний родитель, запомненный в pre_save, если объект перенесли к другому."""
+    previous = instance.__dict__.pop(f"_previous_{field}", None)
+    return previous if previous is not None and previous != getattr(instance, field) else None
+
+
+@receiver(post_save, sender=ad_models.Advertisement)
+def refresh_stats_on_advertisement_save(sender, instance, created, **kwargs):
+    if created:
+        stats_models.AdvertisementStats.objects.create(advertisement=instance)
+    campaign_changed(instance.campaign_id)
+    # Перенос в другую кампанию: прежняя теряет объявление в агрегатах, индексе и журнале изменений
+    previous_campaign_id = _moved_from(instance, "campaign_id")
+    if previous_campaign_id is not None:
+        campaign_changed(previous_campaign_id)
+        record_change(ad_models.Campaign(pk=previous_campaign_id), outbox.Action.UPDATED)
+
+
+@receiver(post_delete, sender=ad_models.Advertisement)
+def refresh_stats_on_advertisement_delete(sender, instance, origin=None, **kwargs):
+    # При каскадном удалении кампании её агрегаты удаляются вместе с ней
+    if _deleted_directly(origin, ad_models.Advertisement):
+        campaign_changed(instance.campaign_id)
+
+
+@receiver(post_save, sender=ad_models.Banner)
+def refresh_stats_on_banner_save(sender, instance, **kwargs):
+    banner_changed(instance)
+    # Перенос в другое объявление: прежнее (и его кампания) теряет баннер
+    previous_advertisement_id = _moved_from(instance, "advertisement_id")
+    if previous_advertisement_id is not None:
+        previous = ad_models.Advertisement.objects.filter(pk=previous_advertisement_id).only("id", "campaign_id").first()
+        if previous is not None:
+            advertisement_changed(previous)
+            record_change(previous, outbox.Action.UPDATED)
+
+
+@receiver(post_delete, sender=ad_models.Banner)
+def refresh_stats_on_banner_delete(sender, instance, origin=None, **kwargs):
+    if _deleted_directly(origin, ad_models.Banner):
+        banner_changed(instance)
+
+
+# Подключены после пересчёта агрегатов: объявление баннера к этому моменту уже загружено
+@receiver(post_save, sender=ad_models.Campaign)
+@receiver(post_save, sender=ad_models.Advertisement)
+@receiver(post_save, sender=ad_models.Banner)
+def record_saved_change(sender, instance, created, **kwargs):
+    record_change(instance, outbox.save_action(instance, created))
+
+
+@receiver(post_delete, sender=ad_models.Campaign)
+@receiver(post_delete, sender=ad_models.Advertisement)
+@receiver(post_delete, sender=ad_models.Banner)
+def record_deleted_change(sender, instance, origin=None, **kwargs):
+    record_change(instance, outbox.Action.DELETED, origin)
+
+
+def _previous_values(instance, *fields):
+    """Прежние значения полей из состояния, загруженного с объектом; строка перечитывается, только если их там нет."""
+    if instance._state.adding or instance.pk is None:
+        return None
+    loaded = getattr(instance, "_loaded_values", {})
+    if all(field in loaded for field in fields):
+        return tuple(loaded[field] for field in fields)
+    return type(instance).objects.filter(pk=instance.pk).values_list(*fields).first()
+
+
+def _previous_value(instance, field):
+    previous = _previous_values(instance, field)
+    return previous[0] if previous else None
+
+
+def _invalidate_ownership_on_commit(*user_ids):
+    # До коммита другой запрос успел бы закешировать старое владение под уже сдвинутым поколением
+    def invalidate():
+        authz.invalidate_ownership(*user_ids)
+        generations.bump(*user_ids)
+
+    transaction.on_commit(invalidate)
+
+
+@receiver(pre_save, sender=ad_models.Campaign)
+def invalidate_ownership_on_campaign_transfer(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and "user" not in update_fields:
+        return
+    previous_user_id = _previous_value(instance, "user_id")
+    if previous_user_id is not None and previous_user_id != instance.user_id:
+        _invalidate_ownership_on_commit(previous_user_id, instance.user_id)
+
+
+@receiver(pre_save, sender=ad_models.Advertisement)
+def invalidate_ownership_on_advertisement_move(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and "campaign" not in update_fields:
+        return
+    # Прежняя кампания нужна и post_save, чтобы пересчитать её после переноса объявления
+    previous_campaign_id = instance._previous_campaign_id = _previous_value(instance, "campaign_id")
+    if previous_campaign_id is not None and previous_campaign_id != instance.campaign_id:
+        user_ids = ad_models.Campaign.objects.filter(id__in=[previous_campaign_id, instance.campaign_id]).values_list(
+            "user_id", flat=True
+        )
+        _invalidate_ownership_on_commit(*user_ids)
+
+
+@receiver(post_delete, sender=ad_models.Campaign)
+def invalidate_ownership_on_campaign_delete(sender, instance, **kwargs):
+    user_id = instance.user_id
+    transaction.on_commit(lambda: authz.invalidate_ownership(user_id))
+
+
+@receiver(m2m_changed, sender=get_user_model().groups.through)
+@receiver(m2m_changed, sender=get_user_model().user_permissions.through)
+@receiver(m2m_changed, sender=Group.permissions.through)
+def invalidate_permissions_on_change(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        authz.invalidate_permissions()
+
+
+@receiver(post_delete, sender=Group)
+def invalidate_permissions_on_group_delete(sender, **kwargs):
+    authz.invalidate_permissions()
+
+
+@receiver(pre_save, sender=ad_models.Banner)
+def remember_previous_banner_state(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or {"file", "is_active", "advertisement"} & set(update_fields):
+        # Прежний файл нужен для подсчёта ссылок, прежний статус — чтобы отличить архивирование от изменения,
+        # прежнее объявление — чтобы пересчитать его после переноса баннера
+        instance._previous_file, instance._previous_active, instance._previous_advertisement_id = _previous_values(
+            instance, "file", "is_active", "advertisement_id"
+        ) or (None, None, None)
+
+
+@receiver(post_save, sender=ad_models.Banner)
+def count_banner_blob_references(sender, instance, created, update_fields=None, **kwargs):
+    if not created and update_fields is not None and "file" not in update_fields:
+        return
+    previous = instance.__dict__.pop("_previous_file", None)
+    if created or previous != instance.file.name:
+        asset_models.BannerBlob.objects.acquire([instance.file.name])
+        asset_models.BannerBlob.objects.release([previous])
+        renditions.schedule([instance.file.name])
+
+
+@receiver(post_delete, sender=ad_models.Banner)
+def release_banner_blob(sender, instance, **kwargs):
+    asset_models.BannerBlob.objects.release([instance.file.name])
@@ -0,0 +1,51 @@
+import hashlib
+import posixpath
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, storages
+
+
+class ContentAddressedMixin:
+    """
+    Имя файла определяется sha256 содержимого: одинаковые креативы хранятся один раз.
+    Хеш считается потоково по чанкам, повторная загрузка существующего файла ничего не пишет.
+    """
+
+    blob_prefix = "banners/blobs"
+    chunk_size = 64 * 1024
+
+    def content_name(self, name, content):
+        digest = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks(self.chunk_size):
+            digest.update(chunk)
+        content.seek(0)
+        digest = digest.hexdigest()
+        ext = posixpath.splitext(name)[1].lower()
+        return f"{self.blob_prefix}/{digest[:2]}/{digest[2:4]}/{digest}{ext}"
+
+    def save(self, name, content, max_length=None):
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        name = self.content_name(name, content)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length=max_length)
+
+    def save_derived(self, name, content):
+        """Сохраняет производный файл (например, сжатый вариант) под заданным именем, без пересчёта по содержимому."""
+        return super().save(name, content)
+
+
+class ContentAddressedStorage(ContentAddressedMixin, FileSystemStorage):
+    def __init__(self, **kwargs):
+        # Файл с тем же именем имеет то же содержимое, поэтому гонка двух загрузок не требует нового имени
+        kwargs.setdefault("allow_overwrite", True)
+        # Ссылки на баннеры ведут на представление доставки с кеширующими заголовками, а не на MEDIA_URL
+        kwargs.setdefault("base_url", settings.BANNER_ASSET_URL)
+        super().__init__(**kwargs)
+
+
+def banner_storage():
+    return storages["banners"]
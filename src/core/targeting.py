@@ -0,0 +1,133 @@
+import functools
+import json
+
+from django.core.exceptions import ValidationError
+
+from core.models import ads as ad_models
+
+STRING_DIMENSIONS = ("geo", "device", "store")
+PLACEMENT_BITS = {place: 1 << i for i, place in enumerate(ad_models.Advertisement.Placement.values)}
+ALL_PLACEMENTS = sum(PLACEMENT_BITS.values())
+ALL_HOURS = (1 << 24) - 1
+RULE_KEYS = {"include", "exclude"}
+
+
+def _normalize_values(dimension, values):
+    if not isinstance(values, list):
+        raise ValidationError(f"Таргетинг '{dimension}': ожидается список значений")
+    if dimension == "hour":
+        if not all(isinstance(value, int) and not isinstance(value, bool) and 0 <= value <= 23 for value in values):
+            raise ValidationError("Таргетинг 'hour': часы задаются числами от 0 до 23")
+        return sorted(set(values))
+    if dimension == "placement":
+        unknown = set(values) - set(PLACEMENT_BITS)
+        if unknown:
+            raise ValidationError(f"Таргетинг 'placement': неизвестные места размещения {sorted(unknown, key=str)}")
+    if not all(isinstance(value, str) and value for value in values):
+        raise ValidationError(f"Таргетинг '{dimension}': значения должны быть непустыми строками")
+    return sorted(set(values))
+
+
+def validate_targeting(targeting):
+    """
+    Проверяет правила таргетинга и приводит их к каноническому виду:
+    {"geo": {"include": [...], "exclude": [...]}, ...}. Список вместо правила означает include.
+    """
+    if targeting in (None, ""):
+        return {}
+    if not isinstance(targeting, dict):
+        raise ValidationError("Таргетинг должен быть объектом")
+
+    unknown = set(targeting) - {*STRING_DIMENSIONS, "placement", "hour"}
+    if unknown:
+        raise ValidationError(f"Неизвестные параметры таргетинга: {', '.join(sorted(unknown))}")
+
+    normalized = {}
+    for dimension, rule in targeting.items():
+        if isinstance(rule, list):
+            rule = {"include": rule}
+        if not isinstance(rule, dict) or not rule or set(rule) - RULE_KEYS:
+            raise ValidationError(f"Таргетинг '{dimension}': ожидаются ключи include и/или exclude")
+        normalized[dimension] = {key: _normalize_values(dimension, values) for key, values in sorted(rule.items())}
+    return normalized
+
+
+def _mask(values, bits):
+    mask = 0
+    for value in values:
+        mask |= bits[value]
+    return mask
+
+
+class Matcher:
+    __slots__ = ("rules", "hours", "placements")
+
+    def __init__(self, rules, hours, placements):
+        self.rules = rules
+        self.hours = hours
+        self.placements = placements
+
+    def allows_placement(self, place):
+        return bool(self.placements & PLACEMENT_BITS.get(place, 0))
+
+    def matches(self, attributes, hour, place=None):
+        if not self.hours >> hour & 1:
+            return False
+        if place is not None and not self.placements & PLACEMENT_BITS.get(place, 0):
+            return False
+        for key, include, exclude in self.rules:
+            value = attributes.get(key)
+            if include is not None and value not in include:
+                return False
+            if value in exclude:
+                return False
+        return True
+
+
+@functools.lru_cache(maxsize=65536)
+def _compile(canonical):
+    targeting = json.loads(canonical)
+    rules = tuple(
+        (
+            dimension,
+            frozenset(targeting[dimension]["include"]) if "include" in targeting[dimension] else None,
+            frozenset(targeting[dimension].get("exclude", ())),
+        )
+        for dimension in STRING_DIMENSIONS
+        if dimension in targeting
+    )
+    hour_bits = {hour: 1 << hour for hour in range(24)}
+    hours, placements = ALL_HOURS, ALL_PLACEMENTS
+    if "hour" in targeting:
+        hours = _mask(targeting["hour"].get("include", range(24)), hour_bits)
+        hours &= ~_mask(targeting["hour"].get("exclude", ()), hour_bits)
+    if "placement" in targeting:
+        placements = _mask(targeting["placement"].get("include", PLACEMENT_BITS), PLACEMENT_BITS)
+        placements &= ~_mask(targeting["placement"].get("exclude", ()), PLACEMENT_BITS)
+    return Matcher(rules, hours, placements)
+
+
+def compile_targeting(targeting):
+    """Компилирует таргетинг в Matcher; одинаковые правила разделяют один объект."""
+    normalized = validate_targeting(targeting)
+    return _compile(json.dumps(normalized, sort_keys=True))
+
+
+def naive_match(targeting, attributes, hour, place=None):
+    """Прямой обход JSON без компиляции. Эталон для тестов и бенчмарка."""
+    for dimension, rule in (targeting or {}).items():
+        if isinstance(rule, list):
+            rule = {"include": rule}
+        if dimension == "hour":
+            value = hour
+        elif dimension == "placement":
+            if place is None:
+                continue
+            value = place
+        else:
+            value = attributes.get(dimension)
+        if "include" in rule and value not in rule["include"]:
+            return False
+        if value in rule.get("exclude", ()):
+            return False
+    return True
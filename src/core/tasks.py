@@ -0,0 +1,38 @@
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import django
+from django.apps import apps
+from django.db import connections
+from django.utils.module_loading import import_string
+
+# Имя задачи -> (функция в процессе пула, функция сохранения результата в воркере или None).
+# Первая получает параметры задачи и работает только с хранилищем, вторая пишет результат в базу.
+HANDLERS = {
+    "banner_renditions": ("core.renditions.render", "core.renditions.save"),
+    "banner_precompress": ("core.delivery.precompress", None),
+}
+
+
+def _init_worker():
+    # При spawn дочерний процесс стартует без настроенного Django
+    if not apps.ready:
+        django.setup()
+
+
+@contextmanager
+def process_pool(workers):
+    """Пул процессов, запущенный до первого запроса к базе: соединения не должны достаться дочерним процессам при fork."""
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        executor.submit(_init_worker).result()
+        yield executor
+
+
+def execute(name, payload):
+    return import_string(HANDLERS[name][0])(payload)
+
+
+def save(name, payload, result):
+    if HANDLERS[name][1] is not None:
+        import_string(HANDLERS[name][1])(payload, result)
@@ -0,0 +1,133 @@
+import os
+import shutil
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.http import UnreadablePostError
+
+from core.models import assets as asset_models
+
+# Часть читается из запроса и копируется блоками этого размера: память не зависит от размера части
+BLOCK_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    pass
+
+
+class OffsetMismatch(UploadError):
+    """Смещение части не совпадает с принятым: клиент должен продолжить с offset."""
+
+    def __init__(self, offset):
+        super().__init__(f"Ожидалась часть со смещения {offset}")
+        self.offset = offset
+
+
+class IncompleteChunk(UploadError):
+    pass
+
+
+class AssembledFile(File):
+    """Собранный файл; temporary_file_path позволяет FileSystemStorage перенести его, а не копировать."""
+
+    def __init__(self, file, name, path):
+        super().__init__(file, name)
+        self.path = path
+
+    def temporary_file_path(self):
+        return self.path
+
+
+def _directory():
+    directory = Path(settings.BANNER_UPLOAD_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory
+
+
+def part_path(upload):
+    return _directory() / f"{upload.pk}.part"
+
+
+def _receive(stream, length):
+    """Пишет часть во временный файл рядом с загрузкой; оборванная часть удаляется целиком."""
+    path = _directory() / f"{uuid.uuid4()}.chunk"
+    received = 0
+    try:
+        with open(path, "wb") as chunk:
+            while received < length:
+                try:
+                    block = stream.read(min(BLOCK_SIZE, length - received))
+                except UnreadablePostError:
+                    break
+                if not block:
+                    break
+                chunk.write(block)
+                received += len(block)
+        if received != length:
+            raise IncompleteChunk(f"Получено {received} байт из {length}")
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+    return path
+
+
+def append_chunk(upload, offset, stream, length):
+    """
+    Дописывает часть длиной length со смещения offset и возвращает новое смещение.
+    Сеть читается вне транзакции, под блокировкой строки только дописывание локального файла.
+    """
+    if offset + length > upload.size:
+        raise UploadError(f"Часть выходит за объявленный размер {upload.size}")
+    chunk_path = _receive(stream, length)
+    try:
+        with transaction.atomic():
+            upload = asset_models.BannerUpload.objects.select_for_update().get(pk=upload.pk)
+            if upload.banner_id is not None:
+                raise UploadError("Загрузка уже завершена")
+            if upload.offset != offset:
+                raise OffsetMismatch(upload.offset)
+            fd = os.open(part_path(upload), os.O_RDWR | os.O_CREAT, 0o644)
+            with open(fd, "r+b") as part, open(chunk_path, "rb") as chunk:
+                on_disk = os.fstat(part.fileno()).st_size
+                if on_disk >= offset:
+                    # Хвост от части, запись которой не дошла до базы, перезаписывается и отрезается
+                    part.seek(offset)
+                    shutil.copyfileobj(chunk, part, BLOCK_SIZE)
+                    part.truncate()
+                    part.flush()
+                    os.fsync(part.fileno())
+            # Если файл потерян или обрезан вне загрузки, клиент продолжит с того, что реально на диске
+            upload.offset = offset + length if on_disk >= offset else on_disk
+            upload.save(update_fields=["offset", "updated_at"])
+        if on_disk < offset:
+            raise OffsetMismatch(on_disk)
+    finally:
+        chunk_path.unlink(missing_ok=True)
+    return upload.offset
+
+
+@contextmanager
+def assembled_file(upload):
+    path = part_path(upload)
+    if not upload.is_received or not path.exists() or path.stat().st_size != upload.size:
+        raise UploadError(f"Принято {upload.offset} байт из {upload.size}")
+    # Хранилище переносит жёсткую ссылку, а сам файл живёт до коммита: при откате завершение можно повторить
+    link = path.with_suffix(".final")
+    link.unlink(missing_ok=True)
+    try:
+        os.link(path, link)
+    except OSError:
+        shutil.copyfile(path, link)
+    try:
+        with open(link, "rb") as file:
+            yield AssembledFile(file, upload.filename, str(link))
+    finally:
+        link.unlink(missing_ok=True)
+
+
+def discard(upload):
+    part_path(upload).unlink(missing_ok=True)
@@ -86,6 +86,31 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Поколения и кеш прав должны быть общими для всех воркеров: в проде CACHE_BACKEND указывает на memcached/redis
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache")
+CACHE_OPTIONS = {"MAX_ENTRIES": 10000} if CACHE_BACKEND.endswith("LocMemCache") else {}
+
+CACHES = {
+    "default": {
+        "BACKEND": CACHE_BACKEND,
+        "LOCATION": os.getenv("CACHE_LOCATION", "default"),
+        "OPTIONS": CACHE_OPTIONS,
+    },
+    "responses": {
+        "BACKEND": CACHE_BACKEND,
+        "LOCATION": os.getenv("RESPONSE_CACHE_LOCATION", os.getenv("CACHE_LOCATION", "responses")),
+        "KEY_PREFIX": "responses",
+        "TIMEOUT": int(os.getenv("RESPONSE_CACHE_TIMEOUT", 60)),
+        "OPTIONS": CACHE_OPTIONS,
+    },
+}
+
+RESPONSE_CACHE_ALIAS = "responses"
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -126,6 +151,42 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 MEDIA_ROOT = BASE_DIR / "media"
 MEDIA_URL = "/media/"
 
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    # Файлы баннеров хранятся по sha256 содержимого, одинаковые креативы не дублируются
+    "banners": {"BACKEND": os.getenv("BANNER_STORAGE_BACKEND", "core.storage.ContentAddressedStorage")},
+}
+
+# Файлы баннеров отдаются представлением api:banner_asset; имена по хешу кешируются навсегда, остальные на BANNER_ASSET_MAX_AGE
+BANNER_ASSET_URL = os.getenv("BANNER_ASSET_URL", "/api/assets/")
+BANNER_ASSET_MAX_AGE = int(os.getenv("BANNER_ASSET_MAX_AGE", 3600))
+
+IMPRESSION_COUNTER_BACKEND = os.getenv("IMPRESSION_COUNTER_BACKEND", "core.serving.caps.CacheCounterBackend")
+
+PACING_IMPRESSION_COST = os.getenv("PACING_IMPRESSION_COST", "0.01")
+PACING_SPEND_BACKEND = os.getenv("PACING_SPEND_BACKEND", "core.serving.pacing.CacheSpendCounter")
+
+EVENTS_SPOOL_PATH = os.getenv("EVENTS_SPOOL_PATH", BASE_DIR / "spool" / "events.ndjson")
+# Сколько секунд после /api/decide принимаются показы и клики по токену решения
+EVENT_TOKEN_MAX_AGE = int(os.getenv("EVENT_TOKEN_MAX_AGE", 24 * 60 * 60))
+
+# Снимок живых кампаний для обслуживающих процессов (build_serving_snapshot); без него decide читает базу
+SERVING_SNAPSHOT_PATH = os.getenv("SERVING_SNAPSHOT_PATH") or None
+
+# Журнал изменений каталога (core.outbox) и события показов (core.rollups.compact_events): пропуск в id
+# моложе этого считается незакоммиченной транзакцией. Значение должно превышать длительность самой долгой
+# пишущей транзакции
+OUTBOX_SETTLE_SECONDS = int(os.getenv("OUTBOX_SETTLE_SECONDS", 60))
+# Как часто индекс decide без снимка дочитывает журнал изменений других процессов (воркеров, команд)
+DECISION_INDEX_POLL_SECONDS = float(os.getenv("DECISION_INDEX_POLL_SECONDS", 5))
+
+# Загрузка баннеров по частям. Каталог недокачанных файлов лучше держать на одном разделе с MEDIA_ROOT:
+# тогда готовый файл переносится в хранилище переименованием, а не копированием
+BANNER_UPLOAD_DIR = os.getenv("BANNER_UPLOAD_DIR", BASE_DIR / "uploads")
+BANNER_UPLOAD_MAX_SIZE = int(os.getenv("BANNER_UPLOAD_MAX_SIZE", 512 * 1024 * 1024))
+BANNER_UPLOAD_CHUNK_MAX_SIZE = int(os.getenv("BANNER_UPLOAD_CHUNK_MAX_SIZE", 16 * 1024 * 1024))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -138,11 +199,19 @@ REST_FRAMEWORK = {
         "rest_framework.authentication.SessionAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
-        "rest_framework.permissions.DjangoModelPermissions",
+        "api.permissions.CachedDjangoModelPermissions",
         "rest_framework.permissions.IsAuthenticated",
     ],
 }
 
+API_ASYNC_VIEWS = os.getenv("API_ASYNC_VIEWS", "false").lower() == "true"
+
+# Сколько секунд держать в кеше права пользователя и наборы его кампаний/объявлений
+AUTHZ_CACHE_TIMEOUT = int(os.getenv("AUTHZ_CACHE_TIMEOUT", 300))
+
+# Уменьшенные копии баннеров, которые строит воркер run_tasks: вид -> рамка (ширина, высота)
+BANNER_RENDITIONS = {"thumbnail": (160, 160), "preview": (800, 800)}
+
 LOGIN_URL = "/login/"
 LOGIN_REDIRECT_URL = "/"
 LOGOUT_REDIRECT_URL = "/login/"
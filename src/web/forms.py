@@ -1,6 +1,11 @@
+from contextlib import nullcontext
+
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
+from core.imagesize import resolve_dimensions
 from core.models import ads as ad_models
+from core.targeting import validate_targeting
 
 
 class CampaignForm(forms.ModelForm):
@@ -8,6 +13,9 @@ class CampaignForm(forms.ModelForm):
         model = ad_models.Campaign
         exclude = ("user",)
 
+    def clean_targeting(self):
+        return validate_targeting(self.cleaned_data["targeting"])
+
 
 class AdvertisementForm(forms.ModelForm):
     class Meta:
@@ -19,3 +27,28 @@ class BannerForm(forms.ModelForm):
     class Meta:
         model = ad_models.Banner
         exclude = ("advertisement",)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["width"].required = False
+        self.fields["height"].required = False
+
+    def clean(self):
+        cleaned_data = super().clean()
+        file = cleaned_data.get("file")
+        if (
+            not file
+            or not {"file", "width", "height"} & set(self.changed_data)
+            or self.has_error("width")
+            or self.has_error("height")
+        ):
+            return cleaned_data
+        # Новый файл остаётся открытым для сохранения, сохранённый открывается только на время проверки
+        with nullcontext(file) if isinstance(file, UploadedFile) else file.open("rb"):
+            try:
+                cleaned_data["width"], cleaned_data["height"] = resolve_dimensions(
+                    file, cleaned_data.get("width"), cleaned_data.get("height")
+                )
+            except forms.ValidationError as e:
+                self.add_error(None, e)
+        return cleaned_data
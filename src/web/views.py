@@ -1,13 +1,22 @@
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
-from django.db.models import Count
+from django.db import transaction
 from django.shortcuts import redirect
 from django.urls import reverse, reverse_lazy
 from django.views.generic import CreateView, DeleteView, DetailView, ListView, UpdateView, View
 
+from core import renditions
 from core.models import ads as ad_models
 from web import forms
 
 
+class AtomicFormMixin:
+    """Объект и его запись в журнале изменений (core.outbox) коммитятся вместе."""
+
+    def form_valid(self, form):
+        with transaction.atomic():
+            return super().form_valid(form)
+
+
 class CampaignListView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
     model = ad_models.Campaign
     template_name = "campaigns/campaign_list.html"
@@ -16,19 +25,15 @@ class CampaignListView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
     permission_required = "core.view_campaign"
 
     def get_queryset(self):
-        queryset = ad_models.Campaign.objects.filter(user=self.request.user).annotate(
-            banner_count=Count("advertisements__banners", distinct=True)
-        )
-
-        for campaign in queryset:
-            formats = ad_models.Banner.objects.filter(advertisement__campaign=campaign).values_list("file", flat=True)
-            unique_formats = {f.split(".")[-1].lower() for f in formats}
-            campaign.file_formats = ", ".join(unique_formats) if unique_formats else ""
+        return ad_models.Campaign.objects.filter(user=self.request.user)
 
-        return queryset
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        ad_models.Campaign.objects.attach_banner_stats(context["campaigns"])
+        return context
 
 
-class CampaignCreateView(LoginRequiredMixin, PermissionRequiredMixin, CreateView):
+class CampaignCreateView(LoginRequiredMixin, PermissionRequiredMixin, AtomicFormMixin, CreateView):
     model = ad_models.Campaign
     form_class = forms.CampaignForm
     template_name = "campaigns/campaign_form.html"
@@ -52,16 +57,8 @@ class CampaignDetailView(LoginRequiredMixin, PermissionRequiredMixin, DetailView
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        ads = ad_models.Advertisement.objects.filter(campaign=self.object).annotate(
-            banner_count=Count("banners", distinct=True)
-        )
-
-        for ad in ads:
-            files = ad_models.Banner.objects.filter(advertisement=ad).values_list("file", flat=True)
-            formats = {f.split(".")[-1].lower() for f in files}
-            ad.file_formats = ", ".join(formats) if formats else ""
-
-        context["ads"] = ads
+        ads = ad_models.Advertisement.objects.filter(campaign=self.object)
+        context["ads"] = ad_models.Advertisement.objects.attach_banner_stats(ads)
         return context
 
 
@@ -73,18 +70,18 @@ class CampaignMixin:
         return ad_models.Campaign.objects.filter(user=self.request.user)
 
 
-class CampaignUpdateView(CampaignMixin, LoginRequiredMixin, PermissionRequiredMixin, UpdateView):
+class CampaignUpdateView(CampaignMixin, LoginRequiredMixin, PermissionRequiredMixin, AtomicFormMixin, UpdateView):
     form_class = forms.CampaignForm
     template_name = "campaigns/campaign_form.html"
     permission_required = "core.change_campaign"
 
 
-class CampaignDeleteView(CampaignMixin, LoginRequiredMixin, PermissionRequiredMixin, DeleteView):
+class CampaignDeleteView(CampaignMixin, LoginRequiredMixin, PermissionRequiredMixin, AtomicFormMixin, DeleteView):
     template_name = "campaigns/campaign_delete.html"
     permission_required = "core.delete_campaign"
 
 
-class AdvertisementCreateView(LoginRequiredMixin, PermissionRequiredMixin, CreateView):
+class AdvertisementCreateView(LoginRequiredMixin, PermissionRequiredMixin, AtomicFormMixin, CreateView):
     model = ad_models.Advertisement
     form_class = forms.AdvertisementForm
     template_name = "advertisement/advertisement_form.html"
@@ -114,10 +111,15 @@ class AdvertisementDetailView(LoginRequiredMixin, PermissionRequiredMixin, Detai
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        banners = ad_models.Banner.objects.filter(advertisement=self.object)
+        banners = list(
+            ad_models.Banner.objects.filter(advertisement=self.object)
+            .with_file_format()
+            .with_renditions("thumbnail", "preview")
+        )
+        # Страница показывает уменьшенные копии, оригинал открывается только по ссылке
         for banner in banners:
-            banner.file_format = banner.file.name.split(".")[-1].lower()
-
+            banner.thumbnail_url = renditions.url(banner.thumbnail_rendition)
+            banner.preview_url = renditions.url(banner.preview_rendition)
         context["banners"] = banners
         return context
 
@@ -132,18 +134,18 @@ class AdvertisementMixin:
         return reverse("web:campaign-detail", args=[self.object.campaign.id])
 
 
-class AdvertisementUpdateView(AdvertisementMixin, LoginRequiredMixin, PermissionRequiredMixin, UpdateView):
+class AdvertisementUpdateView(AdvertisementMixin, LoginRequiredMixin, PermissionRequiredMixin, AtomicFormMixin, UpdateView):
     form_class = forms.AdvertisementForm
     template_name = "advertisement/advertisement_form.html"
     permission_required = "core.change_advertisement"
 
 
-class AdvertisementDeleteView(AdvertisementMixin, LoginRequiredMixin, PermissionRequiredMixin, DeleteView):
+class AdvertisementDeleteView(AdvertisementMixin, LoginRequiredMixin, PermissionRequiredMixin, AtomicFormMixin, DeleteView):
     template_name = "advertisement/advertisement_delete.html"
     permission_required = "core.delete_advertisement"
 
 
-class BannerCreateView(LoginRequiredMixin, PermissionRequiredMixin, CreateView):
+class BannerCreateView(LoginRequiredMixin, PermissionRequiredMixin, AtomicFormMixin, CreateView):
     model = ad_models.Banner
     form_class = forms.BannerForm
     template_name = "banner/banner_form.html"
@@ -166,7 +168,7 @@ class BannerCreateView(LoginRequiredMixin, PermissionRequiredMixin, CreateView):
         return reverse("web:ad-detail", args=[self.ad.id])
 
 
-class BannerUpdateView(LoginRequiredMixin, PermissionRequiredMixin, UpdateView):
+class BannerUpdateView(LoginRequiredMixin, PermissionRequiredMixin, AtomicFormMixin, UpdateView):
     model = ad_models.Banner
     form_class = forms.BannerForm
     template_name = "banner/banner_form.html"
@@ -183,7 +185,8 @@ class BannerArchiveView(LoginRequiredMixin, PermissionRequiredMixin, View):
     permission_required = "core.change_banner"
 
     def post(self, request, pk):
-        banner = ad_models.Banner.objects.get(pk=pk, advertisement__campaign__user=request.user)
-        banner.is_active = False
-        banner.save(update_fields=["is_active"])
+        with transaction.atomic():
+            banner = ad_models.Banner.objects.get(pk=pk, advertisement__campaign__user=request.user)
+            banner.is_active = False
+            banner.save(update_fields=["is_active"])
         return redirect("web:ad-detail", banner.advertisement.id)